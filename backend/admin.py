@@ -3,6 +3,8 @@ from .user import User
 
 
 class Admin(User):
+    __slots__ = ()
+
     def __init__(
         self, user_id: int, name: str, email: str, license_number: str
     ) -> None:
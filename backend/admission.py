@@ -0,0 +1,272 @@
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Optional, Tuple
+
+from .metrics import METRICS_ENABLED, metrics
+from .responses import FastJSONResponse
+
+# Admission control settings, overridable through the environment
+ADMISSION_CONTROL = os.environ.get("ADMISSION_CONTROL", "0") == "1"
+ADMISSION_WRITE_ROUTES = tuple(
+    p for p in os.environ.get("ADMISSION_WRITE_ROUTES", "/api/book,/api/book/category,/api/book/batch,/api/register").split(",") if p
+)
+ADMISSION_WRITE_CONCURRENCY = int(os.environ.get("ADMISSION_WRITE_CONCURRENCY", "8"))
+ADMISSION_QUEUE_BUDGET_MS = float(os.environ.get("ADMISSION_QUEUE_BUDGET_MS", "2000"))
+# Requests per second (and burst) each client may send to each write route; 0 turns it off
+ADMISSION_CLIENT_RATE = float(os.environ.get("ADMISSION_CLIENT_RATE", "5"))
+ADMISSION_CLIENT_BURST = float(os.environ.get("ADMISSION_CLIENT_BURST", "10"))
+# Requests per second for a route across all clients, e.g. "/api/book=200,/api/register=20"
+ADMISSION_ROUTE_RATES = os.environ.get("ADMISSION_ROUTE_RATES", "")
+# Header naming the client (e.g. x-forwarded-for behind a proxy); the peer address otherwise
+ADMISSION_CLIENT_HEADER = os.environ.get("ADMISSION_CLIENT_HEADER", "").lower()
+ADMISSION_MAX_CLIENTS = int(os.environ.get("ADMISSION_MAX_CLIENTS", "10000"))
+
+WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+
+
+def parse_route_rates(spec: str) -> Dict[str, float]:
+    """``"/api/book=200,/api/register=20"`` -> {path: requests per second}."""
+    rates = {}
+    for item in spec.split(","):
+        path, sep, rate = item.strip().rpartition("=")
+        if sep and path:
+            rates[path] = float(rate)
+    return rates
+
+
+class TokenBucket:
+    """``rate`` tokens a second, holding at most ``burst``."""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, now: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """Take a token; returns 0, or the seconds until one will be there (nothing taken)."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class WriteLimiter:
+    """At most ``limit`` write requests at once; the rest wait in FIFO order.
+
+    A request is turned away straight away when the wait it can expect (its
+    place in the queue times the recent mean service time, over ``limit``
+    slots) is over ``budget``, and when it has actually waited ``budget``
+    seconds without a slot. Runs on one event loop, so needs no locks.
+    """
+
+    def __init__(self, limit: int, budget: float) -> None:
+        self.limit = limit
+        self.budget = budget
+        self.active = 0
+        self.service_time = 0.05  # moving average of seconds a write holds its slot
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def depth(self) -> int:
+        return len(self._waiters)
+
+    def expected_delay(self) -> float:
+        if self.active < self.limit:
+            return 0.0
+        return (len(self._waiters) + 1) * self.service_time / self.limit
+
+    async def acquire(self) -> Tuple[bool, float]:
+        """(True, seconds waited) once a slot is held, or (False, suggested retry delay)."""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return True, 0.0
+        delay = self.expected_delay()
+        if delay > self.budget:
+            return False, delay
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait({waiter}, timeout=self.budget)
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._pass_on()  # handed a slot just as the request went away
+            raise
+        finally:
+            if not waiter.done():
+                waiter.cancel()  # _pass_on() skips it
+        if waiter.cancelled():
+            return False, self.expected_delay() or self.budget
+        return True, time.perf_counter() - start
+
+    def release(self, held: float) -> None:
+        """Give up a slot held for ``held`` seconds, handing it to the next waiter."""
+        self.service_time += 0.1 * (held - self.service_time)
+        self._pass_on()
+
+    def _pass_on(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)  # the slot passes on, active stays the same
+                return
+        self.active -= 1
+
+
+class AdmissionController:
+    """Rate limits and the write limiter behind AdmissionMiddleware.
+
+    Each request to a write route passes, in order: its client's bucket for
+    that route (429 when empty), the route's bucket across all clients (503)
+    and the WriteLimiter (503 when the queue delay would go over budget).
+    Limits are per worker process.
+    """
+
+    def __init__(
+        self,
+        routes=ADMISSION_WRITE_ROUTES,
+        concurrency: int = ADMISSION_WRITE_CONCURRENCY,
+        budget: float = ADMISSION_QUEUE_BUDGET_MS / 1000,
+        client_rate: float = ADMISSION_CLIENT_RATE,
+        client_burst: float = ADMISSION_CLIENT_BURST,
+        route_rates: Optional[Dict[str, float]] = None,
+        client_header: str = ADMISSION_CLIENT_HEADER,
+        max_clients: int = ADMISSION_MAX_CLIENTS,
+    ) -> None:
+        self.routes = frozenset(routes)
+        self.client_rate = client_rate
+        self.client_burst = max(client_burst, 1.0)
+        self.route_rates = parse_route_rates(ADMISSION_ROUTE_RATES) if route_rates is None else route_rates
+        self.client_header = client_header.encode("latin-1")
+        self.max_clients = max_clients
+        self.limiter = WriteLimiter(concurrency, budget)
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {"client_rate": 0, "route_rate": 0, "queue": 0}
+        self._clients: "OrderedDict[Tuple[str, str], TokenBucket]" = OrderedDict()
+        self._route_buckets: Dict[str, TokenBucket] = {}
+
+    def applies(self, scope) -> bool:
+        return scope["method"] in WRITE_METHODS and scope["path"] in self.routes
+
+    def client_key(self, scope) -> str:
+        if self.client_header:
+            for name, value in scope["headers"]:
+                if name == self.client_header:
+                    return value.decode("latin-1").split(",")[0].strip()
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    def check_rates(self, scope, now: float) -> Optional[Tuple[int, str, float]]:
+        """None if the rate limits let the request through, else (status, reason, retry after)."""
+        path = scope["path"]
+        if self.client_rate > 0:
+            key = (self.client_key(scope), path)
+            bucket = self._clients.get(key)
+            if bucket is None:
+                bucket = self._clients[key] = TokenBucket(self.client_rate, self.client_burst, now)
+                if len(self._clients) > self.max_clients:
+                    self._clients.popitem(last=False)
+            else:
+                self._clients.move_to_end(key)
+            wait = bucket.take(now)
+            if wait:
+                return 429, "client_rate", wait
+        rate = self.route_rates.get(path)
+        if rate:
+            bucket = self._route_buckets.get(path)
+            if bucket is None:
+                bucket = self._route_buckets[path] = TokenBucket(rate, max(rate, 1.0), now)
+            wait = bucket.take(now)
+            if wait:
+                return 503, "route_rate", wait
+        return None
+
+    def reject(self, path: str, reason: str) -> None:
+        self.rejected[reason] += 1
+        if METRICS_ENABLED:
+            metrics.admission_rejected.inc((path, reason))
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "in_flight": self.limiter.active,
+            "queue_depth": self.limiter.depth,
+            "expected_delay_ms": round(self.limiter.expected_delay() * 1000, 1),
+            "mean_service_ms": round(self.limiter.service_time * 1000, 1),
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "clients_tracked": len(self._clients),
+        }
+
+
+def _shed(status: int, retry_after: float, detail: str) -> FastJSONResponse:
+    return FastJSONResponse(
+        {"detail": detail}, status_code=status, headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+
+class AdmissionMiddleware:
+    """ASGI middleware shedding write requests the database cannot serve in time.
+
+    Over-limit requests get 429 (this client is too fast) or 503 (the server is
+    too busy) with a Retry-After header before any of the request is read, so
+    they are always safe to retry. Other requests pass straight through.
+    """
+
+    def __init__(
+        self, app, controller: Optional[AdmissionController] = None, enabled: bool = ADMISSION_CONTROL
+    ) -> None:
+        self.app = app
+        self.controller = controller or admission
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        controller = self.controller
+        if scope["type"] != "http" or not self.enabled or not controller.applies(scope):
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        limited = controller.check_rates(scope, time.monotonic())
+        if limited is not None:
+            status, reason, wait = limited
+            controller.reject(path, reason)
+            detail = "Too many requests" if status == 429 else "Server busy"
+            await _shed(status, wait, detail)(scope, receive, send)
+            return
+
+        limiter = controller.limiter
+        if METRICS_ENABLED:
+            metrics.admission_queue_depth.inc()
+        try:
+            admitted, waited = await limiter.acquire()
+        finally:
+            if METRICS_ENABLED:
+                metrics.admission_queue_depth.dec()
+        if not admitted:
+            controller.reject(path, "queue")
+            await _shed(503, waited, "Server busy")(scope, receive, send)
+            return
+
+        controller.admitted += 1
+        if METRICS_ENABLED:
+            metrics.admission_wait.observe(waited, (path,))
+            metrics.admission_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(time.perf_counter() - start)
+            if METRICS_ENABLED:
+                metrics.admission_in_flight.dec()
+
+
+# Shared by the middleware and the /api/admission-stats endpoint
+admission = AdmissionController()
@@ -0,0 +1,305 @@
+import os
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from datetime import date
+from typing import Collection, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from .models import Car as DBCar, Reservation as DBReservation, INACTIVE_STATUSES, IN_SERVICE_STATUSES
+
+# Free gaps shorter than this many days are counted as unusable slivers
+ALLOCATION_MIN_GAP_DAYS = int(os.environ.get("ALLOCATION_MIN_GAP_DAYS", "2"))
+# Candidates looked at per gap length before settling for the best seen
+ALLOCATION_SCAN = int(os.environ.get("ALLOCATION_SCAN", "32"))
+
+# End of a car's last, open-ended gap
+OPEN = 1 << 40
+
+
+class CategoryCalendar:
+    """Free gaps of every car in one category, indexed for best-fit lookups.
+
+    Days are integer offsets from the allocator's origin. Each car's free time
+    is a sorted list of gaps between its bookings; the last one is open-ended.
+    Bounded gaps are also kept in one sorted list of (start, car) per gap
+    length, and open-ended ones in a single sorted list, so finding the
+    tightest gap around a date range is a bisect per gap length rather than a
+    scan over the cars.
+    """
+
+    def __init__(self, min_gap: int = 2, scan: int = 32) -> None:
+        self.min_gap = min_gap
+        self.scan = scan
+        self._starts: Dict[int, List[int]] = {}
+        self._ends: Dict[int, List[int]] = {}
+        self._by_length: Dict[int, List[Tuple[int, int]]] = {}
+        self._lengths: List[int] = []
+        self._open: List[Tuple[int, int]] = []
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def __contains__(self, car_id: int) -> bool:
+        return car_id in self._starts
+
+    def add_car(self, car_id: int, bookings: Iterable[Tuple[int, int]] = ()) -> None:
+        """Track ``car_id`` with its booked (first, last) day spans, replacing what was known."""
+        if car_id in self._starts:
+            self.remove_car(car_id)
+        self._starts[car_id] = []
+        self._ends[car_id] = []
+        self._add_gap(car_id, 0, OPEN)
+        for first, last in bookings:
+            self.reserve(car_id, first, last)
+
+    def remove_car(self, car_id: int) -> None:
+        while self._starts.get(car_id):
+            self._remove_gap(car_id, 0)
+        self._starts.pop(car_id, None)
+        self._ends.pop(car_id, None)
+
+    def is_free(self, car_id: int, first: int, last: int) -> bool:
+        starts = self._starts.get(car_id)
+        if not starts:
+            return False
+        i = bisect_right(starts, first) - 1
+        return i >= 0 and self._ends[car_id][i] >= last
+
+    def reserve(self, car_id: int, first: int, last: int) -> None:
+        """Take ``first``..``last`` out of the car's free gaps (whatever part of it is free)."""
+        starts = self._starts.get(car_id)
+        if starts is None:
+            return
+        ends = self._ends[car_id]
+        i = bisect_right(starts, last) - 1
+        while i >= 0 and ends[i] >= first:
+            gap_start, gap_end = starts[i], ends[i]
+            self._remove_gap(car_id, i)
+            if gap_start < first:
+                self._add_gap(car_id, gap_start, first - 1)
+            if gap_end > last:
+                self._add_gap(car_id, last + 1, gap_end)
+            i -= 1
+
+    def release(self, car_id: int, first: int, last: int) -> None:
+        """Give back ``first``..``last``, a span taken by reserve(), merging it with its neighbours."""
+        starts = self._starts.get(car_id)
+        if starts is None:
+            return
+        ends = self._ends[car_id]
+        i = bisect_left(starts, first)
+        if i < len(starts) and starts[i] == last + 1:
+            last = ends[i]
+            self._remove_gap(car_id, i)
+        if i > 0 and ends[i - 1] == first - 1:
+            first = starts[i - 1]
+            self._remove_gap(car_id, i - 1)
+        self._add_gap(car_id, first, last)
+
+    def best_fit(self, first: int, last: int, exclude: Collection[int] = ()) -> Optional[int]:
+        """The car whose free gap around ``first``..``last`` is tightest, or None if none is free.
+
+        Bounded gaps are tried from the shortest length that fits up, so holes
+        between bookings are filled before any car's open calendar is cut
+        into. Among gaps of the same length, placements leaving no sliver
+        shorter than ``min_gap`` days on either side win, then the one closest
+        to the booking before it. Open-ended gaps come last, latest start
+        first, which packs the new booking right behind an existing one.
+        """
+        need = last - first + 1
+        lengths = self._lengths
+        for k in range(bisect_left(lengths, need), len(lengths)):
+            length = lengths[k]
+            bucket = self._by_length[length]
+            # Gaps of this length that contain the range start in last - length + 1 .. first
+            lo = bisect_left(bucket, (last - length + 1,))
+            hi = bisect_right(bucket, (first, OPEN))
+            car = self._pick(bucket, lo, hi, first, last, length, exclude)
+            if car is not None:
+                return car
+        hi = bisect_right(self._open, (first, OPEN))
+        best, best_score = None, None
+        for j in range(hi - 1, max(hi - 1 - self.scan, -1), -1):
+            gap_start, car = self._open[j]
+            if car in exclude:
+                continue
+            score = self._sliver(first - gap_start)
+            if best is None or score < best_score:
+                best, best_score = car, score
+                if not score:
+                    break
+        return best
+
+    def _sliver(self, leftover: int) -> int:
+        return 1 if 0 < leftover < self.min_gap else 0
+
+    def _pick(self, bucket, lo: int, hi: int, first: int, last: int, length: int, exclude) -> Optional[int]:
+        best, best_score = None, None
+        for j in range(lo, min(hi, lo + self.scan)):
+            gap_start, car = bucket[j]
+            if car in exclude:
+                continue
+            left = first - gap_start
+            score = (self._sliver(left) + self._sliver(gap_start + length - 1 - last), left)
+            if best is None or score < best_score:
+                best, best_score = car, score
+                if score == (0, 0):
+                    break
+        return best
+
+    def _add_gap(self, car_id: int, first: int, last: int) -> None:
+        starts = self._starts[car_id]
+        i = bisect_left(starts, first)
+        starts.insert(i, first)
+        self._ends[car_id].insert(i, last)
+        if last >= OPEN:
+            insort(self._open, (first, car_id))
+            return
+        length = last - first + 1
+        bucket = self._by_length.get(length)
+        if bucket is None:
+            bucket = self._by_length[length] = []
+            insort(self._lengths, length)
+        insort(bucket, (first, car_id))
+
+    def _remove_gap(self, car_id: int, i: int) -> None:
+        first = self._starts[car_id].pop(i)
+        last = self._ends[car_id].pop(i)
+        if last >= OPEN:
+            entries = self._open
+        else:
+            length = last - first + 1
+            entries = self._by_length[length]
+        del entries[bisect_left(entries, (first, car_id))]
+        if last < OPEN and not entries:
+            del self._by_length[length]
+            del self._lengths[bisect_left(self._lengths, length)]
+
+
+class FleetAllocator:
+    """Picks a car for a category and date range, one CategoryCalendar per category.
+
+    Built from the database at startup and kept current by the stores, which
+    report every committed booking. allocate() holds the chosen days in the
+    calendar right away, so concurrent requests are not handed the same gap;
+    the caller gives them back with release() if the booking then fails. The
+    database overlap check stays authoritative, so a calendar that is behind
+    (bookings made by another worker) only costs a retry.
+    """
+
+    def __init__(self, min_gap: int = 2, scan: int = 32) -> None:
+        self.min_gap = min_gap
+        self.scan = scan
+        self.origin: Optional[date] = None
+        self._lock = threading.Lock()
+        self._calendars: Dict[str, CategoryCalendar] = {}
+        self._category_of: Dict[int, str] = {}
+
+    @property
+    def loaded(self) -> bool:
+        return self.origin is not None
+
+    def __contains__(self, car_id: int) -> bool:
+        return car_id in self._category_of
+
+    def load(self, db: Session, origin: Optional[date] = None) -> None:
+        """Rebuild every calendar from in-service cars and their reservations from ``origin`` on."""
+        origin = origin or date.today()
+        cars = db.query(DBCar.id, DBCar.category).filter(DBCar.status.in_(IN_SERVICE_STATUSES))
+        category_of = {car_id: category or "Unknown" for car_id, category in cars}
+        bookings: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
+        query = db.query(DBReservation.car_id, DBReservation.start_date, DBReservation.end_date).filter(
+            DBReservation.end_date >= origin,
+            DBReservation.status.notin_(INACTIVE_STATUSES),
+        )
+        for car_id, start, end in query.yield_per(50_000):
+            if car_id in category_of:
+                bookings[car_id].append((max((start - origin).days, 0), (end - origin).days))
+
+        calendars: Dict[str, CategoryCalendar] = {}
+        for car_id, category in category_of.items():
+            calendar = calendars.get(category)
+            if calendar is None:
+                calendar = calendars[category] = CategoryCalendar(self.min_gap, self.scan)
+            calendar.add_car(car_id, sorted(bookings.get(car_id, ())))
+        with self._lock:
+            self.origin = origin
+            self._calendars = calendars
+            self._category_of = category_of
+
+    def allocate(
+        self, category: str, start: date, end: date, exclude: Collection[int] = ()
+    ) -> Optional[int]:
+        """Best-fit car of ``category`` free from ``start`` to ``end``, now held for it; None if none is."""
+        if not self.loaded:
+            return None
+        first, last = self._days(start, end)
+        if first < 0:
+            raise ValueError("Start date is before the allocator's calendar")
+        with self._lock:
+            calendar = self._calendars.get(category)
+            if calendar is None:
+                return None
+            car_id = calendar.best_fit(first, last, exclude)
+            if car_id is not None:
+                calendar.reserve(car_id, first, last)
+            return car_id
+
+    def reserve(self, car_id: int, start: date, end: date) -> None:
+        """Record a committed booking (a no-op for cars the allocator does not track)."""
+        self._on_calendar(car_id, start, end, CategoryCalendar.reserve)
+
+    def release(self, car_id: int, start: date, end: date) -> None:
+        """Free days held by allocate() for a booking that did not go through."""
+        self._on_calendar(car_id, start, end, CategoryCalendar.release)
+
+    def track(self, car_id: int, category: Optional[str], bookings: Iterable[Tuple[date, date]] = ()) -> None:
+        """(Re)load one car and its booked date ranges, e.g. after a failed booking showed it was stale."""
+        if not self.loaded:
+            return
+        category = category or "Unknown"
+        spans = sorted(self._days(max(s, self.origin), e) for s, e in bookings if e >= self.origin)
+        with self._lock:
+            self._forget(car_id)
+            calendar = self._calendars.get(category)
+            if calendar is None:
+                calendar = self._calendars[category] = CategoryCalendar(self.min_gap, self.scan)
+            calendar.add_car(car_id, spans)
+            self._category_of[car_id] = category
+
+    def forget(self, car_id: int) -> None:
+        """Stop offering ``car_id`` (e.g. it went into maintenance)."""
+        with self._lock:
+            self._forget(car_id)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "origin": self.origin.isoformat() if self.origin else None,
+                "categories": {name: len(calendar) for name, calendar in sorted(self._calendars.items())},
+            }
+
+    def _forget(self, car_id: int) -> None:
+        category = self._category_of.pop(car_id, None)
+        if category is not None:
+            self._calendars[category].remove_car(car_id)
+
+    def _days(self, start: date, end: date) -> Tuple[int, int]:
+        return (start - self.origin).days, (end - self.origin).days
+
+    def _on_calendar(self, car_id: int, start: date, end: date, op) -> None:
+        if not self.loaded:
+            return
+        first, last = self._days(start, end)
+        if last < 0:
+            return
+        with self._lock:
+            category = self._category_of.get(car_id)
+            if category is not None:
+                op(self._calendars[category], car_id, max(first, 0), last)
+
+
+# Shared by the API process; loaded at startup
+fleet_allocator = FleetAllocator(ALLOCATION_MIN_GAP_DAYS, ALLOCATION_SCAN)
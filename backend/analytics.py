@@ -0,0 +1,175 @@
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import String, func, select, type_coerce
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+from .models import Car as DBCar, Reservation as DBReservation
+
+# Range of a utilization report when none is given (a quarter), and the longest
+# one allowed; memory is cars x days
+DEFAULT_ANALYTICS_DAYS = 90
+MAX_ANALYTICS_DAYS = 366
+# Reservation rows fetched per round trip while streaming
+STREAM_CHUNK = 100_000
+
+
+def _days(dates, origin: np.datetime64) -> np.ndarray:
+    """Day offsets from ``origin`` of ISO date strings (or date objects)."""
+    return (np.array(dates, dtype="datetime64[D]") - origin).astype(np.int64)
+
+
+def reservation_spans(db: Session, start: date, end: date) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Car ids and first/last day offsets from ``start`` of reservations overlapping the range.
+
+    Reservations other than cancelled ones are streamed in one query, read
+    from the covering ix_reservations_occupancy index, and converted chunk by
+    chunk. Offsets are clipped to the range.
+    """
+    n_days = (end - start).days + 1
+    origin = np.datetime64(start, "D")
+    cars: List[np.ndarray] = []
+    firsts: List[np.ndarray] = []
+    lasts: List[np.ndarray] = []
+    # Dates come back as driver values (ISO strings on SQLite) and NumPy parses a
+    # whole chunk at once, instead of building a date object per value
+    stmt = (
+        select(
+            DBReservation.car_id,
+            type_coerce(DBReservation.start_date, String),
+            type_coerce(DBReservation.end_date, String),
+        )
+        .where(
+            DBReservation.end_date >= start,
+            DBReservation.start_date <= end,
+            DBReservation.status != "cancelled",
+        )
+        .execution_options(yield_per=STREAM_CHUNK)
+    )
+    for part in db.connection().execute(stmt).partitions():
+        car_col, start_col, end_col = zip(*part)
+        cars.append(np.fromiter(car_col, dtype=np.int64, count=len(part)))
+        firsts.append(np.maximum(_days(start_col, origin), 0))
+        lasts.append(np.minimum(_days(end_col, origin), n_days - 1))
+    if not cars:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty
+    return np.concatenate(cars), np.concatenate(firsts), np.concatenate(lasts)
+
+
+def occupancy(
+    start: date,
+    n_days: int,
+    car_ids: np.ndarray,
+    car_categories: Sequence[str],
+    res_cars: np.ndarray,
+    first: np.ndarray,
+    last: np.ndarray,
+) -> Dict[str, object]:
+    """The utilization report for a fleet and its reservation spans.
+
+    ``car_ids`` must be grouped by category (``car_categories`` lists each
+    car's). Each span becomes a +1 on its first day and a -1 after its last in
+    a flat (cars x days) difference array, built with two bincounts; a
+    cumulative sum along the day axis then gives, for every car and day,
+    whether the car was out. Everything else is a reduction over that matrix:
+    per-category totals per day, peaks, per-car booked days and the cars that
+    were never out. Spans of cars not in ``car_ids`` are ignored.
+    """
+    n_cars = len(car_ids)
+    by_id = np.argsort(car_ids)
+    sorted_ids = car_ids[by_id]
+
+    # Flat difference array indices: row * (n_days + 1) + day
+    width = n_days + 1
+    size = n_cars * width
+    diff = np.zeros(size, dtype=np.int64)
+    n_reservations = 0
+    if n_cars and len(res_cars):
+        pos = np.minimum(np.searchsorted(sorted_ids, res_cars), n_cars - 1)
+        known = sorted_ids[pos] == res_cars
+        rows = by_id[pos[known]]
+        diff += np.bincount(rows * width + first[known], minlength=size)
+        diff -= np.bincount(rows * width + last[known] + 1, minlength=size)
+        n_reservations = int(known.sum())
+    booked = np.cumsum(diff.reshape(n_cars, width)[:, :n_days], axis=1) > 0
+
+    days = [(start + timedelta(days=i)).isoformat() for i in range(n_days)]
+    busy = booked.sum(axis=0)
+
+    def peak(series: np.ndarray) -> Dict[str, object]:
+        i = int(series.argmax()) if len(series) else 0
+        return {"cars": int(series[i]) if len(series) else 0, "date": days[i]}
+
+    def rates(series: np.ndarray, fleet: int) -> List[float]:
+        return np.round(series / fleet, 4).tolist() if fleet else [0.0] * len(series)
+
+    categories: Dict[str, object] = {}
+    if n_cars:
+        names = np.array(car_categories, dtype=object)
+        block_starts = np.flatnonzero(np.r_[True, names[1:] != names[:-1]])
+        block_sizes = np.diff(np.r_[block_starts, n_cars])
+        block_busy = np.add.reduceat(booked, block_starts, axis=0, dtype=np.int64)
+        for b, size_b, series in zip(block_starts, block_sizes, block_busy):
+            categories[names[b]] = {
+                "cars": int(size_b),
+                "busy": series.tolist(),
+                "utilization": rates(series, int(size_b)),
+                "mean_utilization": round(float(series.mean()) / int(size_b), 4),
+                "peak": peak(series),
+            }
+
+    booked_days = booked.sum(axis=1)
+    return {
+        "start": start.isoformat(),
+        "end": days[-1],
+        "days": days,
+        "fleet": {"cars": n_cars, "reservations": n_reservations},
+        "daily": {"busy": busy.tolist(), "utilization": rates(busy, n_cars)},
+        "mean_utilization": round(float(booked.mean()), 4) if booked.size else 0.0,
+        "peak": peak(busy),
+        "categories": categories,
+        "cars": {
+            "id": sorted_ids.tolist(),
+            "booked_days": booked_days[by_id].tolist(),
+            "utilization": np.round(booked_days[by_id] / n_days, 4).tolist(),
+        },
+        "idle_cars": np.sort(car_ids[booked_days == 0]).tolist(),
+    }
+
+
+def utilization(
+    db: Session, start: date, end: date, category: Optional[str] = None
+) -> Dict[str, object]:
+    """Fleet occupancy from ``start`` to ``end`` inclusive, per day, category and car.
+
+    See occupancy(); the whole fleet (or one ``category`` of it) is counted,
+    with reservation_spans() as the bookings.
+    """
+    n_days = (end - start).days + 1
+    if n_days < 1:
+        raise ValueError("End date must be >= start date")
+    if n_days > MAX_ANALYTICS_DAYS:
+        raise ValueError(f"Range is limited to {MAX_ANALYTICS_DAYS} days")
+
+    # The fleet, grouped by category so each category is a contiguous block of rows
+    # (cars without one count as "Unknown", in the same block as cars labelled so)
+    car_category = func.coalesce(DBCar.category, "Unknown")
+    cars = select(DBCar.id, car_category).order_by(car_category, DBCar.id)
+    if category:
+        cars = cars.where(car_category == category)
+    car_rows = db.execute(cars).all()
+    car_ids = np.fromiter((r[0] for r in car_rows), dtype=np.int64, count=len(car_rows))
+    car_categories = [r[1] for r in car_rows]
+    return occupancy(start, n_days, car_ids, car_categories, *reservation_spans(db, start, end))
+
+
+def fleet_utilization(start: date, end: date, category: Optional[str] = None) -> Dict[str, object]:
+    """utilization() in a session of its own."""
+    db = SessionLocal()
+    try:
+        return utilization(db, start, end, category)
+    finally:
+        db.close()
@@ -1,32 +1,69 @@
-from fastapi import FastAPI, HTTPException, Query, Depends
+from fastapi import FastAPI, HTTPException, Query, Depends, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Dict, List, Optional
-from datetime import date
+from typing import Dict, List, Optional, Tuple
+from datetime import date, timedelta
+from tempfile import SpooledTemporaryFile
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # Import backends classes
 from .user import User
 from .reservation import Reservation
 from .car import Car
 from .admin import Admin  # for future use
-from .database import get_db, init_db
-from .db_services import DatabaseUserStore, DatabaseFleetStore, DatabaseReservationStore
-from .models import Car as DBCar
-
-app = FastAPI(title="Car Rental API", version="0.1")
-
+from .database import get_db, get_async_db, init_db, async_engine
+from .db_services import CarUnavailable, CarNotFound, ReservationOverlap
+from .async_db_services import (
+    AsyncDatabaseUserStore,
+    AsyncDatabaseFleetStore,
+    AsyncDatabaseReservationStore,
+)
+from .availability import fleet_availability
+from .allocation import fleet_allocator
+from .cache import catalog_cache
+from .pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from .fleet_import import DEFAULT_CHUNK_SIZE, format_for, import_file
+from .analytics import DEFAULT_ANALYTICS_DAYS, fleet_utilization
+from .reservation_export import DEFAULT_CHUNK_SIZE as EXPORT_CHUNK_SIZE, EXTENSIONS, MEDIA_TYPES, export_reservations
+from .metrics import MetricsMiddleware, metrics
+from .profiling import PROFILING_ENABLED, ProfilingMiddleware, profile_store
+from .responses import FastJSONResponse
+from .etags import etag_matches, fleet_etag, reservations_etag
+from .compression import CompressionMiddleware
+from .admission import AdmissionMiddleware, admission
+from .idempotency import IdempotencyMiddleware
+from .write_queue import BOOKING_GROUP_COMMIT, booking_queue
+from .lifecycle import LIFECYCLE_SCHEDULER, lifecycle_scheduler
+from .events import EVENT_HEARTBEAT_SECONDS, event_hub, sse_stream
+from .models import Car as DBCar, IN_SERVICE_STATUSES
+
+app = FastAPI(title="Car Rental API", version="0.1", default_response_class=FastJSONResponse)
+
+# Innermost, so shed requests still get CORS headers and show up in the metrics
+app.add_middleware(AdmissionMiddleware)
+# Outside admission control, so replayed answers use no write slot or rate-limit token
+app.add_middleware(IdempotencyMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Profile-Id", "ETag", "Idempotent-Replayed"],
 )
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(ProfilingMiddleware)
+# Outermost, so its timings include the other middleware
+app.add_middleware(MetricsMiddleware)
 
 
 # Database services (replacing in-memory stores)
-# These will be created per request using dependency injection
+# These will be created per request using dependency injection; endpoints use the
+# async stores, startup and scripts use the sync ones in db_services
 
 
 def seed_database(db: Session):
@@ -46,16 +83,10 @@ def seed_database(db: Session):
         (301, "Honda", "CR-V", 2020, "available", "SUV"),
         (302, "Toyota", "RAV4", 2024, "available", "SUV"),
     ]
-    for cid, make, model, year, status, cat in data:
-        db_car = DBCar(
-            id=cid,
-            make=make,
-            model=model,
-            year=year,
-            status=status,
-            category=cat
-        )
-        db.add(db_car)
+    db.execute(insert(DBCar), [
+        {"id": cid, "make": make, "model": model, "year": year, "status": status, "category": cat}
+        for cid, make, model, year, status, cat in data
+    ])
     db.commit()
 
 # Initialize database on startup
@@ -66,8 +97,23 @@ async def startup_event():
     db = next(get_db())
     try:
         seed_database(db)
+        fleet_availability.load(db)
+        fleet_allocator.load(db)
     finally:
         db.close()
+    event_hub.start()
+    if BOOKING_GROUP_COMMIT:
+        booking_queue.start()
+    if LIFECYCLE_SCHEDULER:
+        lifecycle_scheduler.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await lifecycle_scheduler.stop()
+    await booking_queue.stop()
+    await event_hub.stop()
+    await async_engine.dispose()
 
 
 # Pydantic I/O models (thin)
@@ -92,45 +138,105 @@ class BookIn(BaseModel):
     end_date: str  # "YYYY-MM-DD"
 
 
+class BookCategoryIn(BaseModel):
+    category: str
+    user_id: int
+    start_date: str  # "YYYY-MM-DD"
+    end_date: str  # "YYYY-MM-DD"
+
+
+class BatchItemIn(BaseModel):
+    car_id: int
+    start_date: str  # "YYYY-MM-DD"
+    end_date: str  # "YYYY-MM-DD"
+
+
+class BatchBookIn(BaseModel):
+    user_id: int
+    items: List[BatchItemIn]
+    all_or_nothing: bool = True  # False: book what can be booked, report the rest
+
+
+MAX_BATCH_ITEMS = 500
+# Cars tried for one book-by-category request before giving up
+MAX_CATEGORY_ATTEMPTS = 5
+# Uploaded import files are buffered in memory up to this size, then on disk
+IMPORT_SPOOL_BYTES = 8 * 1024 * 1024
+
+
+def parse_range(start_date: str, end_date: str) -> Tuple[date, date]:
+    """Parse a YYYY-MM-DD date range, raising ValueError with a client-facing message."""
+    try:
+        s = date.fromisoformat(start_date)
+        e = date.fromisoformat(end_date)
+    except Exception:
+        raise ValueError("Invalid dates")
+    if e < s:
+        raise ValueError("End date must be >= start date")
+    return s, e
+
+
+def booking_error_status(ex: ValueError) -> int:
+    if isinstance(ex, CarNotFound):
+        return 404
+    if isinstance(ex, ReservationOverlap):
+        return 409
+    return 400
+
+
 def user_to_dict(u: User) -> Dict[str, object]:
-    uid = getattr(u, "id", getattr(u, "user_id", None))
     return {
-        "id": uid,
-        "name": getattr(u, "name", ""),
-        "email": getattr(u, "email", ""),
-        "license_number": getattr(u, "license_number", ""),
+        "id": u.id,
+        "name": u.name,
+        "email": u.email,
+        "license_number": u.license_number,
     }
 
 
-def car_to_dict(c: Car, category: str = "") -> Dict[str, object]:
+def not_modified(request: Request, headers: Dict[str, str]) -> Optional[Response]:
+    """A 304 response if the client's If-None-Match covers the ETag in ``headers``."""
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return None
+
+
+def car_to_dict(c: Car) -> Dict[str, object]:
     return {
         "id": c.id,
         "make": c.make,
         "model": c.model,
         "year": c.year,
         "status": c.status,
-        "category": category,
+        "category": c.category,
     }
 
 
 def res_to_dict(r: Reservation) -> Dict[str, object]:
     return {
         "car_id": r.car_id,
-        "vehicle_type": getattr(r, "vehicle_type", ""),
+        "vehicle_type": r.vehicle_type,
         "start_date": r.start_date,
         "end_date": r.end_date,
         "status": r.status,
     }
 
 
+async def require_admin(admin_id: int = Query(...), db: AsyncSession = Depends(get_async_db)) -> User:
+    """Dependency for admin endpoints: ``admin_id`` must be a user with the admin role."""
+    u = await AsyncDatabaseUserStore(db).get_by_id(admin_id)
+    if not u or u.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return u
+
+
 # Endpoints
 
 
 @app.post("/api/register")
-def api_register(payload: RegisterIn, db: Session = Depends(get_db)):
+async def api_register(payload: RegisterIn, db: AsyncSession = Depends(get_async_db)):
     try:
-        user_store = DatabaseUserStore(db)
-        u = user_store.register(
+        user_store = AsyncDatabaseUserStore(db)
+        u = await user_store.register(
             payload.name, payload.email, payload.license_number, payload.password
         )
         return {"ok": True, "user": user_to_dict(u)}
@@ -139,58 +245,91 @@ def api_register(payload: RegisterIn, db: Session = Depends(get_db)):
 
 
 @app.post("/api/login")
-def api_login(payload: LoginIn, db: Session = Depends(get_db)):
-    user_store = DatabaseUserStore(db)
-    u = user_store.login(payload.email, payload.password)
+async def api_login(payload: LoginIn, db: AsyncSession = Depends(get_async_db)):
+    user_store = AsyncDatabaseUserStore(db)
+    u = await user_store.login(payload.email, payload.password)
     if not u:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     return {"ok": True, "user": user_to_dict(u)}
 
 
 @app.get("/api/cars")
-def api_cars(q: str = Query(default=""), category: str = Query(default="All"), db: Session = Depends(get_db)):
-    fleet_store = DatabaseFleetStore(db)
-    cars = fleet_store.search(q, category)
-    # Get categories for each car
-    result = []
-    for c in cars:
-        car_category = fleet_store.get_category(c.id) or ""
-        result.append(car_to_dict(c, car_category))
-    return result
+async def api_cars(
+    request: Request,
+    q: str = Query(default=""),
+    category: str = Query(default="All"),
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(default=None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    # Taken before the query runs, so a change committed meanwhile gets a new tag
+    headers = {"ETag": fleet_etag(q, category, limit, cursor), "Cache-Control": "no-cache"}
+    unchanged = not_modified(request, headers)
+    if unchanged:
+        return unchanged
+    fleet_store = AsyncDatabaseFleetStore(db)
+    if limit is None and cursor is None:
+        cars = await fleet_store.search(q, category)
+        return FastJSONResponse([car_to_dict(c) for c in cars], headers=headers)
+    # Paged: the next page's cursor goes in the X-Next-Cursor header
+    try:
+        cars, next_cursor = await fleet_store.search_page(q, category, limit or DEFAULT_PAGE_SIZE, cursor)
+    except ValueError as ex:
+        raise HTTPException(status_code=400, detail=str(ex))
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    return FastJSONResponse([car_to_dict(c) for c in cars], headers=headers)
+
+
+@app.get("/api/availability")
+async def api_availability(
+    start_date: str = Query(...),
+    end_date: str = Query(...),
+    q: str = Query(default=""),
+    category: str = Query(default="All"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    try:
+        s, e = parse_range(start_date, end_date)
+    except ValueError as ex:
+        raise HTTPException(status_code=400, detail=str(ex))
+    fleet_store = AsyncDatabaseFleetStore(db)
+    # Any car in service can be booked; its reservations decide which dates are free
+    cars = [c for c in await fleet_store.search(q, category) if c.status in IN_SERVICE_STATUSES]
+    free_ids = fleet_availability.free_car_ids([c.id for c in cars], s, e)
+    if free_ids is None:
+        busy = await AsyncDatabaseReservationStore(db).busy_car_ids(s, e)
+        free_ids = [c.id for c in cars if c.id not in busy]
+    free = set(free_ids)
+    return FastJSONResponse([car_to_dict(c) for c in cars if c.id in free])
 
 
 @app.post("/api/book")
-def api_book(payload: BookIn, db: Session = Depends(get_db)):
-    user_store = DatabaseUserStore(db)
-    fleet_store = DatabaseFleetStore(db)
-    res_store = DatabaseReservationStore(db)
+async def api_book(payload: BookIn, db: AsyncSession = Depends(get_async_db)):
+    user_store = AsyncDatabaseUserStore(db)
+    fleet_store = AsyncDatabaseFleetStore(db)
+    res_store = AsyncDatabaseReservationStore(db)
     
     # validate user
-    u = user_store.get_by_id(payload.user_id)
+    u = await user_store.get_by_id(payload.user_id)
     if not u:
         raise HTTPException(status_code=404, detail="User not found")
     # validate car
-    c = fleet_store.get_car(payload.car_id)
+    c = await fleet_store.get_car(payload.car_id)
     if not c:
         raise HTTPException(status_code=404, detail="Car not found")
-    if c.status != "available":
+    if c.status not in IN_SERVICE_STATUSES:
         raise HTTPException(status_code=400, detail="Car not available")
     # check dates
     try:
-        s = date.fromisoformat(payload.start_date)
-        e = date.fromisoformat(payload.end_date)
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid dates")
-    if e < s:
-        raise HTTPException(status_code=400, detail="End date must be >= start date")
-    # overlap check
-    if res_store.overlaps(c.id, s, e):
-        raise HTTPException(status_code=409, detail="Overlapping reservation")
+        s, e = parse_range(payload.start_date, payload.end_date)
+    except ValueError as ex:
+        raise HTTPException(status_code=400, detail=str(ex))
     # create reservation
     r = Reservation(
-        vehicle_type=fleet_store.get_category(c.id) or "Unknown",
+        vehicle_type=c.category or "Unknown",
         car_id=c.id,
-        user_id=user_to_dict(u)["id"],  # type: ignore[arg-type]
+        user_id=u.id,
         start_date=s.isoformat(),
         end_date=e.isoformat(),
         status="reserved",
@@ -201,13 +340,287 @@ def api_book(payload: BookIn, db: Session = Depends(get_db)):
         if not hasattr(u, "reservations"):
             setattr(u, "reservations", [])
         u.reservations.append(r)  # type: ignore[attr-defined]
-    res_store.add(r)
-    fleet_store.set_status(c.id, "reserved")
+    # overlap check, insert and status change commit together (batched with
+    # other bookings when group commit is on)
+    try:
+        if booking_queue.running:
+            await booking_queue.book(r)
+        else:
+            await res_store.book(r)
+    except (CarUnavailable, ReservationOverlap) as ex:
+        raise HTTPException(status_code=booking_error_status(ex), detail=str(ex))
     return {"ok": True}
 
 
+@app.post("/api/book/category")
+async def api_book_category(payload: BookCategoryIn, db: AsyncSession = Depends(get_async_db)):
+    """Book any car of ``category`` for the dates; the server picks the car.
+
+    The allocator offers the car whose free gap fits the dates most tightly
+    and holds those days for this request. If the database then disagrees
+    (the car went out of service, or another worker booked it), the hold is
+    dropped, the allocator's view of the car corrected and the next car tried.
+    """
+    user_store = AsyncDatabaseUserStore(db)
+    res_store = AsyncDatabaseReservationStore(db)
+
+    u = await user_store.get_by_id(payload.user_id)
+    if not u:
+        raise HTTPException(status_code=404, detail="User not found")
+    try:
+        s, e = parse_range(payload.start_date, payload.end_date)
+    except ValueError as ex:
+        raise HTTPException(status_code=400, detail=str(ex))
+    if s < date.today():
+        raise HTTPException(status_code=400, detail="Start date must not be in the past")
+
+    tried: List[int] = []
+    for _ in range(MAX_CATEGORY_ATTEMPTS):
+        car_id = fleet_allocator.allocate(payload.category, s, e, exclude=tried)
+        if car_id is None:
+            break
+        tried.append(car_id)
+        r = Reservation(
+            vehicle_type=payload.category,
+            car_id=car_id,
+            user_id=u.id,
+            start_date=s.isoformat(),
+            end_date=e.isoformat(),
+            status="reserved",
+        )
+        try:
+            error = (await res_store.book_many([r]))[0]
+        except Exception:
+            fleet_allocator.release(car_id, s, e)
+            raise
+        if error is None:
+            return {"ok": True, "car_id": car_id}
+        fleet_allocator.release(car_id, s, e)
+        if isinstance(error, ReservationOverlap):
+            held = await res_store.held_spans(car_id, fleet_allocator.origin)
+            fleet_allocator.track(car_id, payload.category, held)
+        else:
+            fleet_allocator.forget(car_id)
+    raise HTTPException(status_code=409, detail=f"No {payload.category} car is free for those dates")
+
+
+@app.post("/api/book/batch")
+async def api_book_batch(payload: BatchBookIn, db: AsyncSession = Depends(get_async_db)):
+    if not payload.items:
+        raise HTTPException(status_code=400, detail="No items to book")
+    if len(payload.items) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_ITEMS} items per batch")
+    user_store = AsyncDatabaseUserStore(db)
+    res_store = AsyncDatabaseReservationStore(db)
+
+    u = await user_store.get_by_id(payload.user_id)
+    if not u:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    results: List[Dict[str, object]] = []
+    pending: List[Tuple[int, Reservation]] = []
+    for item in payload.items:
+        result: Dict[str, object] = {
+            "car_id": item.car_id,
+            "start_date": item.start_date,
+            "end_date": item.end_date,
+            "ok": False,
+            "status_code": 400,
+            "detail": None,
+        }
+        try:
+            s, e = parse_range(item.start_date, item.end_date)
+        except ValueError as ex:
+            result["detail"] = str(ex)
+        else:
+            # vehicle_type is filled in from the car row when booked
+            pending.append((len(results), Reservation(
+                vehicle_type="",
+                car_id=item.car_id,
+                user_id=u.id,
+                start_date=s.isoformat(),
+                end_date=e.isoformat(),
+                status="reserved",
+            )))
+        results.append(result)
+
+    invalid = len(pending) < len(results)
+    if pending and not (payload.all_or_nothing and invalid):
+        errors = await res_store.book_many([r for _, r in pending], payload.all_or_nothing)
+        failed = any(errors)
+        for (i, _), error in zip(pending, errors):
+            if error:
+                results[i].update(status_code=booking_error_status(error), detail=str(error))
+            elif payload.all_or_nothing and failed:
+                results[i].update(status_code=409, detail="Not booked: another item in the batch failed")
+            else:
+                results[i].update(ok=True, status_code=200)
+    if payload.all_or_nothing and invalid:
+        for i, _ in pending:
+            results[i].update(status_code=409, detail="Not booked: another item in the batch failed")
+
+    booked = sum(1 for r in results if r["ok"])
+    return {"ok": booked == len(results), "booked": booked, "results": results}
+
+
 @app.get("/api/my-reservations")
-def api_my_reservations(user_id: int = Query(...), db: Session = Depends(get_db)):
-    res_store = DatabaseReservationStore(db)
-    rows = res_store.for_user(user_id)
-    return [res_to_dict(r) for r in rows]
+async def api_my_reservations(
+    request: Request,
+    user_id: int = Query(...),
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(default=None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    headers = {"ETag": reservations_etag(user_id, limit, cursor), "Cache-Control": "private, no-cache"}
+    unchanged = not_modified(request, headers)
+    if unchanged:
+        return unchanged
+    res_store = AsyncDatabaseReservationStore(db)
+    if limit is None and cursor is None:
+        rows = await res_store.for_user(user_id)
+        return FastJSONResponse([res_to_dict(r) for r in rows], headers=headers)
+    try:
+        rows, next_cursor = await res_store.for_user_page(user_id, limit or DEFAULT_PAGE_SIZE, cursor)
+    except ValueError as ex:
+        raise HTTPException(status_code=400, detail=str(ex))
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    return FastJSONResponse([res_to_dict(r) for r in rows], headers=headers)
+
+
+@app.get("/api/events")
+async def api_events(types: Optional[str] = Query(default=None)):
+    """Server-sent events for car status changes and new reservations, as they commit.
+
+    ``types`` is a comma-separated filter (e.g. ``car.status``). A client that
+    falls more than EVENT_BUFFER events behind gets a final ``dropped`` event
+    and should refetch what it shows before reconnecting.
+    """
+    wanted = [t for t in types.split(",") if t] if types else None
+    return StreamingResponse(
+        sse_stream(event_hub, wanted, EVENT_HEARTBEAT_SECONDS),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/api/cache-stats")
+async def api_cache_stats():
+    return catalog_cache.stats()
+
+
+@app.get("/api/admission-stats")
+async def api_admission_stats():
+    """Write slots in use, queue depth and delay, and admitted/shed request counts."""
+    return admission.stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Request and database metrics of this worker process, in Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/debug/profiles", include_in_schema=False)
+async def debug_profiles(admin: User = Depends(require_admin)):
+    """Most recent request profiles, newest first (needs PROFILING_ENABLED=1)."""
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    return profile_store.summaries()
+
+
+@app.get("/debug/profiles/{profile_id}", include_in_schema=False)
+async def debug_profile(profile_id: str, admin: User = Depends(require_admin)):
+    """One profile: cProfile stats by cumulative time plus the SQL the request ran."""
+    record = profile_store.get(profile_id) if PROFILING_ENABLED else None
+    if record is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return record
+
+
+@app.post("/api/admin/cars/import")
+async def api_admin_import_cars(
+    request: Request,
+    format: Optional[str] = Query(default=None, pattern="^(csv|ndjson)$"),
+    chunk_size: int = Query(default=DEFAULT_CHUNK_SIZE, ge=1, le=10_000),
+    upsert: bool = Query(default=True),
+    admin: User = Depends(require_admin),
+):
+    """Bulk import cars from a CSV or NDJSON request body; returns the per-row report."""
+    fmt = format or format_for(content_type=request.headers.get("content-type"))
+    with SpooledTemporaryFile(max_size=IMPORT_SPOOL_BYTES) as body:
+        async for chunk in request.stream():
+            body.write(chunk)
+        body.seek(0)
+        # The import runs on a sync session, chunk by chunk, off the event loop
+        return await run_in_threadpool(import_file, body, fmt, chunk_size, upsert)
+
+
+@app.get("/api/admin/analytics/utilization")
+async def api_admin_utilization(
+    start_date: Optional[str] = Query(default=None),
+    end_date: Optional[str] = Query(default=None),
+    category: Optional[str] = Query(default=None),
+    admin: User = Depends(require_admin),
+):
+    """Fleet occupancy per day and category, per-car booked days and idle cars.
+
+    Defaults to the DEFAULT_ANALYTICS_DAYS days up to and including today.
+    """
+    try:
+        end = end_date or date.today().isoformat()
+        if start_date is None:
+            start_date = (date.fromisoformat(end) - timedelta(days=DEFAULT_ANALYTICS_DAYS - 1)).isoformat()
+        s, e = parse_range(start_date, end)
+    except ValueError as ex:
+        raise HTTPException(status_code=400, detail=str(ex))
+    if category == "All":
+        category = None
+    try:
+        # NumPy work on a sync session, off the event loop
+        return await run_in_threadpool(fleet_utilization, s, e, category)
+    except ValueError as ex:
+        raise HTTPException(status_code=400, detail=str(ex))
+
+
+@app.get("/api/admin/reservations/export")
+async def api_admin_export_reservations(
+    format: str = Query(default="ndjson", pattern="^(ndjson|csv|columns)$"),
+    start_date: Optional[str] = Query(default=None),
+    end_date: Optional[str] = Query(default=None),
+    car_id: Optional[int] = Query(default=None),
+    category: Optional[str] = Query(default=None),
+    status: Optional[str] = Query(default=None),
+    chunk_size: int = Query(default=EXPORT_CHUNK_SIZE, ge=100, le=100_000),
+    admin: User = Depends(require_admin),
+):
+    """Stream reservations as NDJSON, CSV or columnar chunks, oldest first.
+
+    ``start_date``/``end_date`` keep reservations overlapping the range,
+    ``category`` matches the vehicle type booked and ``status`` is a
+    comma-separated list.
+    """
+    try:
+        s = date.fromisoformat(start_date) if start_date else None
+        e = date.fromisoformat(end_date) if end_date else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid dates")
+    if s and e and e < s:
+        raise HTTPException(status_code=400, detail="End date must be >= start date")
+    if category == "All":
+        category = None
+    # A sync generator on its own session; Starlette pulls each chunk in the threadpool
+    chunks = export_reservations(
+        format,
+        chunk_size,
+        start=s,
+        end=e,
+        car_id=car_id,
+        category=category,
+        statuses=[x for x in status.split(",") if x] if status else None,
+    )
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="reservations.{EXTENSIONS[format]}"'},
+    )
@@ -0,0 +1,277 @@
+from sqlalchemy import exists, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Optional, Set, Tuple
+from datetime import date
+from collections import defaultdict
+
+from .models import Car as DBCar, User as DBUser, Reservation as DBReservation, INACTIVE_STATUSES, IN_SERVICE_STATUSES
+from .allocation import fleet_allocator
+from .availability import fleet_availability
+from .database import async_write_gate, begin_write_async
+from .locks import async_car_locks
+from .cache import MISSING, catalog_cache, reservation_changes
+from .events import car_status_event, event_hub, reservation_event
+from .pagination import encode_cursor
+from .car import Car
+from .user import User
+from .reservation import Reservation
+from .db_services import (
+    RESERVATION_ORDER,
+    RESERVATION_READ_COLUMNS,
+    active_overlap_filters,
+    booking_events,
+    car_from_row,
+    car_page_statement,
+    car_search_statement,
+    car_sort_key,
+    check_bookings,
+    decode_car_cursor,
+    decode_reservation_cursor,
+    hash_password,
+    held_spans_statement,
+    reservation_from_row,
+    reservation_page_statement,
+    search_cache_key,
+    to_spans,
+    user_from_row,
+    uses_full_text,
+)
+
+# Async counterparts of the stores in db_services, used by the API endpoints.
+# They share their query building and row conversion with the sync stores.
+
+
+class AsyncDatabaseUserStore:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def register(self, name: str, email: str, license_number: str, password: str) -> User:
+        email = email.strip().lower()
+        existing_user = await self.db.scalar(select(DBUser).where(DBUser.email == email))
+        if existing_user:
+            raise ValueError("Email already registered")
+
+        db_user = DBUser(
+            name=name,
+            email=email,
+            license_number=license_number,
+            password_hash=hash_password(password)
+        )
+        self.db.add(db_user)
+        await self.db.commit()
+        await self.db.refresh(db_user)
+        return user_from_row(db_user)
+
+    async def login(self, email: str, password: str) -> Optional[User]:
+        db_user = await self.db.scalar(select(DBUser).where(
+            DBUser.email == email.strip().lower(),
+            DBUser.password_hash == hash_password(password)
+        ))
+        return user_from_row(db_user) if db_user else None
+
+    async def get_by_id(self, user_id: int) -> Optional[User]:
+        db_user = await self.db.get(DBUser, user_id)
+        return user_from_row(db_user) if db_user else None
+
+
+class AsyncDatabaseFleetStore:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def add(self, car: Car, category: str) -> None:
+        db_car = DBCar(
+            id=car.id,
+            make=car.make,
+            model=car.model,
+            year=car.year,
+            status=car.status,
+            category=category
+        )
+        self.db.add(db_car)
+        await self.db.commit()
+        catalog_cache.invalidate_cars([car.id])
+        if car.status in IN_SERVICE_STATUSES:
+            fleet_allocator.track(db_car.id, category)
+
+    async def search(self, q: str = "", category: Optional[str] = None) -> List[Car]:
+        key = search_cache_key(q, category)
+        cached = catalog_cache.get_search(key)
+        if cached is not None:
+            return list(cached)
+        version = catalog_cache.version
+
+        rows = await self.db.execute(
+            car_search_statement(q, category, uses_full_text(self.db.get_bind()))
+        )
+        cars = [car_from_row(row) for row in rows]
+        catalog_cache.set_search(key, cars, version)
+        return list(cars)
+
+    async def search_page(
+        self, q: str = "", category: Optional[str] = None, limit: int = 50, cursor: Optional[str] = None
+    ) -> Tuple[List[Car], Optional[str]]:
+        """See DatabaseFleetStore.search_page."""
+        after = decode_car_cursor(cursor)
+        key = search_cache_key(q, category) + (limit, cursor)
+        cached = catalog_cache.get_search(key)
+        if cached is not None:
+            return list(cached[0]), cached[1]
+        version = catalog_cache.version
+
+        rows = await self.db.execute(
+            car_page_statement(q, category, uses_full_text(self.db.get_bind()), limit, after)
+        )
+        cars = [car_from_row(row) for row in rows]
+        page = cars[:limit]
+        next_cursor = encode_cursor(car_sort_key(page[-1])) if len(cars) > limit else None
+        catalog_cache.set_search(key, (page, next_cursor), version)
+        return list(page), next_cursor
+
+    async def set_status(self, car_id: int, status: str) -> None:
+        result = await self.db.execute(update(DBCar).where(DBCar.id == car_id).values(status=status))
+        if not result.rowcount:
+            await self.db.rollback()
+            return  # no such car
+        await self.db.commit()
+        catalog_cache.invalidate_cars([car_id])
+        if status not in IN_SERVICE_STATUSES:
+            fleet_allocator.forget(car_id)
+        elif fleet_allocator.loaded and car_id not in fleet_allocator:
+            # Back in service: offer it to category bookings again
+            category = await self.get_category(car_id)
+            held = await AsyncDatabaseReservationStore(self.db).held_spans(car_id, fleet_allocator.origin)
+            fleet_allocator.track(car_id, category, held)
+        event_hub.publish(car_status_event(car_id, status))
+
+    async def get_car(self, car_id: int) -> Optional[Car]:
+        cached = catalog_cache.get_car(car_id)
+        if cached is not MISSING:
+            return cached
+        version = catalog_cache.version
+
+        db_car = await self.db.get(DBCar, car_id)
+        car = car_from_row(db_car) if db_car else None
+        catalog_cache.set_car(car_id, car, version)
+        return car
+
+    async def get_category(self, car_id: int) -> Optional[str]:
+        car = await self.get_car(car_id)
+        return car.category if car else None
+
+
+class AsyncDatabaseReservationStore:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def add(self, r: Reservation) -> None:
+        self.db.add(DBReservation(
+            vehicle_type=r.vehicle_type,
+            car_id=r.car_id,
+            user_id=r.user_id,
+            start_date=date.fromisoformat(r.start_date),
+            end_date=date.fromisoformat(r.end_date),
+            status=r.status
+        ))
+        await self.db.commit()
+        reservation_changes.bump()
+        if r.status not in INACTIVE_STATUSES:
+            start, end = date.fromisoformat(r.start_date), date.fromisoformat(r.end_date)
+            fleet_availability.reserve(r.car_id, start, end)
+            fleet_allocator.reserve(r.car_id, start, end)
+        event_hub.publish(reservation_event(r.car_id, r.start_date, r.end_date, r.status))
+
+    async def book(self, r: Reservation) -> None:
+        """See DatabaseReservationStore.book."""
+        error = (await self.book_many([r]))[0]
+        if error:
+            raise error
+
+    async def book_many(
+        self,
+        reservations: List[Reservation],
+        all_or_nothing: bool = True,
+        bookable: Tuple[str, ...] = IN_SERVICE_STATUSES,
+    ) -> List[Optional[ValueError]]:
+        """See DatabaseReservationStore.book_many."""
+        if not reservations:
+            return []
+        spans = to_spans(reservations)
+        car_ids = {r.car_id for r in reservations}
+        async with async_car_locks.for_keys(car_ids), async_write_gate(self.db):
+            try:
+                await begin_write_async(self.db)
+                db_cars = {
+                    db_car.id: db_car
+                    for db_car in await self.db.scalars(
+                        select(DBCar)
+                        .where(DBCar.id.in_(car_ids))
+                        .with_for_update()
+                        .execution_options(populate_existing=True)
+                    )
+                }
+                held: Dict[int, List[Tuple[date, date]]] = defaultdict(list)
+                rows = await self.db.execute(
+                    select(DBReservation.car_id, DBReservation.start_date, DBReservation.end_date)
+                    .where(
+                        DBReservation.car_id.in_(car_ids),
+                        *active_overlap_filters(min(s for _, s, _ in spans), max(e for _, _, e in spans)),
+                    )
+                )
+                for car_id, res_start, res_end in rows:
+                    held[car_id].append((res_start, res_end))
+
+                errors, booked = check_bookings(spans, db_cars, held, bookable)
+                if all_or_nothing and any(errors):
+                    await self.db.rollback()
+                    return errors
+                self.db.add_all(booked)
+                await self.db.commit()
+            except Exception:
+                await self.db.rollback()
+                raise
+        for b in booked:
+            fleet_availability.reserve(b.car_id, b.start_date, b.end_date)
+            fleet_allocator.reserve(b.car_id, b.start_date, b.end_date)
+        if booked:
+            reservation_changes.bump()
+            catalog_cache.invalidate_cars({b.car_id for b in booked})
+            event_hub.publish(*booking_events([(b.car_id, b.start_date, b.end_date, b.status) for b in booked]))
+        return errors
+
+    async def for_user(self, user_id: int) -> List[Reservation]:
+        rows = await self.db.execute(
+            select(*RESERVATION_READ_COLUMNS)
+            .where(DBReservation.user_id == user_id)
+            .order_by(*RESERVATION_ORDER)
+        )
+        return [reservation_from_row(row) for row in rows]
+
+    async def for_user_page(
+        self, user_id: int, limit: int = 50, cursor: Optional[str] = None
+    ) -> Tuple[List[Reservation], Optional[str]]:
+        """See DatabaseReservationStore.for_user_page."""
+        rows = (await self.db.execute(
+            reservation_page_statement(user_id, limit, decode_reservation_cursor(cursor))
+        )).all()
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = encode_cursor([last.start_date.isoformat(), last.id])
+        return [reservation_from_row(row) for row in rows[:limit]], next_cursor
+
+    async def overlaps(self, car_id: int, start: date, end: date) -> bool:
+        return await self.db.scalar(
+            select(exists().where(DBReservation.car_id == car_id, *active_overlap_filters(start, end)))
+        )
+
+    async def held_spans(self, car_id: int, since: date) -> List[Tuple[date, date]]:
+        """(start, end) of every active reservation of ``car_id`` ending on or after ``since``."""
+        rows = await self.db.execute(held_spans_statement(car_id, since))
+        return [(start, end) for start, end in rows]
+
+    async def busy_car_ids(self, start: date, end: date) -> Set[int]:
+        """IDs of all cars holding a reservation that overlaps ``start``..``end``."""
+        rows = await self.db.scalars(
+            select(DBReservation.car_id).where(*active_overlap_filters(start, end)).distinct()
+        )
+        return set(rows)
@@ -0,0 +1,143 @@
+import threading
+from datetime import date
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from .models import Car as DBCar, Reservation as DBReservation, INACTIVE_STATUSES
+
+
+class AvailabilityIndex:
+    """In-memory day bitmaps of which cars are booked on which days.
+
+    Each car gets one row of packed bits (bit i = day origin + i), built from the
+    reservations table at startup and updated as new reservations are committed.
+    Checking the whole fleet for a date range is then one bitwise AND over a
+    (cars x bytes) array instead of an overlap query per car.
+
+    The index only knows about bookings made through this process; /api/book
+    still runs the authoritative overlap check.
+    """
+
+    def __init__(self, horizon_days: int = 730) -> None:
+        self.horizon_days = horizon_days
+        self.origin: Optional[date] = None
+        self._lock = threading.Lock()
+        self._rows: Dict[int, int] = {}
+        self._bits = np.zeros((0, 0), dtype=np.uint8)
+
+    @property
+    def loaded(self) -> bool:
+        return self.origin is not None
+
+    @property
+    def n_days(self) -> int:
+        return self._bits.shape[1] * 8
+
+    def load(self, db: Session, origin: Optional[date] = None) -> None:
+        """Rebuild the bitmaps from the database.
+
+        Reservations that ended before ``origin`` (default: today) are skipped;
+        queries starting before it are not answered by the index.
+        """
+        origin = origin or date.today()
+        car_ids = [cid for (cid,) in db.query(DBCar.id).order_by(DBCar.id)]
+        rows = {cid: i for i, cid in enumerate(car_ids)}
+
+        res_rows: List[int] = []
+        res_start: List[int] = []
+        res_end: List[int] = []
+        query = db.query(
+            DBReservation.car_id, DBReservation.start_date, DBReservation.end_date
+        ).filter(
+            DBReservation.end_date >= origin,
+            DBReservation.status.notin_(INACTIVE_STATUSES),
+        )
+        for car_id, start, end in query.yield_per(50_000):
+            row = rows.get(car_id)
+            if row is None:
+                continue
+            res_rows.append(row)
+            res_start.append(max((start - origin).days, 0))
+            res_end.append((end - origin).days)
+
+        n_days = max(self.horizon_days, max(res_end, default=-1) + 1)
+        n_days = -(-n_days // 8) * 8
+
+        # Difference array per car: +1 on the first booked day, -1 after the last
+        diff = np.zeros((len(car_ids), n_days + 1), dtype=np.int32)
+        np.add.at(diff, (np.array(res_rows, dtype=np.intp), np.array(res_start, dtype=np.intp)), 1)
+        np.add.at(diff, (np.array(res_rows, dtype=np.intp), np.array(res_end, dtype=np.intp) + 1), -1)
+        booked = np.cumsum(diff, axis=1)[:, :n_days] > 0
+        bits = np.packbits(booked, axis=1, bitorder="little")
+
+        with self._lock:
+            self.origin = origin
+            self._rows = rows
+            self._bits = bits
+
+    def reserve(self, car_id: int, start: date, end: date) -> None:
+        """Mark ``car_id`` as booked from ``start`` to ``end`` inclusive."""
+        if not self.loaded:
+            return
+        with self._lock:
+            s = max((start - self.origin).days, 0)
+            e = (end - self.origin).days
+            if e < 0:
+                return
+            if e >= self.n_days:
+                self._grow(e + 1)
+            row = self._rows.get(car_id)
+            if row is None:
+                row = len(self._rows)
+                self._rows[car_id] = row
+                self._bits = np.vstack(
+                    [self._bits, np.zeros((1, self._bits.shape[1]), dtype=np.uint8)]
+                )
+            b0, b1 = s // 8, e // 8
+            self._bits[row, b0:b1 + 1] |= self._range_mask(s, e)
+
+    def free_car_ids(self, car_ids: Sequence[int], start: date, end: date) -> Optional[List[int]]:
+        """Return the subset of ``car_ids`` with no booking between ``start`` and ``end``.
+
+        Returns ``None`` when the index cannot answer (not loaded, or the range
+        starts before the index origin) so callers can fall back to the database.
+        """
+        if not self.loaded:
+            return None
+        with self._lock:
+            s = (start - self.origin).days
+            e = (end - self.origin).days
+            if s < 0:
+                return None
+            if s >= self.n_days or not car_ids:
+                return list(car_ids)
+            e = min(e, self.n_days - 1)
+            # Cars the index has never seen have no bookings
+            known = [cid for cid in car_ids if cid in self._rows]
+            if not known:
+                return list(car_ids)
+            rows = np.fromiter((self._rows[cid] for cid in known), dtype=np.intp, count=len(known))
+            b0, b1 = s // 8, e // 8
+            busy = (self._bits[rows, b0:b1 + 1] & self._range_mask(s, e)).any(axis=1)
+        busy_ids = {cid for cid, hit in zip(known, busy) if hit}
+        return [cid for cid in car_ids if cid not in busy_ids]
+
+    def _grow(self, n_days: int) -> None:
+        extra = -(-max(n_days - self.n_days, 365) // 8)
+        self._bits = np.hstack(
+            [self._bits, np.zeros((self._bits.shape[0], extra), dtype=np.uint8)]
+        )
+
+    @staticmethod
+    def _range_mask(s: int, e: int) -> np.ndarray:
+        """Packed mask with days ``s``..``e`` set, covering bytes ``s // 8``..``e // 8``."""
+        b0, b1 = s // 8, e // 8
+        days = np.zeros((b1 - b0 + 1) * 8, dtype=bool)
+        days[s - b0 * 8:e - b0 * 8 + 1] = True
+        return np.packbits(days, bitorder="little")
+
+
+# Shared by the API process; loaded at startup
+fleet_availability = AvailabilityIndex()
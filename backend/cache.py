@@ -0,0 +1,203 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional
+
+# Catalog cache settings, overridable through the environment
+CATALOG_CACHE_SIZE = int(os.environ.get("CATALOG_CACHE_SIZE", "1024"))
+CATALOG_CACHE_TTL = float(os.environ.get("CATALOG_CACHE_TTL", "30"))  # seconds
+# File appended to on every invalidation so other workers drop their copies too
+CATALOG_CACHE_SIGNAL_FILE = os.environ.get("CATALOG_CACHE_SIGNAL_FILE") or None
+# Shares reservation changes between processes the same way, next to the catalog signal file
+RESERVATION_SIGNAL_FILE = CATALOG_CACHE_SIGNAL_FILE + ".reservations" if CATALOG_CACHE_SIGNAL_FILE else None
+
+# Returned by CatalogCache.get_car for ids that are not cached (None means "no such car")
+MISSING = object()
+
+# The signal file is truncated once it grows past this many bytes
+SIGNAL_FILE_MAX_BYTES = 1 << 20
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire ``ttl`` seconds after being set."""
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, MISSING)
+            if entry is not MISSING and entry[0] > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not MISSING:
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class CatalogCache:
+    """Read-through cache for the car catalog used by the fleet stores.
+
+    Searches are cached by (search tokens, category) and single cars by id.
+    A change to any car drops that car's entry and every cached search, since
+    any of them might include it. ``version`` is bumped on every invalidation.
+
+    With a ``signal_file`` the invalidation is also broadcast to other worker
+    processes: each one appends a byte to the file, and every lookup compares
+    its size and mtime (one stat call) against the last values seen and clears
+    on change.
+    """
+
+    def __init__(
+        self, maxsize: int = 1024, ttl: float = 30.0, signal_file: Optional[str] = None
+    ) -> None:
+        self.searches = TTLCache(maxsize, ttl)
+        self.cars = TTLCache(maxsize * 4, ttl)
+        self.signal_file = signal_file
+        self.version = 0
+        self._seen_signal = self._read_signal()
+
+    def current_version(self) -> int:
+        """``version`` after picking up invalidations signalled by other workers."""
+        self._check_signal()
+        return self.version
+
+    def get_search(self, key: Hashable) -> Any:
+        self._check_signal()
+        return self.searches.get(key)
+
+    def set_search(self, key: Hashable, value: Any, version: Optional[int] = None) -> None:
+        """Cache a search result read at ``version``; dropped if the cars changed since."""
+        if version is None or version == self.version:
+            self.searches.set(key, value)
+
+    def get_car(self, car_id: int) -> Any:
+        self._check_signal()
+        return self.cars.get(car_id, MISSING)
+
+    def set_car(self, car_id: int, value: Any, version: Optional[int] = None) -> None:
+        if version is None or version == self.version:
+            self.cars.set(car_id, value)
+
+    def invalidate_cars(self, car_ids: Iterable[int]) -> None:
+        for car_id in car_ids:
+            self.cars.pop(car_id)
+        self.searches.clear()
+        self.version += 1
+        self._send_signal()
+
+    def clear(self) -> None:
+        self.searches.clear()
+        self.cars.clear()
+        self.version += 1
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "version": self.version,
+            "searches": self.searches.stats(),
+            "cars": self.cars.stats(),
+        }
+
+    def _read_signal(self) -> Optional[tuple]:
+        if not self.signal_file:
+            return None
+        try:
+            st = os.stat(self.signal_file)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _send_signal(self) -> None:
+        if not self.signal_file:
+            return
+        seen = self._read_signal()
+        if seen != self._seen_signal:
+            self.clear()  # another worker invalidated since our last lookup
+        mode = "w" if seen and seen[1] >= SIGNAL_FILE_MAX_BYTES else "a"
+        with open(self.signal_file, mode) as f:
+            f.write(".")
+        self._seen_signal = self._read_signal()
+
+    def _check_signal(self) -> None:
+        if not self.signal_file:
+            return
+        current = self._read_signal()
+        if current != self._seen_signal:
+            self._seen_signal = current
+            self.clear()
+
+
+class ChangeCounter:
+    """Counter bumped after every committed change to some kind of data.
+
+    ``value`` only counts this process's changes. With a ``signal_file`` each
+    bump also appends a byte to it, and current() folds the file's size and
+    mtime in, so changes made by other workers (or the lifecycle CLI) show too.
+    """
+
+    def __init__(self, signal_file: Optional[str] = None) -> None:
+        self.value = 0
+        self.signal_file = signal_file
+        self._lock = threading.Lock()
+
+    def bump(self) -> None:
+        with self._lock:
+            self.value += 1
+            if self.signal_file:
+                seen = self._read_signal()
+                mode = "w" if seen and seen[1] >= SIGNAL_FILE_MAX_BYTES else "a"
+                with open(self.signal_file, mode) as f:
+                    f.write(".")
+
+    def current(self) -> tuple:
+        """A value that changes whenever this counter is bumped by any process sharing its file."""
+        return (self.value, self._read_signal())
+
+    def _read_signal(self) -> Optional[tuple]:
+        if not self.signal_file:
+            return None
+        try:
+            st = os.stat(self.signal_file)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+
+# Shared by all fleet stores in this process
+catalog_cache = CatalogCache(CATALOG_CACHE_SIZE, CATALOG_CACHE_TTL, CATALOG_CACHE_SIGNAL_FILE)
+# Bumped by the reservation stores after each commit that adds or changes reservations
+reservation_changes = ChangeCounter(RESERVATION_SIGNAL_FILE)
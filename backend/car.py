@@ -1,13 +1,18 @@
 class Car:
-    def __init__(self, id: int, make: str, model: str, year: int, status: str) -> None:
+    __slots__ = ("id", "make", "model", "year", "status", "category")
+
+    def __init__(
+        self, id: int, make: str, model: str, year: int, status: str, category: str = ""
+    ) -> None:
         self.id = id
         self.make = make
         self.model = model
         self.year = year
         self.status = status
+        self.category = category
 
     def __str__(self) -> str:
-        return f"ID: {self.id}\nMake: {self.make}\nModel: {self.model}\nYear: {self.year}\nStatus: {self.status}"
+        return f"ID: {self.id}\nMake: {self.make}\nModel: {self.model}\nYear: {self.year}\nStatus: {self.status}\nCategory: {self.category}"
 
     def updateStatus(self, status: str) -> None:
         self.status = status
@@ -19,4 +24,5 @@ class Car:
             "Model": self.model,
             "Year": self.year,
             "Status:": self.status,
+            "Category:": self.category,
         }
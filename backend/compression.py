@@ -0,0 +1,130 @@
+import gzip
+import os
+from typing import List, Optional, Tuple
+
+from .etags import with_coding
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only without it
+    brotli = None
+
+# Responses smaller than this are sent as they are
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", "5"))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", "4"))
+
+COMPRESSIBLE_TYPES = (b"application/json", b"text/")
+
+
+def choose_coding(accept_encoding: str) -> Optional[str]:
+    """Best coding the client accepts: br when available, then gzip."""
+    accepted = set()
+    for item in accept_encoding.lower().split(","):
+        coding, _, params = item.strip().partition(";")
+        if params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            accepted.add(coding.strip())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, coding: str) -> bytes:
+    if coding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing JSON/text responses of COMPRESS_MIN_BYTES or more.
+
+    Only single-message bodies are compressed; streamed responses pass through.
+    A compressed response's ETag gets a "-gzip"/"-br" suffix, so the strong tag
+    still identifies the exact bytes sent. Every JSON/text response gets
+    ``Vary: Accept-Encoding``, compressed or not, so shared caches keep the
+    plain and the encoded variants apart.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_BYTES) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        coding = None
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                coding = choose_coding(value.decode("latin-1"))
+                break
+
+        start_message = None
+
+        async def send_compressed(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message  # held until the body shows whether to compress
+                return
+            if start_message is None:
+                await send(message)
+                return
+            start, start_message = start_message, None
+            body = message.get("body", b"")
+            headers = start.get("headers", [])
+            if message.get("more_body") or not compressible(headers):
+                await send(start)
+                await send(message)
+                return
+            if coding is None or len(body) < self.minimum_size:
+                start["headers"] = vary_on_encoding(headers)
+                await send(start)
+                await send(message)
+                return
+            body = compress(body, coding)
+            start["headers"] = encoded_headers(headers, coding, len(body))
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
+
+
+def compressible(headers: List[Tuple[bytes, bytes]]) -> bool:
+    content_type = b""
+    for name, value in headers:
+        if name == b"content-encoding":
+            return False
+        if name == b"content-type":
+            content_type = value
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def vary_on_encoding(headers: List[Tuple[bytes, bytes]]) -> List[Tuple[bytes, bytes]]:
+    """``headers`` with Accept-Encoding added to (or as) the Vary header."""
+    out = []
+    vary = None
+    for name, value in headers:
+        if name == b"vary":
+            vary = value
+            continue
+        out.append((name, value))
+    if vary and b"accept-encoding" in vary.lower():
+        out.append((b"vary", vary))
+    else:
+        out.append((b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"))
+    return out
+
+
+def encoded_headers(headers: List[Tuple[bytes, bytes]], coding: str, length: int) -> List[Tuple[bytes, bytes]]:
+    out = []
+    for name, value in headers:
+        if name == b"content-length":
+            continue
+        if name == b"etag":
+            value = with_coding(value.decode("latin-1"), coding).encode("latin-1")
+        out.append((name, value))
+    out.append((b"content-encoding", coding.encode()))
+    out.append((b"content-length", str(length).encode()))
+    return vary_on_encoding(out)
@@ -1,14 +1,116 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import asyncio
+import logging
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
 from .base import Base
+from .metrics import METRICS_ENABLED, TimedAsyncQueuePool, TimedQueuePool, metrics
+from .profiling import PROFILING_ENABLED, capture_statement
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./cars.db"
+logger = logging.getLogger(__name__)
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False},  # needed for SQLite with FastAPI
-)
+# Connection settings, overridable through the environment
+SQLALCHEMY_DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./cars.db")
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "1800"))  # seconds, -1 to disable
+# NORMAL skips the fsync on each WAL commit; FULL makes every commit durable
+SQLITE_SYNCHRONOUS = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL").upper()
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_SIZE_KB = int(os.environ.get("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_MMAP_SIZE_MB = int(os.environ.get("SQLITE_MMAP_SIZE_MB", "256"))
+
+# asyncio drivers for the sync URL's backend, used when ASYNC_DATABASE_URL is not set
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg", "mysql": "aiomysql"}
+
+
+def async_url_for(url: str) -> str:
+    """Same database as ``url`` through an asyncio driver."""
+    u = make_url(url)
+    driver = ASYNC_DRIVERS.get(u.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No async driver known for {u.get_backend_name()!r}; set ASYNC_DATABASE_URL")
+    return u.set(drivername=f"{u.get_backend_name()}+{driver}").render_as_string(hide_password=False)
+
+
+# Same database through an asyncio driver; used by the API endpoints
+ASYNC_DATABASE_URL = os.environ.get("ASYNC_DATABASE_URL") or async_url_for(SQLALCHEMY_DATABASE_URL)
+
+
+def engine_options(url: str) -> dict:
+    """create_engine() keyword arguments for ``url``."""
+    u = make_url(url)
+    options = {"pool_pre_ping": True}
+    if u.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}  # needed for SQLite with FastAPI
+        if u.database in (None, "", ":memory:"):
+            return options  # in-memory databases use a single shared connection
+    options.update(
+        # Queue pools that also time how long each checkout waits
+        poolclass=TimedAsyncQueuePool if u.get_dialect().is_async else TimedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+    return options
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Per-connection SQLite tuning.
+
+    WAL lets readers run alongside the single writer, NORMAL sync (the default
+    SQLITE_SYNCHRONOUS) is durable in WAL mode apart from the last transactions
+    before a power loss, and the busy timeout makes writers queue for the lock
+    instead of failing with "database is locked".
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE_MB * 1024 * 1024}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["statement_start"] = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """Count the statement and its time, globally and against the current request."""
+    start = conn.info.pop("statement_start", None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    if METRICS_ENABLED:
+        metrics.observe_statement(elapsed)
+    capture_statement(statement, elapsed)
+
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **engine_options(SQLALCHEMY_DATABASE_URL))
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL))
+
+for _engine in (engine, async_engine.sync_engine):
+    if _engine.dialect.name == "sqlite":
+        event.listen(_engine, "connect", set_sqlite_pragmas)
+    if METRICS_ENABLED or PROFILING_ENABLED:
+        event.listen(_engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(_engine, "after_cursor_execute", after_cursor_execute)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False: attribute refreshes after commit would need implicit async IO
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
 
 def get_db():
     db = SessionLocal()
@@ -17,10 +119,129 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def begin_write(db: Session):
+    """Start the session's transaction holding the database write lock.
+
+    On SQLite this issues BEGIN IMMEDIATE so the RESERVED lock is taken before
+    anything is read; other backends rely on SELECT ... FOR UPDATE row locks
+    taken by the caller.
+    """
+    conn = db.connection()
+    if conn.dialect.name == "sqlite" and not conn.connection.driver_connection.in_transaction:
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+async def begin_write_async(db: AsyncSession):
+    """Async counterpart of begin_write."""
+    conn = await db.connection()
+    if conn.dialect.name == "sqlite":
+        raw = await conn.get_raw_connection()
+        if not raw.driver_connection.in_transaction:
+            await conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+# SQLite allows one writer at a time. Writers in this process queue on these
+# (first come, first served) so only other processes go through busy_timeout.
+_sqlite_write_lock = threading.Lock()
+_async_sqlite_write_lock = asyncio.Lock()
+
+@contextmanager
+def write_gate(db: Session):
+    """Hold this process's SQLite writer slot for the duration of a write transaction."""
+    if db.get_bind().dialect.name != "sqlite":
+        yield
+        return
+    with _sqlite_write_lock:
+        yield
+
+@asynccontextmanager
+async def async_write_gate(db: AsyncSession):
+    """Async counterpart of write_gate."""
+    if db.get_bind().dialect.name != "sqlite":
+        yield
+        return
+    async with _async_sqlite_write_lock:
+        yield
+
 def create_tables():
     """Create all database tables"""
     Base.metadata.create_all(bind=engine)
+    create_missing_indexes()
+
+def create_missing_indexes():
+    """Add indexes declared on models after their table was first created.
+
+    create_all() only creates indexes together with a new table, so existing
+    databases would otherwise never get them.
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+def migrate_reservation_dates():
+    """Upgrade an existing reservations table from string dates to DATE columns.
+
+    Older cars.db files stored start_date/end_date as VARCHAR(20) with no index on
+    car_id. The table is rebuilt with the current schema (including the composite
+    car/date index) and rows are copied across with their dates normalized.
+    Rows whose dates cannot be parsed are moved, unchanged, to
+    ``reservations_unparsed`` and their ids logged, for someone to fix by hand.
+    """
+    inspector = inspect(engine)
+    if "reservations" not in inspector.get_table_names():
+        return
+    columns = {c["name"]: c["type"] for c in inspector.get_columns("reservations")}
+    if "VARCHAR" not in str(columns.get("start_date", "")).upper():
+        return  # Already migrated
+
+    from .models import Reservation as DBReservation
+
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE reservations RENAME TO reservations_old"))
+        # The old id index keeps its name after the rename; drop it so create() can reuse it
+        conn.execute(text("DROP INDEX IF EXISTS ix_reservations_id"))
+        DBReservation.__table__.create(bind=conn)
+        conn.execute(text(
+            "INSERT INTO reservations "
+            "(id, vehicle_type, car_id, user_id, start_date, end_date, status, created_at) "
+            "SELECT id, vehicle_type, car_id, user_id, date(start_date), date(end_date), status, created_at "
+            "FROM reservations_old "
+            "WHERE date(start_date) IS NOT NULL AND date(end_date) IS NOT NULL"
+        ))
+        unparsed = "date(start_date) IS NULL OR date(end_date) IS NULL"
+        bad_ids = conn.execute(
+            text(f"SELECT id FROM reservations_old WHERE {unparsed} ORDER BY id")
+        ).scalars().all()
+        if bad_ids:
+            conn.execute(text(
+                "CREATE TABLE IF NOT EXISTS reservations_unparsed AS SELECT * FROM reservations_old WHERE 0"
+            ))
+            conn.execute(text(f"INSERT INTO reservations_unparsed SELECT * FROM reservations_old WHERE {unparsed}"))
+            logger.warning(
+                "%d reservations with unparseable dates were moved to reservations_unparsed: ids %s",
+                len(bad_ids), ", ".join(map(str, bad_ids)),
+            )
+        conn.execute(text("DROP TABLE reservations_old"))
+
+def migrate_car_search_index():
+    """Create and fill the cars_fts full-text index for a cars table that predates it."""
+    inspector = inspect(engine)
+    tables = inspector.get_table_names()
+    if "cars" not in tables or "cars_fts" in tables:
+        return
+
+    from .models import CARS_FTS_DDL, CARS_FTS_POPULATE
+
+    with engine.begin() as conn:
+        for stmt in CARS_FTS_DDL:
+            conn.exec_driver_sql(stmt)
+        conn.exec_driver_sql(CARS_FTS_POPULATE)
 
 def init_db():
     """Initialize database with tables"""
-    create_tables()
\ No newline at end of file
+    if engine.dialect.name == "sqlite":
+        migrate_reservation_dates()
+        migrate_car_search_index()
+    create_tables()
@@ -1,14 +1,260 @@
+from sqlalchemy import Select, String, exists, select, tuple_
 from sqlalchemy.orm import Session
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Sequence, Set, Tuple
 from datetime import date
+from collections import defaultdict
 import hashlib
 import hashlib
+import re
 
-from .models import Car as DBCar, User as DBUser, Reservation as DBReservation
+from .models import (
+    Car as DBCar, User as DBUser, Reservation as DBReservation, INACTIVE_STATUSES, IN_SERVICE_STATUSES, cars_fts,
+)
+from .allocation import fleet_allocator
+from .availability import fleet_availability
+from .database import begin_write, write_gate
+from .locks import car_locks
+from .cache import MISSING, catalog_cache, reservation_changes
+from .events import car_status_event, event_hub, reservation_event
+from .pagination import decode_cursor, encode_cursor
 from .car import Car
 from .user import User
 from .reservation import Reservation
 
+class CarUnavailable(ValueError):
+    """The car does not exist or is not in the "available" state."""
+
+
+class CarNotFound(CarUnavailable):
+    """No car exists with the requested id."""
+
+
+class ReservationOverlap(ValueError):
+    """The car already has a reservation for some of the requested days."""
+
+
+def hash_password(password: str) -> str:
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+# Read paths select just these columns: plain rows, no ORM identity map or
+# instance state. The *_from_row helpers accept such rows as well as entities.
+CAR_READ_COLUMNS = (DBCar.id, DBCar.make, DBCar.model, DBCar.year, DBCar.status, DBCar.category)
+RESERVATION_READ_COLUMNS = (
+    DBReservation.id,
+    DBReservation.vehicle_type,
+    DBReservation.car_id,
+    DBReservation.user_id,
+    DBReservation.start_date,
+    DBReservation.end_date,
+    DBReservation.status,
+)
+
+
+def user_from_row(db_user: DBUser) -> User:
+    return User(
+        user_id=db_user.id,
+        name=db_user.name,
+        email=db_user.email,
+        license_number=db_user.license_number,
+        role=db_user.role
+    )
+
+
+def car_from_row(db_car: DBCar) -> Car:
+    return Car(
+        id=db_car.id,
+        make=db_car.make,
+        model=db_car.model,
+        year=db_car.year,
+        status=db_car.status,
+        category=db_car.category or ""
+    )
+
+
+def reservation_from_row(db_res: DBReservation) -> Reservation:
+    return Reservation(
+        vehicle_type=db_res.vehicle_type,
+        car_id=db_res.car_id,
+        user_id=db_res.user_id,
+        start_date=db_res.start_date.isoformat(),
+        end_date=db_res.end_date.isoformat(),
+        status=db_res.status
+    )
+
+
+CAR_SEARCH_ORDER = (DBCar.make, DBCar.model, DBCar.year, DBCar.id)
+
+
+def search_tokens(q: str) -> List[str]:
+    """Split a search box entry into lowercase word tokens ("Toy 202" -> ["toy", "202"])."""
+    return re.findall(r"\w+", q.lower())
+
+
+def search_cache_key(q: str = "", category: Optional[str] = None) -> tuple:
+    """Catalog cache key for a search; inputs that search the same way share it."""
+    return (tuple(search_tokens(q)), category or "All")
+
+
+def uses_full_text(bind) -> bool:
+    """Whether fleet searches on ``bind`` go through the cars_fts index."""
+    return bind.dialect.name == "sqlite"
+
+
+def car_search_statement(
+    q: str = "", category: Optional[str] = None, full_text: bool = True, ranked: bool = True
+) -> Select:
+    """SELECT of the CAR_READ_COLUMNS of the cars matching every token of ``q``
+    (as a prefix of make, model, year or id).
+
+    With ``full_text`` the tokens are matched through the cars_fts index and,
+    if ``ranked``, results are ordered by relevance first; otherwise each token
+    is an ILIKE filter.
+    """
+    stmt = select(*CAR_READ_COLUMNS)
+    if category and category != "All":
+        stmt = stmt.where(DBCar.category == category)
+    tokens = search_tokens(q)
+    if not tokens:
+        return stmt.order_by(*CAR_SEARCH_ORDER)
+    if full_text:
+        match = " ".join(f'"{token}"*' for token in tokens)
+        return (
+            stmt.join(cars_fts, cars_fts.c.rowid == DBCar.id)
+            .where(cars_fts.c.cars_fts.match(match))
+            .order_by(*((cars_fts.c.rank,) if ranked else ()), *CAR_SEARCH_ORDER)
+        )
+    for token in tokens:
+        search_term = f"%{token}%"
+        stmt = stmt.where(
+            (DBCar.make.ilike(search_term)) |
+            (DBCar.model.ilike(search_term)) |
+            (DBCar.year.cast(String).ilike(search_term)) |
+            (DBCar.id.cast(String).ilike(search_term))
+        )
+    return stmt.order_by(*CAR_SEARCH_ORDER)
+
+
+def car_page_statement(
+    q: str, category: Optional[str], full_text: bool, limit: int, after: Optional[Sequence] = None
+) -> Select:
+    """One keyset page of a fleet search, ordered on (make, model, year, id).
+
+    Pages are not relevance-ranked so the sort key stays stable between
+    requests. One extra row is fetched to tell whether another page follows.
+    """
+    stmt = car_search_statement(q, category, full_text, ranked=False)
+    if after is not None:
+        stmt = stmt.where(tuple_(*CAR_SEARCH_ORDER) > tuple_(*after))
+    return stmt.limit(limit + 1)
+
+
+def car_sort_key(car: Car) -> list:
+    return [car.make, car.model, car.year, car.id]
+
+
+def decode_car_cursor(cursor: Optional[str]) -> Optional[list]:
+    return decode_cursor(cursor, (str, str, int, int)) if cursor else None
+
+
+RESERVATION_ORDER = (DBReservation.start_date, DBReservation.id)
+
+
+def reservation_page_statement(user_id: int, limit: int, after: Optional[Sequence] = None) -> Select:
+    """One keyset page of a user's reservations, ordered on (start_date, id)."""
+    stmt = select(*RESERVATION_READ_COLUMNS).where(DBReservation.user_id == user_id)
+    if after is not None:
+        stmt = stmt.where(tuple_(*RESERVATION_ORDER) > tuple_(*after))
+    return stmt.order_by(*RESERVATION_ORDER).limit(limit + 1)
+
+
+def decode_reservation_cursor(cursor: Optional[str]) -> Optional[list]:
+    if not cursor:
+        return None
+    start, res_id = decode_cursor(cursor, (str, int))
+    try:
+        return [date.fromisoformat(start), res_id]
+    except ValueError:
+        raise ValueError("Invalid cursor")
+
+
+def active_overlap_filters(start: date, end: date) -> list:
+    """WHERE clauses for reservations that still hold their car on any day of ``start``..``end``."""
+    return [
+        DBReservation.start_date <= end,
+        DBReservation.end_date >= start,
+        DBReservation.status.notin_(INACTIVE_STATUSES),
+    ]
+
+
+def held_spans_statement(car_id: int, since: date) -> Select:
+    """(start, end) of every active reservation of ``car_id`` ending on or after ``since``."""
+    return select(DBReservation.start_date, DBReservation.end_date).where(
+        DBReservation.car_id == car_id,
+        DBReservation.end_date >= since,
+        DBReservation.status.notin_(INACTIVE_STATUSES),
+    )
+
+
+Span = Tuple[Reservation, date, date]
+
+
+def check_bookings(
+    spans: List[Span],
+    db_cars: Dict[int, DBCar],
+    held: Dict[int, List[Tuple[date, date]]],
+    bookable: Tuple[str, ...] = IN_SERVICE_STATUSES,
+) -> Tuple[List[Optional[ValueError]], List[DBReservation]]:
+    """Check each requested span in order against the loaded cars and held dates.
+
+    Only cars in a ``bookable`` status are accepted (by default every
+    in-service one, leaving the held dates to decide). Accepted items
+    mark an available car reserved and extend ``held`` so later items in the
+    same batch see them. Returns one error (or None) per span and the rows to
+    insert.
+    """
+    errors: List[Optional[ValueError]] = []
+    booked: List[DBReservation] = []
+    for r, start, end in spans:
+        db_car = db_cars.get(r.car_id)
+        if not db_car:
+            errors.append(CarNotFound("Car not found"))
+            continue
+        if db_car.status not in bookable:
+            errors.append(CarUnavailable("Car not available"))
+            continue
+        if any(not (end < res_start or res_end < start) for res_start, res_end in held[r.car_id]):
+            errors.append(ReservationOverlap("Overlapping reservation"))
+            continue
+        held[r.car_id].append((start, end))
+        if db_car.status == "available":
+            db_car.status = "reserved"
+        booked.append(DBReservation(
+            vehicle_type=r.vehicle_type or db_car.category or "Unknown",
+            car_id=r.car_id,
+            user_id=r.user_id,
+            start_date=start,
+            end_date=end,
+            status=r.status
+        ))
+        errors.append(None)
+    return errors, booked
+
+
+def booking_events(booked: List[Tuple[int, date, date, str]]) -> List[Dict[str, object]]:
+    """Events for committed bookings: each new reservation, then each car now reserved."""
+    events = [reservation_event(car_id, start, end, status) for car_id, start, end, status in booked]
+    events.extend(car_status_event(car_id, "reserved") for car_id in dict.fromkeys(b[0] for b in booked))
+    return events
+
+
+def to_spans(reservations: List[Reservation]) -> List[Span]:
+    return [
+        (r, date.fromisoformat(r.start_date), date.fromisoformat(r.end_date))
+        for r in reservations
+    ]
+
+
 class DatabaseUserStore:
     def __init__(self, db: Session):
         self.db = db
@@ -20,7 +266,7 @@ class DatabaseUserStore:
             raise ValueError("Email already registered")
         
         # Hash password
-        password_hash = hashlib.sha256(password.encode()).hexdigest()
+        password_hash = hash_password(password)
         
         # Create database user
         db_user = DBUser(
@@ -35,16 +281,10 @@ class DatabaseUserStore:
         self.db.refresh(db_user)
         
         # Convert to class-based model
-        return User(
-            user_id=db_user.id,
-            name=db_user.name,
-            email=db_user.email,
-            license_number=db_user.license_number,
-            role=db_user.role
-        )
+        return user_from_row(db_user)
 
     def login(self, email: str, password: str) -> Optional[User]:
-        password_hash = hashlib.sha256(password.encode()).hexdigest()
+        password_hash = hash_password(password)
         db_user = self.db.query(DBUser).filter(
             DBUser.email == email.strip().lower(),
             DBUser.password_hash == password_hash
@@ -53,26 +293,14 @@ class DatabaseUserStore:
         if not db_user:
             return None
             
-        return User(
-            user_id=db_user.id,
-            name=db_user.name,
-            email=db_user.email,
-            license_number=db_user.license_number,
-            role=db_user.role
-        )
+        return user_from_row(db_user)
 
     def get_by_id(self, user_id: int) -> Optional[User]:
         db_user = self.db.query(DBUser).filter(DBUser.id == user_id).first()
         if not db_user:
             return None
             
-        return User(
-            user_id=db_user.id,
-            name=db_user.name,
-            email=db_user.email,
-            license_number=db_user.license_number,
-            role=db_user.role
-        )
+        return user_from_row(db_user)
 
 
 class DatabaseFleetStore:
@@ -90,57 +318,77 @@ class DatabaseFleetStore:
         )
         self.db.add(db_car)
         self.db.commit()
+        catalog_cache.invalidate_cars([car.id])
+        if car.status in IN_SERVICE_STATUSES:
+            fleet_allocator.track(db_car.id, category)
 
     def search(self, q: str = "", category: Optional[str] = None) -> List[Car]:
-        query = self.db.query(DBCar)
-        
-        if category and category != "All":
-            query = query.filter(DBCar.category == category)
-        
-        if q.strip():
-            search_term = f"%{q.strip().lower()}%"
-            query = query.filter(
-                (DBCar.make.ilike(search_term)) |
-                (DBCar.model.ilike(search_term)) |
-                (DBCar.year.cast(str).ilike(search_term))
-            )
-        
-        db_cars = query.order_by(DBCar.make, DBCar.model, DBCar.year, DBCar.id).all()
+        key = search_cache_key(q, category)
+        cached = catalog_cache.get_search(key)
+        if cached is not None:
+            return list(cached)
+        version = catalog_cache.version
+
+        rows = self.db.execute(
+            car_search_statement(q, category, uses_full_text(self.db.get_bind()))
+        )
         
         # Convert to class-based models
-        return [
-            Car(
-                id=db_car.id,
-                make=db_car.make,
-                model=db_car.model,
-                year=db_car.year,
-                status=db_car.status
-            )
-            for db_car in db_cars
-        ]
+        cars = [car_from_row(row) for row in rows]
+        catalog_cache.set_search(key, cars, version)
+        return list(cars)
+
+    def search_page(
+        self, q: str = "", category: Optional[str] = None, limit: int = 50, cursor: Optional[str] = None
+    ) -> Tuple[List[Car], Optional[str]]:
+        """One page of search results and the cursor for the next page (None on the last).
+
+        Raises ValueError for a malformed cursor.
+        """
+        after = decode_car_cursor(cursor)
+        key = search_cache_key(q, category) + (limit, cursor)
+        cached = catalog_cache.get_search(key)
+        if cached is not None:
+            return list(cached[0]), cached[1]
+        version = catalog_cache.version
+
+        rows = self.db.execute(
+            car_page_statement(q, category, uses_full_text(self.db.get_bind()), limit, after)
+        )
+        cars = [car_from_row(row) for row in rows]
+        page = cars[:limit]
+        next_cursor = encode_cursor(car_sort_key(page[-1])) if len(cars) > limit else None
+        catalog_cache.set_search(key, (page, next_cursor), version)
+        return list(page), next_cursor
 
     def set_status(self, car_id: int, status: str) -> None:
         db_car = self.db.query(DBCar).filter(DBCar.id == car_id).first()
         if db_car:
             db_car.status = status
             self.db.commit()
+            catalog_cache.invalidate_cars([car_id])
+            if status not in IN_SERVICE_STATUSES:
+                fleet_allocator.forget(car_id)
+            elif fleet_allocator.loaded and car_id not in fleet_allocator:
+                # Back in service: offer it to category bookings again
+                held = self.db.execute(held_spans_statement(car_id, fleet_allocator.origin)).all()
+                fleet_allocator.track(car_id, db_car.category, held)
+            event_hub.publish(car_status_event(car_id, status))
 
     def get_car(self, car_id: int) -> Optional[Car]:
+        cached = catalog_cache.get_car(car_id)
+        if cached is not MISSING:
+            return cached
+        version = catalog_cache.version
+
         db_car = self.db.query(DBCar).filter(DBCar.id == car_id).first()
-        if not db_car:
-            return None
-            
-        return Car(
-            id=db_car.id,
-            make=db_car.make,
-            model=db_car.model,
-            year=db_car.year,
-            status=db_car.status
-        )
+        car = car_from_row(db_car) if db_car else None
+        catalog_cache.set_car(car_id, car, version)
+        return car
 
     def get_category(self, car_id: int) -> Optional[str]:
-        db_car = self.db.query(DBCar).filter(DBCar.id == car_id).first()
-        return db_car.category if db_car else None
+        car = self.get_car(car_id)
+        return car.category if car else None
 
 
 class DatabaseReservationStore:
@@ -152,41 +400,122 @@ class DatabaseReservationStore:
             vehicle_type=r.vehicle_type,
             car_id=r.car_id,
             user_id=r.user_id,
-            start_date=r.start_date,
-            end_date=r.end_date,
+            start_date=date.fromisoformat(r.start_date),
+            end_date=date.fromisoformat(r.end_date),
             status=r.status
         )
         self.db.add(db_reservation)
         self.db.commit()
+        reservation_changes.bump()
+        if r.status not in INACTIVE_STATUSES:
+            start, end = date.fromisoformat(r.start_date), date.fromisoformat(r.end_date)
+            fleet_availability.reserve(r.car_id, start, end)
+            fleet_allocator.reserve(r.car_id, start, end)
+        event_hub.publish(reservation_event(r.car_id, r.start_date, r.end_date, r.status))
+
+    def book(self, r: Reservation) -> None:
+        """Check and insert ``r`` and mark its car reserved in one write transaction.
+
+        Raises CarUnavailable or ReservationOverlap, leaving nothing written.
+        """
+        error = self.book_many([r])[0]
+        if error:
+            raise error
+
+    def book_many(
+        self,
+        reservations: List[Reservation],
+        all_or_nothing: bool = True,
+        bookable: Tuple[str, ...] = IN_SERVICE_STATUSES,
+    ) -> List[Optional[ValueError]]:
+        """Book several reservations in one write transaction.
+
+        Cars are loaded and existing overlaps fetched with one query each, then
+        every item is checked in order (so a car booked earlier in the batch is
+        no longer available to later items). Returns one entry per item: None
+        if booked, otherwise the CarUnavailable/ReservationOverlap that stopped
+        it. With ``all_or_nothing`` a single failure rolls back the whole batch.
+        ``bookable`` is the car statuses accepted (see check_bookings).
+        """
+        if not reservations:
+            return []
+        spans = to_spans(reservations)
+        car_ids = {r.car_id for r in reservations}
+        with car_locks.for_keys(car_ids), write_gate(self.db):
+            try:
+                begin_write(self.db)
+                db_cars = {
+                    db_car.id: db_car
+                    for db_car in self.db.query(DBCar)
+                    .filter(DBCar.id.in_(car_ids))
+                    .with_for_update()
+                    .populate_existing()
+                }
+                held: Dict[int, List[Tuple[date, date]]] = defaultdict(list)
+                for car_id, res_start, res_end in self.db.query(
+                    DBReservation.car_id, DBReservation.start_date, DBReservation.end_date
+                ).filter(
+                    DBReservation.car_id.in_(car_ids),
+                    *active_overlap_filters(min(s for _, s, _ in spans), max(e for _, _, e in spans)),
+                ):
+                    held[car_id].append((res_start, res_end))
+
+                errors, booked = check_bookings(spans, db_cars, held, bookable)
+                if all_or_nothing and any(errors):
+                    self.db.rollback()
+                    return errors
+                # Captured before commit, which expires the rows
+                reserved = [(b.car_id, b.start_date, b.end_date, b.status) for b in booked]
+                self.db.add_all(booked)
+                self.db.commit()
+            except Exception:
+                self.db.rollback()
+                raise
+        for car_id, start, end, _ in reserved:
+            fleet_availability.reserve(car_id, start, end)
+            fleet_allocator.reserve(car_id, start, end)
+        if reserved:
+            reservation_changes.bump()
+            catalog_cache.invalidate_cars({car_id for car_id, _, _, _ in reserved})
+            event_hub.publish(*booking_events(reserved))
+        return errors
 
     def for_user(self, user_id: int) -> List[Reservation]:
-        db_reservations = self.db.query(DBReservation).filter(
-            DBReservation.user_id == user_id
+        rows = self.db.execute(
+            select(*RESERVATION_READ_COLUMNS)
+            .where(DBReservation.user_id == user_id)
+            .order_by(*RESERVATION_ORDER)
+        )
+        return [reservation_from_row(row) for row in rows]
+
+    def for_user_page(
+        self, user_id: int, limit: int = 50, cursor: Optional[str] = None
+    ) -> Tuple[List[Reservation], Optional[str]]:
+        """One page of a user's reservations and the cursor for the next page.
+
+        Raises ValueError for a malformed cursor.
+        """
+        rows = self.db.execute(
+            reservation_page_statement(user_id, limit, decode_reservation_cursor(cursor))
         ).all()
-        
-        return [
-            Reservation(
-                vehicle_type=db_res.vehicle_type,
-                car_id=db_res.car_id,
-                user_id=db_res.user_id,
-                start_date=db_res.start_date,
-                end_date=db_res.end_date,
-                status=db_res.status
-            )
-            for db_res in db_reservations
-        ]
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = encode_cursor([last.start_date.isoformat(), last.id])
+        return [reservation_from_row(row) for row in rows[:limit]], next_cursor
 
     def overlaps(self, car_id: int, start: date, end: date) -> bool:
-        db_reservations = self.db.query(DBReservation).filter(
-            DBReservation.car_id == car_id
-        ).all()
-        
-        for db_res in db_reservations:
-            try:
-                rs = date.fromisoformat(db_res.start_date)
-                re = date.fromisoformat(db_res.end_date)
-            except Exception:
-                continue
-            if not (end < rs or re < start):
-                return True
-        return False
+        # Single EXISTS probe served by the (car_id, start_date, end_date) index
+        return self.db.query(
+            exists().where(
+                DBReservation.car_id == car_id,
+                *active_overlap_filters(start, end),
+            )
+        ).scalar()
+
+    def busy_car_ids(self, start: date, end: date) -> Set[int]:
+        """IDs of all cars holding a reservation that overlaps ``start``..``end``."""
+        rows = self.db.query(DBReservation.car_id).filter(
+            *active_overlap_filters(start, end)
+        ).distinct()
+        return {car_id for (car_id,) in rows}
@@ -0,0 +1,64 @@
+import hashlib
+import secrets
+import time
+from typing import Optional
+
+from .cache import CATALOG_CACHE_SIGNAL_FILE, CATALOG_CACHE_TTL, catalog_cache, reservation_changes
+
+# Versions are counted per process; the epoch keeps one worker's tags from
+# matching another's.
+PROCESS_EPOCH = secrets.token_hex(8)
+
+
+def _freshness_window() -> int:
+    """Without the cross-worker signal file, writes made by other processes only
+    reach this one when cache entries expire, so tags expire on the same clock."""
+    return 0 if CATALOG_CACHE_SIGNAL_FILE else int(time.time() // CATALOG_CACHE_TTL)
+
+
+def make_etag(*parts: object) -> str:
+    """Strong ETag over the given parts, which must identify the response body exactly."""
+    digest = hashlib.sha1("|".join(map(str, (PROCESS_EPOCH, _freshness_window()) + parts)).encode())
+    return f'"{digest.hexdigest()[:24]}"'
+
+
+def fleet_etag(*request_parts: object) -> str:
+    """ETag for a catalog response: changes whenever any car does."""
+    return make_etag("cars", catalog_cache.current_version(), *request_parts)
+
+
+def reservations_etag(*request_parts: object) -> str:
+    """ETag for a reservation listing: changes whenever any reservation does, in any process."""
+    return make_etag("reservations", reservation_changes.current(), *request_parts)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header value covers ``etag``.
+
+    Uses the weak comparison RFC 9110 prescribes for If-None-Match, and ignores
+    the content-coding suffix the compression middleware adds to tags.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag or strip_coding(tag) == etag:
+            return True
+    return False
+
+
+def with_coding(etag: str, coding: str) -> str:
+    """The ETag of the ``coding``-encoded variant of a response ("abc" -> "abc-gzip")."""
+    return f'{etag[:-1]}-{coding}"' if etag.endswith('"') else etag
+
+
+def strip_coding(etag: str) -> str:
+    for coding in ("gzip", "br"):
+        suffix = f'-{coding}"'
+        if etag.endswith(suffix):
+            return etag[: -len(suffix)] + '"'
+    return etag
@@ -0,0 +1,268 @@
+import asyncio
+import itertools
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set
+
+from .metrics import METRICS_ENABLED, metrics
+
+# Event push settings, overridable through the environment
+EVENT_BUFFER = int(os.environ.get("EVENT_BUFFER", "256"))  # events held per subscriber
+EVENT_HEARTBEAT_SECONDS = float(os.environ.get("EVENT_HEARTBEAT_SECONDS", "15"))
+# Shared file every worker appends its events to and tails for the others' events
+EVENT_BROKER_FILE = os.environ.get("EVENT_BROKER_FILE") or None
+EVENT_BROKER_POLL_MS = float(os.environ.get("EVENT_BROKER_POLL_MS", "100"))
+
+# The broker file is truncated once it grows past this many bytes
+BROKER_FILE_MAX_BYTES = 8 << 20
+
+logger = logging.getLogger(__name__)
+
+Event = Dict[str, object]
+
+
+def car_status_event(car_id: int, status: str) -> Event:
+    return {"type": "car.status", "car_id": car_id, "status": status}
+
+
+def reservation_event(car_id: int, start_date, end_date, status: str) -> Event:
+    """A new reservation; the user is left out since every subscriber sees it."""
+    return {
+        "type": "reservation.created",
+        "car_id": car_id,
+        "start_date": str(start_date),
+        "end_date": str(end_date),
+        "status": status,
+    }
+
+
+class Subscription:
+    """One subscriber's bounded event buffer.
+
+    ``next()`` returns None once the hub dropped the subscriber for falling
+    behind (or shut down); the client should refetch and resubscribe.
+    """
+
+    __slots__ = ("queue", "types")
+
+    def __init__(self, maxsize: int, types: Optional[Set[str]] = None) -> None:
+        self.queue: "asyncio.Queue[Optional[Event]]" = asyncio.Queue(maxsize)
+        self.types = types
+
+    async def next(self) -> Optional[Event]:
+        return await self.queue.get()
+
+    def wants(self, event: Event) -> bool:
+        return not self.types or event["type"] in self.types
+
+
+class EventHub:
+    """In-process pub/sub for fleet and reservation change events.
+
+    Stores publish after their commit; subscribers (the /api/events streams)
+    each get a bounded queue. A subscriber whose queue is full is dropped
+    rather than letting it hold memory or slow the publisher: its buffer is
+    replaced by a single end marker. ``publish`` can be called from any
+    thread; delivery always happens on the event loop the hub was started on.
+
+    With a ``broker_file`` every published event is also appended to that file
+    as a JSON line, and each started hub tails it to deliver the other
+    processes' events (this worker's own lines are skipped by origin). It is a
+    stand-in for a real broker, good for several workers on one machine:
+    delivery is best effort and the file is truncated past
+    BROKER_FILE_MAX_BYTES, which can lose events other workers had not read
+    yet.
+    """
+
+    def __init__(
+        self, buffer: int = 256, broker_file: Optional[str] = None, poll_interval: float = 0.1
+    ) -> None:
+        self.buffer = buffer
+        self.broker_file = broker_file
+        self.poll_interval = poll_interval
+        self.origin = f"{os.getpid()}-{secrets.token_hex(3)}"
+        self.published = 0
+        self.dropped = 0
+        self._ids = itertools.count(1)
+        self._subscribers: Set[Subscription] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tail: Optional[asyncio.Task] = None
+        self._offset = 0
+        self._file_lock = threading.Lock()
+
+    def start(self) -> None:
+        """Deliver on the running event loop and start tailing the broker file."""
+        self._loop = asyncio.get_running_loop()
+        if self.broker_file and (self._tail is None or self._tail.done()):
+            self._offset = self._file_size()  # only events from now on
+            self._tail = asyncio.create_task(self._follow())
+
+    async def stop(self) -> None:
+        if self._tail is not None:
+            self._tail.cancel()
+            try:
+                await self._tail
+            except asyncio.CancelledError:
+                pass
+            self._tail = None
+        for sub in list(self._subscribers):
+            self._close(sub)
+        self._loop = None
+
+    def subscribe(self, types: Optional[Iterable[str]] = None) -> Subscription:
+        """New subscriber for ``types`` (all events if None); call on the hub's loop."""
+        sub = Subscription(self.buffer, set(types) if types else None)
+        self._subscribers.add(sub)
+        if METRICS_ENABLED:
+            metrics.event_subscribers.inc()
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        if sub in self._subscribers:
+            self._subscribers.discard(sub)
+            if METRICS_ENABLED:
+                metrics.event_subscribers.dec()
+
+    def publish(self, *events: Event) -> None:
+        """Send ``events`` to this process's subscribers and, through the broker, the others'."""
+        if not events:
+            return
+        if self.broker_file:
+            self._append(events)
+        loop = self._loop
+        if loop is None or not self._subscribers:
+            return
+        try:
+            on_loop = asyncio.get_running_loop() is loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._deliver(events)
+        else:
+            try:
+                loop.call_soon_threadsafe(self._deliver, events)
+            except RuntimeError:
+                pass  # loop already closed
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "dropped_subscribers": self.dropped,
+        }
+
+    def _deliver(self, events: Iterable[Event]) -> None:
+        for event in events:
+            event = dict(event, id=next(self._ids))
+            self.published += 1
+            for sub in list(self._subscribers):
+                if not sub.wants(event):
+                    continue
+                try:
+                    sub.queue.put_nowait(event)
+                except asyncio.QueueFull:
+                    self._close(sub)
+                    self.dropped += 1
+                    if METRICS_ENABLED:
+                        metrics.event_subscribers_dropped.inc()
+
+    def _close(self, sub: Subscription) -> None:
+        """Unsubscribe ``sub`` and leave only the end marker in its buffer."""
+        self.unsubscribe(sub)
+        while not sub.queue.empty():
+            sub.queue.get_nowait()
+        sub.queue.put_nowait(None)
+
+    def _file_size(self) -> int:
+        try:
+            return os.stat(self.broker_file).st_size
+        except FileNotFoundError:
+            return 0
+
+    def _append(self, events: Iterable[Event]) -> None:
+        data = "".join(
+            json.dumps(dict(event, origin=self.origin, ts=time.time()), separators=(",", ":")) + "\n"
+            for event in events
+        )
+        with self._file_lock:
+            mode = "w" if self._file_size() >= BROKER_FILE_MAX_BYTES else "a"
+            with open(self.broker_file, mode) as f:
+                f.write(data)
+
+    def _read_new(self) -> List[Event]:
+        size = self._file_size()
+        if size < self._offset:
+            self._offset = 0  # truncated by some worker; read it from the start
+        if size == self._offset:
+            return []
+        with open(self.broker_file, "rb") as f:
+            f.seek(self._offset)
+            data = f.read(size - self._offset)
+        end = data.rfind(b"\n") + 1  # leave a partly written last line for next time
+        self._offset += end
+        events = []
+        for line in data[:end].splitlines():
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if event.pop("origin", None) != self.origin:
+                event.pop("ts", None)
+                events.append(event)
+        return events
+
+    async def _follow(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                events = self._read_new()
+            except OSError:
+                logger.exception("Reading the event broker file failed")
+                continue
+            if events and self._subscribers:
+                self._deliver(events)
+
+
+def format_sse(event: Event) -> bytes:
+    data = json.dumps({k: v for k, v in event.items() if k != "id"}, separators=(",", ":"))
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {data}\n\n".encode()
+
+
+async def sse_stream(
+    hub: EventHub, types: Optional[Iterable[str]] = None, heartbeat: float = 15.0
+) -> AsyncIterator[bytes]:
+    """Server-sent-events body subscribed to ``types``; ends with a "dropped" event if the hub drops it.
+
+    The subscription is made on the first iteration, so a body that is never
+    sent never leaves a queue behind. A comment line goes out every
+    ``heartbeat`` seconds without events, so proxies keep the connection open
+    and disconnects are noticed.
+    """
+    sub = hub.subscribe(types)
+    getter: Optional[asyncio.Future] = None
+    try:
+        yield b"retry: 2000\n\n"
+        while True:
+            if getter is None:
+                getter = asyncio.ensure_future(sub.next())
+            done, _ = await asyncio.wait({getter}, timeout=heartbeat)
+            if not done:
+                yield b": keep-alive\n\n"
+                continue
+            event, getter = getter.result(), None
+            if event is None:
+                yield b"event: dropped\ndata: {}\n\n"
+                return
+            yield format_sse(event)
+    finally:
+        if getter is not None:
+            getter.cancel()
+        hub.unsubscribe(sub)
+
+
+# Shared by the stores and the /api/events endpoint; started with the app
+event_hub = EventHub(EVENT_BUFFER, EVENT_BROKER_FILE, EVENT_BROKER_POLL_MS / 1000)
@@ -0,0 +1,254 @@
+"""Bulk import of cars from CSV or NDJSON.
+
+Rows are read one at a time, validated against the CarCreate schema and
+written in chunks: each chunk is one executemany INSERT (an upsert on the car
+id where the dialect has one) in its own transaction, so memory stays bounded
+and a bad row only costs its own chunk a retry, never the whole file.
+
+Usage: python -m backend.fleet_import cars.csv [--format csv|ndjson] [--chunk-size 500] [--no-upsert]
+"""
+import argparse
+import csv
+import io
+import json
+import sys
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from .allocation import fleet_allocator
+from .cache import catalog_cache
+from .events import event_hub
+from .database import SessionLocal, begin_write, write_gate
+from .models import Car as DBCar
+from .schemas import CarImport
+
+FORMATS = ("csv", "ndjson")
+DEFAULT_CHUNK_SIZE = 500
+# Only this many row errors are listed in a report; the rest are just counted
+MAX_REPORTED_ERRORS = 1000
+
+# CarCreate fields the cars table has a column for; the others are validated only
+CAR_COLUMNS = ("make", "model", "year", "status", "category")
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE
+UPSERT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def format_for(filename: Optional[str] = None, content_type: Optional[str] = None) -> str:
+    """Guess the import format from a file name or content type (default csv)."""
+    hint = (content_type or "").lower() + " " + (filename or "").lower()
+    if "json" in hint:  # ndjson, jsonl, application/x-ndjson
+        return "ndjson"
+    return "csv"
+
+
+def read_rows(stream: TextIO, fmt: str) -> Iterator[Tuple[int, object]]:
+    """Yield (line number, raw row) pairs from a CSV or NDJSON text stream.
+
+    A row that cannot be parsed is yielded as the exception instead, so it
+    shows up in the report like any other bad row.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            # Empty cells mean "not given", so schema defaults apply
+            yield reader.line_num, {k: v for k, v in row.items() if k and v not in ("", None)}
+    elif fmt == "ndjson":
+        for line_num, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_num, json.loads(line)
+            except ValueError as ex:
+                yield line_num, ex
+    else:
+        raise ValueError(f"Unknown import format {fmt!r}; expected one of {', '.join(FORMATS)}")
+
+
+def validate_row(raw: object) -> Dict[str, object]:
+    """Check one raw row against the car schema and return its cars table values."""
+    if isinstance(raw, Exception):
+        raise ValueError(f"Unparseable row: {raw}")
+    if not isinstance(raw, dict):
+        raise ValueError("Row must be an object")
+    car = CarImport.model_validate(raw)
+    # Columns the row leaves out get the model defaults on insert and are left
+    # alone on upsert, so re-importing a file never resets a car's status
+    values = {c: getattr(car, c) for c in CAR_COLUMNS if c in car.model_fields_set}
+    if car.id is not None:
+        values["id"] = car.id
+    return values
+
+
+def row_error(ex: Exception) -> str:
+    if isinstance(ex, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(p) for p in err['loc']) or 'row'}: {err['msg']}" for err in ex.errors()
+        )
+    if isinstance(ex, DBAPIError):
+        return str(ex.orig)
+    return str(ex)
+
+
+class CarImporter:
+    """Writes validated rows in chunks and keeps the per-row report."""
+
+    def __init__(self, db: Session, chunk_size: int = DEFAULT_CHUNK_SIZE, upsert: bool = True) -> None:
+        self.db = db
+        self.chunk_size = chunk_size
+        dialect = db.get_bind().dialect.name
+        self.upsert = upsert and dialect in UPSERT_INSERTS
+        self._insert = UPSERT_INSERTS[dialect] if self.upsert else insert
+        self.rows = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors: List[Dict[str, object]] = []
+
+    def run(self, rows: Iterator[Tuple[int, object]]) -> Dict[str, object]:
+        chunk: List[Tuple[int, Dict[str, object]]] = []
+        for line, raw in rows:
+            self.rows += 1
+            try:
+                chunk.append((line, validate_row(raw)))
+            except (ValueError, ValidationError) as ex:
+                self.fail(line, ex)
+                continue
+            if len(chunk) >= self.chunk_size:
+                self.write_chunk(chunk)
+                chunk = []
+        if chunk:
+            self.write_chunk(chunk)
+        return self.report()
+
+    def fail(self, line: int, ex: Exception) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": row_error(ex)})
+
+    def report(self) -> Dict[str, object]:
+        return {
+            "rows": self.rows,
+            "imported": self.imported,
+            "failed": self.failed,
+            "errors": sorted(self.errors, key=lambda e: e["line"]),
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+    def statement(self, columns: Iterable[str]):
+        """INSERT for rows with exactly ``columns``; an upsert updates only those columns."""
+        columns = list(columns)
+        stmt = self._insert(DBCar)
+        if self.upsert and "id" in columns:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[DBCar.id],
+                set_={c: stmt.excluded[c] for c in columns if c != "id"},
+            )
+        return stmt.returning(DBCar.id)
+
+    def write_chunk(self, chunk: List[Tuple[int, Dict[str, object]]]) -> None:
+        """Insert a chunk in one transaction, or row by row if any row is rejected."""
+        # executemany needs every row to have the same keys
+        by_columns: Dict[Tuple[str, ...], List[Dict[str, object]]] = {}
+        for _, values in chunk:
+            by_columns.setdefault(tuple(sorted(values)), []).append(values)
+        with write_gate(self.db):
+            try:
+                begin_write(self.db)
+                car_ids: List[int] = []
+                for columns, rows in by_columns.items():
+                    car_ids.extend(self.db.scalars(self.statement(columns), rows))
+                self.db.commit()
+            except DBAPIError:
+                self.db.rollback()
+                car_ids = self.write_rows(chunk)
+            else:
+                self.imported += len(chunk)
+        if car_ids:
+            catalog_cache.invalidate_cars(car_ids)
+
+    def write_rows(self, chunk: List[Tuple[int, Dict[str, object]]]) -> List[int]:
+        """Insert rows one at a time under savepoints, recording the ones the database rejects."""
+        car_ids: List[int] = []
+        try:
+            begin_write(self.db)
+            for line, values in chunk:
+                try:
+                    with self.db.begin_nested():
+                        car_ids.append(self.db.scalar(self.statement(values), values))
+                except DBAPIError as ex:
+                    self.fail(line, ex)
+                else:
+                    self.imported += 1
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        return car_ids
+
+
+def import_cars(
+    db: Session,
+    stream: TextIO,
+    fmt: str = "csv",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    upsert: bool = True,
+) -> Dict[str, object]:
+    """Import every row of ``stream`` and return the report.
+
+    The report counts rows read, imported and failed, and lists failed rows by
+    line number (up to MAX_REPORTED_ERRORS). Without ``upsert``, rows whose id
+    already exists fail instead of replacing the car.
+    """
+    report = CarImporter(db, chunk_size, upsert).run(read_rows(stream, fmt))
+    if report["imported"]:
+        # One event for the whole import; clients refetch the catalog
+        event_hub.publish({"type": "fleet.imported", "imported": report["imported"]})
+        if fleet_allocator.loaded:
+            # New and re-categorised cars join the book-by-category calendars
+            fleet_allocator.load(db)
+    return report
+
+
+def import_file(
+    raw: BinaryIO, fmt: str = "csv", chunk_size: int = DEFAULT_CHUNK_SIZE, upsert: bool = True
+) -> Dict[str, object]:
+    """import_cars on a UTF-8 byte stream, in a session of its own."""
+    stream = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+    db = SessionLocal()
+    try:
+        return import_cars(db, stream, fmt, chunk_size, upsert)
+    finally:
+        db.close()
+        stream.detach()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bulk import cars from CSV or NDJSON")
+    parser.add_argument("path", help="file to import, or - for stdin")
+    parser.add_argument("--format", choices=FORMATS, help="default: guessed from the file name")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--no-upsert", action="store_true", help="fail rows whose id already exists")
+    args = parser.parse_args()
+
+    from .database import init_db
+
+    init_db()
+    fmt = args.format or format_for(args.path)
+    raw = sys.stdin.buffer if args.path == "-" else open(args.path, "rb")
+    try:
+        report = import_file(raw, fmt, args.chunk_size, not args.no_upsert)
+    finally:
+        if raw is not sys.stdin.buffer:
+            raw.close()
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    sys.exit(1 if report["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response
+
+from .metrics import METRICS_ENABLED, metrics
+from .responses import FastJSONResponse
+
+# Idempotency key settings, overridable through the environment
+IDEMPOTENCY_ROUTES = tuple(
+    p for p in os.environ.get("IDEMPOTENCY_ROUTES", "/api/book,/api/book/category,/api/register").split(",") if p
+)
+IDEMPOTENCY_STORE = os.environ.get("IDEMPOTENCY_STORE", "memory")  # memory | sqlite
+IDEMPOTENCY_DB = os.environ.get("IDEMPOTENCY_DB", "./idempotency.db")
+IDEMPOTENCY_TTL_SECONDS = float(os.environ.get("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_MAX_KEYS = int(os.environ.get("IDEMPOTENCY_MAX_KEYS", "100000"))
+# How long a request holds its key before a crashed original counts as gone
+IDEMPOTENCY_LOCK_SECONDS = float(os.environ.get("IDEMPOTENCY_LOCK_SECONDS", "60"))
+
+HEADER = b"idempotency-key"
+MAX_KEY_LENGTH = 255
+# How often a duplicate polls the store for an original running in another worker
+POLL_INTERVAL = 0.05
+
+# begin() outcomes
+NEW, DONE, PENDING, MISMATCH = "new", "done", "pending", "mismatch"
+
+
+class StoredResponse:
+    """The status, content type and body a key's first request was answered with."""
+
+    __slots__ = ("status", "content_type", "body")
+
+    def __init__(self, status: int, content_type: str, body: bytes) -> None:
+        self.status = status
+        self.content_type = content_type
+        self.body = body
+
+
+Begin = Tuple[str, Optional[StoredResponse]]
+
+
+class MemoryIdempotencyStore:
+    """Keys of this worker process in an LRU of at most ``max_keys`` answered entries.
+
+    Keys still in flight are never evicted; they expire after ``lock_seconds``.
+    """
+
+    blocking = False
+
+    def __init__(self, ttl: float = 86400.0, max_keys: int = 100_000, lock_seconds: float = 60.0) -> None:
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self.lock_seconds = lock_seconds
+        # key -> (fingerprint, expires at, response or None while in flight)
+        self._entries: "OrderedDict[str, Tuple[str, float, Optional[StoredResponse]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def begin(self, key: str, fingerprint: str) -> Begin:
+        """Claim ``key``, or report that it is answered, in flight or taken by another request."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                if entry[0] != fingerprint:
+                    return MISMATCH, None
+                self._entries.move_to_end(key)
+                return (DONE, entry[2]) if entry[2] is not None else (PENDING, None)
+            self._entries[key] = (fingerprint, now + self.lock_seconds, None)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_keys:
+                self._evict(len(self._entries) - self.max_keys, now)
+        return NEW, None
+
+    def finish(self, key: str, fingerprint: str, response: StoredResponse) -> None:
+        with self._lock:
+            self._entries[key] = (fingerprint, time.time() + self.ttl, response)
+
+    def abandon(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def _evict(self, count: int, now: float) -> None:
+        """Drop the ``count`` least recently used keys, never one still in flight."""
+        victims = []
+        for key, (_, expires, response) in self._entries.items():
+            if response is not None or expires <= now:
+                victims.append(key)
+                if len(victims) == count:
+                    break
+        for key in victims:
+            del self._entries[key]
+
+
+class SQLiteIdempotencyStore:
+    """Keys in a SQLite file of their own, shared by every worker on the machine.
+
+    A separate file keeps these small writes off the main database's write
+    lock. Expired keys are purged, and the oldest answered ones dropped past
+    ``max_keys``, every PURGE_EVERY claims.
+    """
+
+    blocking = True
+    PURGE_EVERY = 1000
+
+    def __init__(
+        self, path: str, ttl: float = 86400.0, max_keys: int = 100_000, lock_seconds: float = 60.0
+    ) -> None:
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self.lock_seconds = lock_seconds
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS idempotency_keys ("
+            " key TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, expires_at REAL NOT NULL,"
+            " status INTEGER, content_type TEXT, body BLOB)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_idempotency_expires ON idempotency_keys (expires_at)")
+        self._lock = threading.Lock()
+        self._claims = 0
+
+    def begin(self, key: str, fingerprint: str) -> Begin:
+        now = time.time()
+        with self._lock:
+            self._claims += 1
+            if self._claims % self.PURGE_EVERY == 0:
+                self._purge(now)
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT fingerprint, expires_at, status, content_type, body FROM idempotency_keys WHERE key = ?",
+                    (key,),
+                ).fetchone()
+                if row is not None and row[1] > now:
+                    if row[0] != fingerprint:
+                        return MISMATCH, None
+                    if row[2] is None:
+                        return PENDING, None
+                    return DONE, StoredResponse(row[2], row[3], row[4])
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO idempotency_keys (key, fingerprint, expires_at) VALUES (?, ?, ?)",
+                    (key, fingerprint, now + self.lock_seconds),
+                )
+                return NEW, None
+            finally:
+                self._conn.execute("COMMIT")
+
+    def finish(self, key: str, fingerprint: str, response: StoredResponse) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO idempotency_keys VALUES (?, ?, ?, ?, ?, ?)",
+                (key, fingerprint, time.time() + self.ttl, response.status, response.content_type, response.body),
+            )
+
+    def abandon(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM idempotency_keys WHERE key = ? AND status IS NULL", (key,))
+
+    def _purge(self, now: float) -> None:
+        self._conn.execute("DELETE FROM idempotency_keys WHERE expires_at <= ?", (now,))
+        self._conn.execute(
+            "DELETE FROM idempotency_keys WHERE key IN (SELECT key FROM idempotency_keys"
+            " WHERE status IS NOT NULL ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_keys,),
+        )
+
+
+def make_store():
+    if IDEMPOTENCY_STORE == "sqlite":
+        return SQLiteIdempotencyStore(
+            IDEMPOTENCY_DB, IDEMPOTENCY_TTL_SECONDS, IDEMPOTENCY_MAX_KEYS, IDEMPOTENCY_LOCK_SECONDS
+        )
+    return MemoryIdempotencyStore(IDEMPOTENCY_TTL_SECONDS, IDEMPOTENCY_MAX_KEYS, IDEMPOTENCY_LOCK_SECONDS)
+
+
+def _error(status: int, detail: str) -> FastJSONResponse:
+    return FastJSONResponse({"detail": detail}, status_code=status)
+
+
+def _replay(stored: StoredResponse) -> Response:
+    return Response(
+        stored.body, stored.status, headers={"Idempotent-Replayed": "true"}, media_type=stored.content_type
+    )
+
+
+class IdempotencyMiddleware:
+    """ASGI middleware giving POSTs with an ``Idempotency-Key`` header one answer per key.
+
+    The first request with a key runs as usual and its response, unless it is
+    a 5xx or a shed 429, is kept for ``ttl`` seconds. A retry with the same key
+    and the same body gets that response back, marked ``Idempotent-Replayed:
+    true``, without reaching the endpoint; the same key with a different body
+    is a 422. A duplicate arriving while the original is still running waits
+    for it: on a future in the same worker, by polling the store across
+    workers (SQLite store only). If the original fails, the next waiter runs
+    in its place. Keys are scoped to the route.
+    """
+
+    def __init__(self, app, store=None, routes=IDEMPOTENCY_ROUTES) -> None:
+        self.app = app
+        self.store = store if store is not None else idempotency_store
+        self.routes = frozenset(routes)
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.routes:
+            await self.app(scope, receive, send)
+            return
+        raw_key = next((v for k, v in scope["headers"] if k == HEADER), None)
+        if raw_key is None:
+            await self.app(scope, receive, send)
+            return
+        if not raw_key or len(raw_key) > MAX_KEY_LENGTH:
+            await _error(400, f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")(scope, receive, send)
+            return
+
+        # The body is read up front for the fingerprint and handed to the endpoint afterwards
+        messages: List[dict] = []
+        body = hashlib.sha256()
+        more = True
+        while more:
+            message = await receive()
+            if message["type"] != "http.request":
+                return  # the client went away
+            messages.append(message)
+            body.update(message.get("body", b""))
+            more = message.get("more_body", False)
+        key = scope["path"] + " " + raw_key.decode("latin-1")
+        fingerprint = body.hexdigest()
+
+        async def replay_receive():
+            return messages.pop(0) if messages else await receive()
+
+        while True:
+            outcome, stored = await self._call(self.store.begin, key, fingerprint)
+            if outcome == DONE:
+                if METRICS_ENABLED:
+                    metrics.idempotent_replays.inc((scope["path"],))
+                await _replay(stored)(scope, replay_receive, send)
+                return
+            if outcome == MISMATCH:
+                await _error(422, "Idempotency-Key was already used with a different request")(
+                    scope, replay_receive, send
+                )
+                return
+            if outcome == NEW:
+                break
+            # PENDING: wait for the original, then look again
+            waiter = self._inflight.get(key)
+            if waiter is not None:
+                await asyncio.shield(waiter)
+            else:
+                await asyncio.sleep(POLL_INTERVAL)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._inflight[key] = waiter
+        status = 500
+        content_type = "application/json"
+        chunks: List[bytes] = []
+
+        async def capture(message):
+            nonlocal status, content_type
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                for name, value in message.get("headers", []):
+                    if name == b"content-type":
+                        content_type = value.decode("latin-1")
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        stored = None
+        try:
+            await self.app(scope, replay_receive, capture)
+            if status < 500 and status != 429:
+                stored = StoredResponse(status, content_type, b"".join(chunks))
+        finally:
+            try:
+                if stored is not None:
+                    await self._call(self.store.finish, key, fingerprint, stored)
+                else:
+                    await self._call(self.store.abandon, key)
+            finally:
+                if self._inflight.get(key) is waiter:
+                    del self._inflight[key]
+                waiter.set_result(None)
+
+    async def _call(self, fn, *args):
+        if self.store.blocking:
+            return await run_in_threadpool(fn, *args)
+        return fn(*args)
+
+
+# Shared by every IdempotencyMiddleware of the process
+idempotency_store = make_store()
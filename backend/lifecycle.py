@@ -0,0 +1,232 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import exists, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .cache import catalog_cache, reservation_changes
+from .database import AsyncSessionLocal, async_write_gate, begin_write_async
+from .events import car_status_event, event_hub
+from .models import Car as DBCar, Reservation as DBReservation, INACTIVE_STATUSES
+
+# Lifecycle scheduler settings, overridable through the environment
+LIFECYCLE_SCHEDULER = os.environ.get("LIFECYCLE_SCHEDULER", "1") == "1"
+LIFECYCLE_INTERVAL_SECONDS = float(os.environ.get("LIFECYCLE_INTERVAL_SECONDS", "60"))
+
+# Car ids per "id IN (...)" list, well under SQLite's bound-parameter limit
+ID_CHUNK = 500
+
+logger = logging.getLogger(__name__)
+
+
+def _chunks(ids: Iterable[int]) -> List[List[int]]:
+    ids = sorted(ids)
+    return [ids[i:i + ID_CHUNK] for i in range(0, len(ids), ID_CHUNK)]
+
+
+async def _update_returning(db: AsyncSession, model, returning, where: list, values: dict) -> list:
+    """UPDATE ``model`` rows matching ``where`` to ``values``; returns ``returning`` of each changed row.
+
+    Uses UPDATE ... RETURNING where the dialect has it. Elsewhere (MySQL) the
+    matching rows are selected and locked first, then updated by primary key
+    in the same transaction.
+    """
+    if db.get_bind().dialect.update_returning:
+        result = await db.execute(
+            update(model).where(*where).values(**values).returning(returning)
+            .execution_options(synchronize_session=False)
+        )
+        return [value for (value,) in result]
+    rows = (await db.execute(select(model.id, returning).where(*where).with_for_update())).all()
+    for chunk in _chunks(row_id for row_id, _ in rows):
+        await db.execute(
+            update(model).where(model.id.in_(chunk)).values(**values)
+            .execution_options(synchronize_session=False)
+        )
+    return [value for _, value in rows]
+
+
+def _holds_car():
+    """EXISTS clause: the car still has a reservation that holds it."""
+    return exists().where(
+        DBReservation.car_id == DBCar.id,
+        DBReservation.status.notin_(INACTIVE_STATUSES),
+    )
+
+
+async def advance_reservations(db: AsyncSession, today: Optional[date] = None) -> Dict[str, int]:
+    """Move reservations and their cars along to ``today`` (default: date.today()).
+
+    In one write transaction:
+
+    - reservations that ended before today become ``completed``, and their cars
+      go back to ``available``, or to ``reserved`` if another booking still
+      holds them;
+    - reservations running today go from ``reserved`` to ``active`` and their
+      cars from ``reserved`` to ``rented``.
+
+    Reservations are found by (status, date) range on the lifecycle indexes and
+    every change is a set-based UPDATE; no rows are loaded into the session.
+    Each UPDATE only matches rows still in the state it moves them out of, so a
+    tick that runs again, or concurrently in another worker, changes nothing
+    twice. Cars in any other state (e.g. ``maintenance``) are left alone.
+
+    Returns how many reservations and cars were changed.
+    """
+    today = today or date.today()
+    counts = {"completed": 0, "activated": 0, "cars_released": 0, "cars_rented": 0}
+    changed_cars: Dict[int, str] = {}  # car id -> new status
+    async with async_write_gate(db):
+        try:
+            await begin_write_async(db)
+            ended_cars = await _update_returning(
+                db, DBReservation, DBReservation.car_id,
+                [DBReservation.status.in_(("reserved", "active")), DBReservation.end_date < today],
+                {"status": "completed"},
+            )
+            counts["completed"] = len(ended_cars)
+
+            started_cars = await _update_returning(
+                db, DBReservation, DBReservation.car_id,
+                [
+                    DBReservation.status == "reserved",
+                    DBReservation.start_date <= today,
+                    DBReservation.end_date >= today,
+                ],
+                {"status": "active"},
+            )
+            counts["activated"] = len(started_cars)
+
+            for chunk in _chunks(ended_cars):
+                ids = await _update_returning(
+                    db, DBCar, DBCar.id,
+                    [DBCar.id.in_(chunk), DBCar.status.in_(("reserved", "rented")), ~_holds_car()],
+                    {"status": "available"},
+                )
+                counts["cars_released"] += len(ids)
+                changed_cars.update(dict.fromkeys(ids, "available"))
+                # Still booked later on: back to reserved until that booking starts
+                ids = await _update_returning(
+                    db, DBCar, DBCar.id,
+                    [DBCar.id.in_(chunk), DBCar.status == "rented", _holds_car()],
+                    {"status": "reserved"},
+                )
+                changed_cars.update(dict.fromkeys(ids, "reserved"))
+
+            for chunk in _chunks(started_cars):
+                ids = await _update_returning(
+                    db, DBCar, DBCar.id,
+                    [DBCar.id.in_(chunk), DBCar.status.in_(("reserved", "available"))],
+                    {"status": "rented"},
+                )
+                counts["cars_rented"] += len(ids)
+                changed_cars.update(dict.fromkeys(ids, "rented"))
+
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+    if counts["completed"] or counts["activated"]:
+        reservation_changes.bump()
+    if changed_cars:
+        catalog_cache.invalidate_cars(changed_cars)
+        event_hub.publish(*(car_status_event(car_id, status) for car_id, status in changed_cars.items()))
+    return counts
+
+
+class LifecycleScheduler:
+    """Background task running advance_reservations every ``interval`` seconds.
+
+    Every worker may run one: the ticks are idempotent and serialized by the
+    database write lock, so extra workers only repeat a cheap indexed lookup
+    that finds nothing left to change. Intervals are jittered by +-10% so
+    workers started together drift apart.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal, interval: float = 60.0) -> None:
+        self.session_factory = session_factory
+        self.interval = interval
+        self.ticks = 0
+        self.failures = 0
+        self.last: Optional[Dict[str, int]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start ticking on the running event loop; the first tick runs right away."""
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def tick(self, today: Optional[date] = None) -> Dict[str, int]:
+        async with self.session_factory() as db:
+            counts = await advance_reservations(db, today)
+        self.ticks += 1
+        self.last = counts
+        return counts
+
+    def stats(self) -> Dict[str, object]:
+        return {"ticks": self.ticks, "failures": self.failures, "last": self.last}
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                counts = await self.tick()
+                if any(counts.values()):
+                    logger.info("Reservation lifecycle: %s", counts)
+            except Exception:
+                self.failures += 1
+                logger.exception("Reservation lifecycle tick failed")
+            await asyncio.sleep(self.interval * random.uniform(0.9, 1.1))
+
+
+# Started with the app unless LIFECYCLE_SCHEDULER=0 (e.g. when run as a separate worker)
+lifecycle_scheduler = LifecycleScheduler(interval=LIFECYCLE_INTERVAL_SECONDS)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Advance reservation and car statuses by date")
+    parser.add_argument("--once", action="store_true", help="run one tick, print its counts and exit")
+    parser.add_argument("--interval", type=float, default=LIFECYCLE_INTERVAL_SECONDS)
+    parser.add_argument("--today", type=date.fromisoformat, help="run as of this date (YYYY-MM-DD)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    from .database import async_engine, init_db
+
+    init_db()
+    scheduler = LifecycleScheduler(interval=args.interval)
+
+    async def run() -> None:
+        try:
+            if args.once:
+                print(json.dumps(await scheduler.tick(args.today)))
+                return
+            scheduler.start()
+            await scheduler._task
+        finally:
+            await async_engine.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
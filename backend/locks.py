@@ -0,0 +1,47 @@
+import asyncio
+import threading
+from contextlib import AsyncExitStack, ExitStack, asynccontextmanager, contextmanager
+from typing import AsyncIterator, Hashable, Iterable, Iterator
+
+
+class StripedLock:
+    """A fixed pool of locks shared out by key.
+
+    Work on the same key always takes the same lock, so it is serialized, while
+    different keys usually land on different stripes and proceed in parallel.
+    """
+
+    def __init__(self, stripes: int = 64) -> None:
+        self._locks = [threading.Lock() for _ in range(stripes)]
+
+    def for_key(self, key: Hashable) -> threading.Lock:
+        return self._locks[hash(key) % len(self._locks)]
+
+    @contextmanager
+    def for_keys(self, keys: Iterable[Hashable]) -> Iterator[None]:
+        """Hold the stripes for all ``keys``, taken in a fixed order to avoid deadlock."""
+        stripes = sorted({hash(key) % len(self._locks) for key in keys})
+        with ExitStack() as stack:
+            for i in stripes:
+                stack.enter_context(self._locks[i])
+            yield
+
+
+class AsyncStripedLock:
+    """StripedLock for coroutines: waiting on a stripe yields to the event loop."""
+
+    def __init__(self, stripes: int = 64) -> None:
+        self._locks = [asyncio.Lock() for _ in range(stripes)]
+
+    @asynccontextmanager
+    async def for_keys(self, keys: Iterable[Hashable]) -> AsyncIterator[None]:
+        stripes = sorted({hash(key) % len(self._locks) for key in keys})
+        async with AsyncExitStack() as stack:
+            for i in stripes:
+                await stack.enter_async_context(self._locks[i])
+            yield
+
+
+# Serialize bookings for the same car within this process
+car_locks = StripedLock()
+async_car_locks = AsyncStripedLock()
@@ -0,0 +1,256 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Set METRICS_ENABLED=0 to skip all recording (the /metrics endpoint then stays empty)
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") != "0"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CHECKOUT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+STATEMENT_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+
+Labels = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """A labelled metric family rendered in the Prometheus text format."""
+
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()) -> None:
+        super().__init__(name, help, labels)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, k)} {_format_number(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels: Labels = (), amount: float = 1) -> None:
+        self.inc(labels, -amount)
+
+
+class Histogram(Metric):
+    """Fixed-bucket histogram; each observation is one bisect and a few increments."""
+
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, help: str, labels: Sequence[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS
+    ) -> None:
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self._values: Dict[Labels, list] = {}
+
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][i] += 1
+            entry[1] += value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, (list(counts), total)) for k, (counts, total) in self._values.items())
+        lines = []
+        for labels, (counts, total) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{_format_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, labels)} {_format_number(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, labels)} {cumulative}")
+        return lines
+
+
+class RequestStats:
+    """SQL work done while serving one request, collected by the engine event hooks."""
+
+    __slots__ = ("statements", "sql_seconds")
+
+    def __init__(self) -> None:
+        self.statements = 0
+        self.sql_seconds = 0.0
+
+
+# Stats of the request being served in this context (None outside requests)
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+class Metrics:
+    """Process-wide request and database metrics, served on /metrics."""
+
+    def __init__(self) -> None:
+        self.in_flight = Gauge("http_requests_in_flight", "Requests currently being served", ["method"])
+        self.requests = Counter("http_requests_total", "Requests served", ["method", "route", "status"])
+        self.latency = Histogram(
+            "http_request_duration_seconds", "Time to serve a request", ["method", "route"]
+        )
+        self.checkout = Histogram(
+            "db_pool_checkout_seconds", "Time spent waiting for a pooled database connection",
+            ["pool"], CHECKOUT_BUCKETS,
+        )
+        self.statements = Counter("db_statements_total", "SQL statements executed")
+        self.statement_seconds = Counter("db_statement_seconds_total", "Time spent executing SQL statements")
+        self.request_statements = Histogram(
+            "db_statements_per_request", "SQL statements executed per request",
+            ["method", "route"], STATEMENT_COUNT_BUCKETS,
+        )
+        self.request_sql_seconds = Histogram(
+            "db_statement_seconds_per_request", "Time spent in SQL per request", ["method", "route"]
+        )
+        self.event_subscribers = Gauge("event_subscribers", "Open /api/events streams")
+        self.event_subscribers_dropped = Counter(
+            "event_subscribers_dropped_total", "Event subscribers dropped for falling behind"
+        )
+        self.admission_in_flight = Gauge("admission_writes_in_flight", "Write requests holding an admission slot")
+        self.admission_queue_depth = Gauge("admission_queue_depth", "Write requests waiting for an admission slot")
+        self.admission_wait = Histogram(
+            "admission_queue_wait_seconds", "Time admitted write requests waited for a slot", ["route"]
+        )
+        self.admission_rejected = Counter(
+            "admission_rejected_total", "Write requests shed by admission control", ["route", "reason"]
+        )
+        self.idempotent_replays = Counter(
+            "idempotent_replays_total", "Requests answered from a stored Idempotency-Key response", ["route"]
+        )
+        self.families: List[Metric] = [
+            self.in_flight, self.requests, self.latency, self.checkout, self.statements,
+            self.statement_seconds, self.request_statements, self.request_sql_seconds,
+            self.event_subscribers, self.event_subscribers_dropped, self.admission_in_flight,
+            self.admission_queue_depth, self.admission_wait, self.admission_rejected,
+            self.idempotent_replays,
+        ]
+
+    def observe_statement(self, seconds: float) -> None:
+        self.statements.inc()
+        self.statement_seconds.inc(amount=seconds)
+        stats = current_request.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.sql_seconds += seconds
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float, stats: RequestStats) -> None:
+        labels = (method, route)
+        self.requests.inc((method, route, str(status)))
+        self.latency.observe(seconds, labels)
+        self.request_statements.observe(stats.statements, labels)
+        self.request_sql_seconds.observe(stats.sql_seconds, labels)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for family in self.families:
+            lines.extend(family.render())
+        return "\n".join(lines) + "\n"
+
+
+# Shared by the API process
+metrics = Metrics()
+
+
+def route_label(scope: dict) -> str:
+    """The matched route's path template, so /items/1 and /items/2 share a series."""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and SQL work for every HTTP request."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        stats = RequestStats()
+        token = current_request.set(stats)
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        metrics.in_flight.inc((method,))
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.in_flight.dec((method,))
+            current_request.reset(token)
+            metrics.observe_request(method, route_label(scope), status, elapsed, stats)
+
+
+class CheckoutTimer:
+    """Pool mixin timing how long each connection checkout waits."""
+
+    metrics_label = ""
+
+    def connect(self):
+        start = time.perf_counter()
+        conn = super().connect()
+        if METRICS_ENABLED:
+            metrics.checkout.observe(time.perf_counter() - start, (self.metrics_label,))
+        return conn
+
+
+class TimedQueuePool(CheckoutTimer, QueuePool):
+    metrics_label = "sync"
+
+
+class TimedAsyncQueuePool(CheckoutTimer, AsyncAdaptedQueuePool):
+    metrics_label = "async"
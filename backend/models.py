@@ -1,7 +1,13 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, Index, DDL, event
+from sqlalchemy.sql import column, table
 from .base import Base
 from datetime import datetime
 
+# Reservations in these states no longer hold the car
+INACTIVE_STATUSES = ("cancelled", "completed")
+# Cars in these states can be booked for any dates their reservations leave free
+IN_SERVICE_STATUSES = ("available", "reserved", "rented")
+
 class Car(Base):
     __tablename__ = "cars"
 
@@ -12,6 +18,43 @@ class Car(Base):
     status = Column(String(20), default="available")  # available, rented, maintenance
     category = Column(String(50), default="Unknown")  # Economy, Sedan, SUV, etc.
 
+    # Keyset pagination walks the fleet in search order
+    __table_args__ = (
+        Index("ix_cars_search_order", "make", "model", "year", "id"),
+    )
+
+# Full-text index over the searchable car fields (SQLite FTS5). It is contentless:
+# only the index is stored, kept in sync with `cars` by triggers, and matches
+# are joined back to `cars` on rowid = cars.id.
+CARS_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS cars_fts USING fts5("
+    "make, model, year, car_id, content='', prefix='2 3 4', tokenize='unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS cars_fts_insert AFTER INSERT ON cars BEGIN "
+    "INSERT INTO cars_fts(rowid, make, model, year, car_id) "
+    "VALUES (new.id, new.make, new.model, new.year, new.id); END",
+    "CREATE TRIGGER IF NOT EXISTS cars_fts_delete AFTER DELETE ON cars BEGIN "
+    "INSERT INTO cars_fts(cars_fts, rowid, make, model, year, car_id) "
+    "VALUES ('delete', old.id, old.make, old.model, old.year, old.id); END",
+    "CREATE TRIGGER IF NOT EXISTS cars_fts_update AFTER UPDATE OF id, make, model, year ON cars BEGIN "
+    "INSERT INTO cars_fts(cars_fts, rowid, make, model, year, car_id) "
+    "VALUES ('delete', old.id, old.make, old.model, old.year, old.id); "
+    "INSERT INTO cars_fts(rowid, make, model, year, car_id) "
+    "VALUES (new.id, new.make, new.model, new.year, new.id); END",
+]
+CARS_FTS_POPULATE = (
+    "INSERT INTO cars_fts(rowid, make, model, year, car_id) "
+    "SELECT id, make, model, year, id FROM cars"
+)
+
+for _stmt in CARS_FTS_DDL:
+    event.listen(Car.__table__, "after_create", DDL(_stmt).execute_if(dialect="sqlite"))
+event.listen(
+    Car.__table__, "after_drop", DDL("DROP TABLE IF EXISTS cars_fts").execute_if(dialect="sqlite")
+)
+
+# Query-side handle on the FTS table; `cars_fts` is FTS5's whole-row match column
+cars_fts = table("cars_fts", column("rowid", Integer), column("rank"), column("cars_fts"))
+
 class User(Base):
     __tablename__ = "users"
 
@@ -30,7 +73,19 @@ class Reservation(Base):
     vehicle_type = Column(String(50), nullable=False)
     car_id = Column(Integer, nullable=False)
     user_id = Column(Integer, nullable=False)
-    start_date = Column(String(20), nullable=False)  # ISO format string
-    end_date = Column(String(20), nullable=False)    # ISO format string
-    status = Column(String(20), default="reserved")
-    created_at = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=False)
+    status = Column(String(20), default="reserved")  # reserved, active, completed, cancelled
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Overlap checks look up one car's reservations by date range
+    __table_args__ = (
+        Index("ix_reservations_car_dates", "car_id", "start_date", "end_date"),
+        # A user's reservations in (start_date, id) order for keyset pagination
+        Index("ix_reservations_user_start", "user_id", "start_date", "id"),
+        # The lifecycle scheduler finds reservations starting or ending by date
+        Index("ix_reservations_status_start", "status", "start_date"),
+        Index("ix_reservations_status_end", "status", "end_date"),
+        # Covers the utilization report's date-range scan without touching the table
+        Index("ix_reservations_occupancy", "end_date", "start_date", "car_id", "status"),
+    )
@@ -0,0 +1,31 @@
+import base64
+import binascii
+import json
+from typing import List, Sequence
+
+# Page sizes for the keyset-paginated list endpoints
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(sort_key: Sequence) -> str:
+    """Opaque token for the sort key of the last row on a page."""
+    raw = json.dumps(list(sort_key), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str, types: Sequence[type]) -> List:
+    """Sort key from ``encode_cursor``, checked against the expected element types.
+
+    Raises ValueError for anything that was not produced by encode_cursor.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(types):
+        raise ValueError("Invalid cursor")
+    if not all(isinstance(v, t) and not isinstance(v, bool) for v, t in zip(values, types)):
+        raise ValueError("Invalid cursor")
+    return values
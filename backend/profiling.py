@@ -0,0 +1,149 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import secrets
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+# Profiling settings, overridable through the environment. Nothing is profiled
+# unless PROFILING_ENABLED=1; then a request is profiled when it carries the
+# X-Profile: 1 header or is picked by PROFILE_SAMPLE_RATE (0..1).
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "0") == "1"
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_PATHS = tuple(p for p in os.environ.get("PROFILE_PATHS", "/api/").split(",") if p)
+# Directory for .prof (pstats) and .json files; profiles are always kept in memory too
+PROFILE_DIR = os.environ.get("PROFILE_DIR") or None
+PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP", "50"))
+PROFILE_TOP_FUNCTIONS = 40
+
+PROFILE_HEADER = b"x-profile"
+
+# SQL statements of the request being profiled in this context (None otherwise)
+current_statements: ContextVar[Optional[List[Dict[str, object]]]] = ContextVar(
+    "current_statements", default=None
+)
+
+
+def capture_statement(statement: str, seconds: float) -> None:
+    """Called for every executed statement; keeps it if a profiled request ran it."""
+    statements = current_statements.get()
+    if statements is not None:
+        statements.append({"sql": statement, "ms": round(seconds * 1000, 3)})
+
+
+class ProfileStore:
+    """The most recent profiles, newest last, optionally mirrored to a directory."""
+
+    def __init__(self, keep: int = 50, directory: Optional[str] = None) -> None:
+        self.directory = directory
+        self._profiles: "deque[Dict[str, object]]" = deque(maxlen=keep)
+        self._lock = threading.Lock()
+
+    def add(self, record: Dict[str, object], profiler: cProfile.Profile) -> None:
+        with self._lock:
+            self._profiles.append(record)
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            base = os.path.join(self.directory, str(record["id"]))
+            profiler.dump_stats(base + ".prof")
+            with open(base + ".json", "w") as f:
+                json.dump(record, f, indent=2)
+
+    def summaries(self) -> List[Dict[str, object]]:
+        with self._lock:
+            return [
+                {k: v for k, v in record.items() if k not in ("stats", "statements")}
+                for record in reversed(self._profiles)
+            ]
+
+    def get(self, profile_id: str) -> Optional[Dict[str, object]]:
+        with self._lock:
+            return next((r for r in self._profiles if r["id"] == profile_id), None)
+
+
+profile_store = ProfileStore(PROFILE_KEEP, PROFILE_DIR)
+
+
+def wants_profile(scope: dict) -> bool:
+    if not scope["path"].startswith(PROFILE_PATHS):
+        return False
+    for name, value in scope["headers"]:
+        if name == PROFILE_HEADER:
+            return value in (b"1", b"true", b"yes")
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that runs selected requests under cProfile.
+
+    The profile records the request's functions sorted by cumulative time and
+    every SQL statement it executed (text and duration, no parameters). The
+    response carries an X-Profile-Id header naming it for /debug/profiles.
+
+    cProfile traces the whole event loop thread, so requests interleaving with
+    the profiled one show up in it too; profile under light load, or read the
+    SQL list, which is exact. One request is profiled at a time per process.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+        self._busy = threading.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not PROFILING_ENABLED or not wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+        if not self._busy.acquire(blocking=False):
+            await self.app(scope, receive, send)  # another profile is running
+            return
+
+        profile_id = f"{int(time.time() * 1000)}-{secrets.token_hex(3)}"
+        status = 500
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-id", profile_id.encode())
+                ]
+            await send(message)
+
+        statements: List[Dict[str, object]] = []
+        token = current_statements.set(statements)
+        profiler = cProfile.Profile()
+        started_at = datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+        start = time.perf_counter()
+        try:
+            profiler.enable()
+            try:
+                await self.app(scope, receive, send_with_id)
+            finally:
+                profiler.disable()
+        finally:
+            elapsed = time.perf_counter() - start
+            current_statements.reset(token)
+            self._busy.release()
+
+        text = io.StringIO()
+        pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+        profile_store.add({
+            "id": profile_id,
+            "method": scope["method"],
+            "path": scope["path"],
+            "query": scope.get("query_string", b"").decode("latin-1"),
+            "status": status,
+            "started_at": started_at,
+            "duration_ms": round(elapsed * 1000, 3),
+            "sql_count": len(statements),
+            "sql_ms": round(sum(s["ms"] for s in statements), 3),
+            "statements": statements,
+            "stats": text.getvalue(),
+        }, profiler)
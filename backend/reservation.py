@@ -1,4 +1,6 @@
 class Reservation:
+    __slots__ = ("vehicle_type", "car_id", "user_id", "start_date", "end_date", "status")
+
     def __init__(
         self,
         vehicle_type: str,
@@ -0,0 +1,165 @@
+"""Streaming export of reservations as NDJSON, CSV or columnar JSON chunks.
+
+Rows come from a single query read with yield_per (a server-side cursor where
+the driver has one) and are encoded one chunk at a time, so memory stays flat
+however large the table is and output starts as soon as the first chunk is
+read. The "columns" format writes one JSON object of column arrays per chunk
+(one line each), which loads straight into column-oriented tools.
+
+Usage: python -m backend.reservation_export [--format ndjson|csv|columns] [--start-date 2025-01-01]
+       [--end-date 2025-03-31] [--car-id 12] [--category SUV] [--status reserved,active] [--out FILE]
+"""
+import argparse
+import csv
+import io
+import sys
+from datetime import date, datetime
+from typing import Iterator, List, Optional, Sequence
+
+from sqlalchemy import Select, String, select, type_coerce
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+from .models import Reservation as DBReservation
+from .responses import dumps
+
+FORMATS = ("ndjson", "csv", "columns")
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "columns": "application/x-ndjson",
+}
+EXTENSIONS = {"ndjson": "ndjson", "csv": "csv", "columns": "columns.ndjson"}
+DEFAULT_CHUNK_SIZE = 10_000
+
+FIELDS = ("id", "car_id", "user_id", "vehicle_type", "start_date", "end_date", "status", "created_at")
+# Positions of the date/datetime columns, written as ISO strings
+DATE_FIELDS = (4, 5, 7)
+# Dates are selected as driver values, the ISO strings SQLite stores, instead of
+# building a date object per value only to format it back
+EXPORT_COLUMNS = tuple(
+    type_coerce(getattr(DBReservation, name), String).label(name) if i in DATE_FIELDS
+    else getattr(DBReservation, name)
+    for i, name in enumerate(FIELDS)
+)
+
+
+def export_statement(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    car_id: Optional[int] = None,
+    category: Optional[str] = None,
+    statuses: Optional[Sequence[str]] = None,
+) -> Select:
+    """Reservations in id order, optionally only those overlapping ``start``..``end``.
+
+    ``category`` matches the vehicle type the reservation was booked under.
+    """
+    stmt = select(*EXPORT_COLUMNS).order_by(DBReservation.id)
+    if start is not None:
+        stmt = stmt.where(DBReservation.end_date >= start)
+    if end is not None:
+        stmt = stmt.where(DBReservation.start_date <= end)
+    if car_id is not None:
+        stmt = stmt.where(DBReservation.car_id == car_id)
+    if category:
+        stmt = stmt.where(DBReservation.vehicle_type == category)
+    if statuses:
+        stmt = stmt.where(DBReservation.status.in_(list(statuses)))
+    return stmt
+
+
+def _plain_rows(rows) -> List[list]:
+    """``rows`` with date objects (from drivers that return them) as ISO strings."""
+    if not rows or all(isinstance(rows[0][i], (str, type(None))) for i in DATE_FIELDS):
+        return rows
+    out = []
+    for row in rows:
+        row = list(row)
+        for i in DATE_FIELDS:
+            value = row[i]
+            if isinstance(value, (date, datetime)):
+                row[i] = value.isoformat()
+        out.append(row)
+    return out
+
+
+def encode_chunk(rows, fmt: str) -> bytes:
+    """One chunk of rows (tuples in FIELDS order) in ``fmt``."""
+    rows = _plain_rows(rows)
+    if fmt == "ndjson":
+        return b"".join(dumps(dict(zip(FIELDS, row))) + b"\n" for row in rows)
+    if fmt == "csv":
+        out = io.StringIO()
+        csv.writer(out, lineterminator="\n").writerows(rows)
+        return out.getvalue().encode("utf-8")
+    if fmt == "columns":
+        columns = list(zip(*rows))
+        return dumps({name: list(values) for name, values in zip(FIELDS, columns)}) + b"\n"
+    raise ValueError(f"Unknown export format {fmt!r}")
+
+
+def export_chunks(
+    db: Session, fmt: str = "ndjson", chunk_size: int = DEFAULT_CHUNK_SIZE, **filters
+) -> Iterator[bytes]:
+    """Yield the export in ``fmt`` chunk by chunk; ``filters`` go to export_statement.
+
+    The CSV header goes out before the query runs, so a client sees the first
+    byte right away.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}")
+    if fmt == "csv":
+        yield (",".join(FIELDS) + "\n").encode("utf-8")
+    result = db.connection().execute(
+        export_statement(**filters).execution_options(yield_per=chunk_size)
+    )
+    try:
+        for part in result.partitions():
+            yield encode_chunk(part, fmt)
+    finally:
+        result.close()
+
+
+def export_reservations(
+    fmt: str = "ndjson", chunk_size: int = DEFAULT_CHUNK_SIZE, **filters
+) -> Iterator[bytes]:
+    """export_chunks in a session of its own, closed when the iterator finishes or is closed."""
+    db = SessionLocal()
+    try:
+        yield from export_chunks(db, fmt, chunk_size, **filters)
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export reservations as NDJSON, CSV or columnar chunks")
+    parser.add_argument("--format", choices=FORMATS, default="ndjson")
+    parser.add_argument("--start-date", type=date.fromisoformat, help="only reservations ending on or after")
+    parser.add_argument("--end-date", type=date.fromisoformat, help="only reservations starting on or before")
+    parser.add_argument("--car-id", type=int)
+    parser.add_argument("--category", help="vehicle type the reservation was booked under")
+    parser.add_argument("--status", help="comma-separated statuses")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--out", help="output file (default: stdout)")
+    args = parser.parse_args()
+
+    out = open(args.out, "wb") if args.out else sys.stdout.buffer
+    try:
+        for chunk in export_reservations(
+            args.format,
+            args.chunk_size,
+            start=args.start_date,
+            end=args.end_date,
+            car_id=args.car_id,
+            category=args.category,
+            statuses=[s for s in args.status.split(",") if s] if args.status else None,
+        ):
+            out.write(chunk)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
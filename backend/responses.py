@@ -0,0 +1,27 @@
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder is used without it
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    """Compact UTF-8 JSON, through orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered by orjson when installed, compact stdlib json otherwise.
+
+    Endpoints that return one of these directly also skip FastAPI's
+    jsonable_encoder pass, so content must already be plain JSON types.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
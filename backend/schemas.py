@@ -16,6 +16,11 @@ class CarBase(BaseModel):
 class CarCreate(CarBase): #looks redundant, but if we decide to to change rules we can do it from here without unintentionally breaking shit
     pass
 
+class CarImport(CarCreate):
+    # bulk import rows may pin the car id, and carry the category the cars table searches by
+    id: Optional[int] = None
+    category: str = "Unknown"
+
 class CarUpdate(BaseModel):
     # fields are all optional so the client can send partial updates to make it easier for them
     make: Optional[str] = None
@@ -31,4 +36,4 @@ class CarUpdate(BaseModel):
 
 class CarOut(CarBase):
     id: int
-    model_config: ConfigDict(from_attributes=True) # pydantic v2: enables ORM output
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True) # pydantic v2: enables ORM output
\ No newline at end of file
@@ -2,6 +2,8 @@ from .reservation import Reservation
 
 
 class User:
+    __slots__ = ("id", "name", "email", "license_number", "role", "reservations")
+
     def __init__(
         self,
         user_id: int,
@@ -0,0 +1,115 @@
+import asyncio
+import os
+from typing import List, Optional, Tuple
+
+from .async_db_services import AsyncDatabaseReservationStore
+from .database import AsyncSessionLocal
+from .reservation import Reservation
+
+# Group commit settings, overridable through the environment
+BOOKING_GROUP_COMMIT = os.environ.get("BOOKING_GROUP_COMMIT", "0") == "1"
+BOOKING_BATCH_WINDOW_MS = float(os.environ.get("BOOKING_BATCH_WINDOW_MS", "0"))
+BOOKING_MAX_BATCH = int(os.environ.get("BOOKING_MAX_BATCH", "256"))
+
+Pending = Tuple[Reservation, "asyncio.Future[Optional[ValueError]]"]
+
+
+class BookingQueue:
+    """Group commit for bookings: many callers, one writer, one transaction per batch.
+
+    Callers enqueue a reservation and wait on a future. The writer task takes
+    the first waiting booking, waits ``window`` seconds for more to arrive,
+    takes up to ``max_batch`` of what is queued, then books the whole batch
+    with book_many in best-effort mode: one transaction and one commit, each
+    item checked in order against the database and the items before it. Every
+    caller gets its own result, exactly as if it had booked alone.
+
+    While a batch is being written new bookings keep queueing, so under load
+    batches grow by themselves even with a zero window.
+    """
+
+    def __init__(
+        self, session_factory=AsyncSessionLocal, window: float = 0.0, max_batch: int = 256
+    ) -> None:
+        self.session_factory = session_factory
+        self.window = window
+        self.max_batch = max_batch
+        self.batches = 0
+        self.items = 0
+        self._queue: Optional["asyncio.Queue[Pending]"] = None
+        self._writer: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._writer is not None and not self._writer.done()
+
+    def start(self) -> None:
+        """Start the writer task on the running event loop."""
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._writer = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Write out everything already queued, then stop the writer."""
+        if not self.running:
+            return
+        await self._queue.join()
+        self._writer.cancel()
+        try:
+            await self._writer
+        except asyncio.CancelledError:
+            pass
+        self._writer = None
+
+    async def book(self, r: Reservation) -> None:
+        """Queue ``r`` and wait for its batch; raises like DatabaseReservationStore.book."""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((r, future))
+        error = await future
+        if error:
+            raise error
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "queued": self._queue.qsize() if self._queue else 0,
+        }
+
+    async def _collect(self) -> List[Pending]:
+        batch = [await self._queue.get()]
+        if self.window > 0:
+            await asyncio.sleep(self.window)  # let more bookings arrive
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect()
+            try:
+                async with self.session_factory() as db:
+                    errors = await AsyncDatabaseReservationStore(db).book_many(
+                        [r for r, _ in batch], all_or_nothing=False
+                    )
+                for (_, future), error in zip(batch, errors):
+                    if not future.done():
+                        future.set_result(error)
+            except Exception as ex:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(ex)
+            finally:
+                self.batches += 1
+                self.items += len(batch)
+                for _ in batch:
+                    self._queue.task_done()
+
+
+# Used by /api/book when BOOKING_GROUP_COMMIT=1; started with the app
+booking_queue = BookingQueue(window=BOOKING_BATCH_WINDOW_MS / 1000, max_batch=BOOKING_MAX_BATCH)
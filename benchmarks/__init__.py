@@ -0,0 +1,4 @@
+"""Benchmarks and load tests for the car rental API.
+
+Run the modules from the project root, e.g. ``python -m benchmarks.loadtest``.
+"""
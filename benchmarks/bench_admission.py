@@ -0,0 +1,120 @@
+"""Booking bursts beyond what SQLite can commit, with and without admission control.
+
+Bookings arrive open-loop at --rate per second for --seconds, each for its own
+car and from one of --clients client addresses, against the in-process app.
+Without admission control every request queues for the write lock and
+latency keeps growing; with it, requests over the queue-delay budget are shed
+at once with 429/503 and the admitted ones stay within the budget. "in time"
+counts bookings answered within the frontend's 10 s timeout.
+
+Usage: python -m benchmarks.bench_admission [--rate 600] [--seconds 10] [--clients 200]
+       [--concurrency 8] [--budget-ms 2000]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date, timedelta
+from typing import List, Tuple
+
+import httpx
+
+CLIENT_TIMEOUT = 10.0
+
+
+async def burst(app, first_car: int, n: int, rate: float, clients: int, users: int) -> List[Tuple[int, float]]:
+    results: List[Tuple[int, float]] = []
+    start_date = (date.today() + timedelta(days=30)).isoformat()
+    end_date = (date.today() + timedelta(days=32)).isoformat()
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+
+        async def book(i: int) -> None:
+            payload = {"car_id": first_car + i, "user_id": i % users + 1,
+                       "start_date": start_date, "end_date": end_date}
+            headers = {"X-Forwarded-For": f"10.0.{i % clients // 250}.{i % clients % 250}"}
+            t = time.perf_counter()
+            r = await client.post("/api/book", json=payload, headers=headers)
+            results.append((r.status_code, time.perf_counter() - t))
+
+        tasks = []
+        t0 = time.perf_counter()
+        for i in range(n):
+            delay = t0 + i / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(book(i)))
+        await asyncio.gather(*tasks)
+    return results
+
+
+def report(name: str, results: List[Tuple[int, float]], elapsed: float) -> None:
+    codes = Counter(code for code, _ in results)
+    ok = sorted(s for code, s in results if code < 400)
+    shed = [s for code, s in results if code in (429, 503)]
+    in_time = sum(1 for s in ok if s <= CLIENT_TIMEOUT)
+    qs = statistics.quantiles(ok, n=100) if len(ok) > 1 else [0.0] * 99
+    shed_p50 = statistics.median(shed) * 1000 if shed else 0.0
+    print(
+        f"  {name:20} booked {len(ok):5} ({in_time:5} in time)   shed {len(shed):5}   "
+        f"booked p50 {qs[49] * 1000:7.0f} ms  p99 {qs[98] * 1000:7.0f} ms  max {ok[-1] * 1000 if ok else 0:7.0f} ms   "
+        f"shed p50 {shed_p50:5.1f} ms   all answered after {elapsed:5.1f} s   codes {dict(sorted(codes.items()))}"
+    )
+
+
+async def compare(args: argparse.Namespace) -> None:
+    from backend.admission import AdmissionController, AdmissionMiddleware
+    from backend.api import app
+
+    n = int(args.rate * args.seconds)
+    variants = [
+        ("no admission", None),
+        ("admission control", AdmissionMiddleware(
+            app,
+            AdmissionController(
+                concurrency=args.concurrency, budget=args.budget_ms / 1000,
+                client_rate=args.client_rate, client_burst=args.client_rate * 2,
+                route_rates={}, client_header="x-forwarded-for",
+            ),
+            enabled=True,
+        )),
+    ]
+    print(f"{n} bookings at {args.rate:g}/s from {args.clients} clients")
+    async with app.router.lifespan_context(app):
+        for i, (name, wrapped) in enumerate(variants):
+            t = time.perf_counter()
+            results = await burst(wrapped or app, i * n + 1, n, args.rate, args.clients, args.users)
+            report(name, results, time.perf_counter() - t)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rate", type=float, default=600, help="bookings sent per second")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8, help="admitted writes at once")
+    parser.add_argument("--budget-ms", type=float, default=2000, help="queue-delay budget")
+    parser.add_argument("--client-rate", type=float, default=5, help="bookings/s per client")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        # The backend reads its database settings at import time
+        os.environ["DATABASE_URL"] = url
+        os.environ.pop("ASYNC_DATABASE_URL", None)
+        os.environ["LIFECYCLE_SCHEDULER"] = "0"
+        from . import datagen
+
+        n = int(args.rate * args.seconds)
+        datagen.generate(url, 2 * n + 1, args.users, 0).dispose()
+        print(f"generated {2 * n + 1} cars / {args.users} users", file=sys.stderr)
+        asyncio.run(compare(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Fleet utilization report: per-row Python loop vs the NumPy difference-array version.
+
+Both start from the same streamed reservation spans; the fetch is timed
+separately since it is the same work for either.
+
+Usage: python -m benchmarks.bench_analytics [--cars 10000] [--reservations 1000000] [--days 90,365]
+"""
+import argparse
+import os
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, List
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+
+from backend.analytics import occupancy, reservation_spans, utilization
+from backend.models import Car as DBCar
+
+from . import datagen
+
+
+def naive_busy(category_of: Dict[int, str], n_days: int, spans) -> Dict[str, List[int]]:
+    """Cars out per day and category, one reservation and one day at a time."""
+    busy = defaultdict(lambda: [set() for _ in range(n_days)])
+    for car_id, first, last in spans:
+        per_day = busy[category_of[car_id]]
+        for day in range(first, last + 1):
+            per_day[day].add(car_id)
+    return {cat: [len(cars) for cars in per_day] for cat, per_day in busy.items()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cars", type=int, default=10_000)
+    parser.add_argument("--reservations", type=int, default=1_000_000)
+    parser.add_argument("--days", default="90,365", help="report lengths to time, ending today")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        t = time.perf_counter()
+        engine = datagen.generate(
+            f"sqlite:///{os.path.join(tmp, 'bench.db')}", args.cars, 1000, args.reservations
+        )
+        print(f"build db: {args.cars} cars / {args.reservations} reservations in {time.perf_counter() - t:.1f}s")
+        db = sessionmaker(bind=engine)()
+        car_rows = db.execute(select(DBCar.id, DBCar.category).order_by(DBCar.category, DBCar.id)).all()
+        car_ids = np.array([r[0] for r in car_rows], dtype=np.int64)
+        categories = [r[1] for r in car_rows]
+        category_of = dict(car_rows)
+
+        end = date.today()
+        for n_days in [int(d) for d in args.days.split(",")]:
+            start = end - timedelta(days=n_days - 1)
+            t = time.perf_counter()
+            spans = reservation_spans(db, start, end)
+            fetch_s = time.perf_counter() - t
+
+            rows = list(zip(*(a.tolist() for a in spans)))
+            t = time.perf_counter()
+            naive = naive_busy(category_of, n_days, rows)
+            naive_s = time.perf_counter() - t
+
+            t = time.perf_counter()
+            report = occupancy(start, n_days, car_ids, categories, *spans)
+            fast_s = time.perf_counter() - t
+
+            t = time.perf_counter()
+            utilization(db, start, end)
+            total_s = time.perf_counter() - t
+
+            assert naive == {c: v["busy"] for c, v in report["categories"].items() if c in naive}, \
+                "difference arrays disagree with the loop"
+            print(f"{n_days} days to {end} ({len(rows)} reservations):")
+            print(f"  streamed fetch:    {fetch_s * 1000:8.0f} ms")
+            print(f"  python loop:       {naive_s * 1000:8.0f} ms")
+            print(f"  difference arrays: {fast_s * 1000:8.0f} ms ({naive_s / fast_s:.0f}x)")
+            print(f"  whole report:      {total_s * 1000:8.0f} ms")
+            print(f"  peak {report['peak']}, mean utilization {report['mean_utilization']}, "
+                  f"{len(report['idle_cars'])} idle cars")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
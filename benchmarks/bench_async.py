@@ -0,0 +1,119 @@
+"""Latency of the async endpoints vs the previous sync (threadpool) endpoints.
+
+Both variants serve /api/cars and /api/my-reservations from the same SQLite file
+and are driven in-process through httpx's ASGI transport with the same number
+of concurrent clients.
+
+Usage: python -m benchmarks.bench_async [--cars 2000] [--concurrency 64] [--requests 3000]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import Dict, List
+
+import httpx
+from fastapi import Depends, FastAPI, Query
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from backend.api import app as async_app, car_to_dict, res_to_dict
+from backend.database import get_async_db
+from backend.db_services import DatabaseFleetStore, DatabaseReservationStore
+
+from .datagen import CATEGORIES, QUERIES, generate
+
+def sync_app(path: str) -> FastAPI:
+    """The endpoints as they were before the async conversion: sync def on the threadpool."""
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+
+    @app.get("/api/cars")
+    def api_cars(q: str = Query(default=""), category: str = Query(default="All"), db: Session = Depends(get_db)):
+        return [car_to_dict(c) for c in DatabaseFleetStore(db).search(q, category)]
+
+    @app.get("/api/my-reservations")
+    def api_my_reservations(user_id: int = Query(...), db: Session = Depends(get_db)):
+        return [res_to_dict(r) for r in DatabaseReservationStore(db).for_user(user_id)]
+
+    return app
+
+
+def use_async_db(path: str) -> None:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    AsyncSessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+    async def get_bench_db():
+        async with AsyncSessionLocal() as db:
+            yield db
+
+    async_app.dependency_overrides[get_async_db] = get_bench_db
+
+
+async def drive(app: FastAPI, concurrency: int, total: int, n_users: int) -> Dict[str, List[float]]:
+    rng = random.Random(0)
+    plan = [
+        ("/api/cars", {"q": rng.choice(QUERIES), "category": rng.choice(CATEGORIES + ["All"])})
+        if rng.random() < 0.7
+        else ("/api/my-reservations", {"user_id": rng.randint(1, n_users)})
+        for _ in range(total)
+    ]
+    latencies: Dict[str, List[float]] = {"/api/cars": [], "/api/my-reservations": []}
+    queue: asyncio.Queue = asyncio.Queue()
+    for item in plan:
+        queue.put_nowait(item)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def worker() -> None:
+            while not queue.empty():
+                path, params = queue.get_nowait()
+                t = time.perf_counter()
+                r = await client.get(path, params=params)
+                latencies[path].append(time.perf_counter() - t)
+                assert r.status_code == 200, r.text
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
+
+
+def report(name: str, latencies: Dict[str, List[float]], elapsed: float) -> None:
+    total = sum(len(v) for v in latencies.values())
+    print(f"{name}: {total / elapsed:.0f} req/s")
+    for path, values in latencies.items():
+        qs = statistics.quantiles(values, n=100)
+        print(f"  {path:24} p50 {qs[49] * 1000:7.1f} ms   p99 {qs[98] * 1000:7.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cars", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=3000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        generate(f"sqlite:///{path}", args.cars, args.users, args.users * 20).dispose()
+        use_async_db(path)
+        for name, app in (("threadpool (sync def)", sync_app(path)), ("async def", async_app)):
+            t = time.perf_counter()
+            latencies = asyncio.run(drive(app, args.concurrency, args.requests, args.users))
+            report(name, latencies, time.perf_counter() - t)
+
+
+if __name__ == "__main__":
+    main()
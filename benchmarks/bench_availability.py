@@ -0,0 +1,59 @@
+"""Fleet availability: per-car overlaps() loop vs the day-bitmap index.
+
+Usage: python -m benchmarks.bench_availability [--cars 10000] [--reservations 1000000]
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+from sqlalchemy.orm import sessionmaker
+
+from backend.availability import AvailabilityIndex
+from backend.db_services import DatabaseReservationStore
+from backend.models import Car as DBCar
+
+from . import datagen
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cars", type=int, default=10_000)
+    parser.add_argument("--reservations", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        t = time.perf_counter()
+        engine = datagen.generate(
+            f"sqlite:///{os.path.join(tmp, 'bench.db')}", args.cars, 1000, args.reservations
+        )
+        print(f"build db: {args.cars} cars / {args.reservations} reservations in {time.perf_counter() - t:.1f}s")
+        db = sessionmaker(bind=engine)()
+        car_ids = [cid for (cid,) in db.query(DBCar.id).order_by(DBCar.id)]
+
+        index = AvailabilityIndex()
+        t = time.perf_counter()
+        index.load(db)
+        print(f"index load: {time.perf_counter() - t:.2f}s")
+
+        store = DatabaseReservationStore(db)
+        ranges = [(date.today() + timedelta(days=d), date.today() + timedelta(days=d + 7))
+                  for d in range(0, 7 * args.queries, 7)]
+
+        t = time.perf_counter()
+        naive = [[cid for cid in car_ids if not store.overlaps(cid, s, e)] for s, e in ranges]
+        naive_s = (time.perf_counter() - t) / len(ranges)
+
+        t = time.perf_counter()
+        fast = [index.free_car_ids(car_ids, s, e) for s, e in ranges]
+        fast_s = (time.perf_counter() - t) / len(ranges)
+
+        assert naive == fast, "index disagrees with overlaps()"
+        print(f"overlaps() loop: {naive_s * 1000:.1f} ms/query")
+        print(f"bitmap index:    {fast_s * 1000:.2f} ms/query ({naive_s / fast_s:.0f}x)")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Concurrent booking stress test: checks for double bookings and reports bookings/sec.
+
+Usage: python -m benchmarks.bench_booking [--cars 200] [--threads 16] [--attempts 4000]
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.orm import sessionmaker
+
+from backend.base import Base
+from backend.db_services import DatabaseReservationStore, CarUnavailable, ReservationOverlap
+from backend.models import Car as DBCar
+from backend.reservation import Reservation
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cars", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--attempts", type=int, default=4000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(
+            f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+            connect_args={"check_same_thread": False, "timeout": 60},
+        )
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            conn.execute(insert(DBCar), [
+                {"id": cid, "make": "Make", "model": "Model", "year": 2020,
+                 "status": "available", "category": "Economy"}
+                for cid in range(1, args.cars + 1)
+            ])
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        counts = {"ok": 0, "conflict": 0}
+        counts_lock = threading.Lock()
+        per_thread = args.attempts // args.threads
+        today = date.today()
+
+        def worker(seed: int) -> None:
+            rng = random.Random(seed)
+            db = Session()
+            store = DatabaseReservationStore(db)
+            try:
+                for _ in range(per_thread):
+                    start = today + timedelta(days=rng.randint(0, 30))
+                    r = Reservation(
+                        vehicle_type="Economy",
+                        car_id=rng.randint(1, args.cars),
+                        user_id=seed,
+                        start_date=start.isoformat(),
+                        end_date=(start + timedelta(days=rng.randint(0, 5))).isoformat(),
+                        status="reserved",
+                    )
+                    try:
+                        store.book(r)
+                        outcome = "ok"
+                    except (CarUnavailable, ReservationOverlap):
+                        outcome = "conflict"
+                    with counts_lock:
+                        counts[outcome] += 1
+            finally:
+                db.close()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+        t = time.perf_counter()
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+        elapsed = time.perf_counter() - t
+
+        with engine.connect() as conn:
+            double = conn.execute(text(
+                "SELECT COUNT(*) FROM reservations a JOIN reservations b "
+                "ON a.car_id = b.car_id AND a.id < b.id "
+                "AND a.start_date <= b.end_date AND b.start_date <= a.end_date"
+            )).scalar()
+            rows = conn.execute(text("SELECT COUNT(*) FROM reservations")).scalar()
+
+        attempts = counts["ok"] + counts["conflict"]
+        print(f"{attempts} attempts on {args.threads} threads in {elapsed:.2f}s "
+              f"({attempts / elapsed:.0f} attempts/s, {counts['ok'] / elapsed:.0f} bookings/s)")
+        print(f"booked: {counts['ok']} (rows: {rows}), rejected: {counts['conflict']}")
+        print(f"double bookings: {double}")
+        assert double == 0 and rows == counts["ok"]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Reservation export: streamed chunks vs loading every row before encoding.
+
+For each format, reports time to the first chunk and rows per second of
+draining the export, then the peak Python memory (tracemalloc) of a second,
+separate pass, since tracing slows every allocation down. The "materialized"
+line is the naive version: fetch all rows into a list, then encode them once.
+
+Usage: python -m benchmarks.bench_export [--cars 10000] [--reservations 1000000]
+       [--formats ndjson,csv,columns] [--chunk-size 10000]
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy.orm import sessionmaker
+
+from backend.reservation_export import encode_chunk, export_chunks, export_statement
+
+from . import datagen
+
+
+def drain(chunks):
+    """(seconds to first chunk, total seconds, bytes) of an iterator."""
+    t = time.perf_counter()
+    first = None
+    size = 0
+    for chunk in chunks:
+        if first is None:
+            first = time.perf_counter() - t
+        size += len(chunk)
+    total = time.perf_counter() - t
+    return first or total, total, size
+
+
+def peak_memory(chunks) -> int:
+    tracemalloc.start()
+    for _ in chunks:
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def materialized(db, fmt: str):
+    rows = db.execute(export_statement()).all()
+    yield encode_chunk(rows, fmt)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cars", type=int, default=10_000)
+    parser.add_argument("--reservations", type=int, default=1_000_000)
+    parser.add_argument("--formats", default="ndjson,csv,columns")
+    parser.add_argument("--chunk-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        t = time.perf_counter()
+        engine = datagen.generate(
+            f"sqlite:///{os.path.join(tmp, 'bench.db')}", args.cars, 1000, args.reservations
+        )
+        print(f"build db: {args.cars} cars / {args.reservations} reservations in {time.perf_counter() - t:.1f}s")
+        Session = sessionmaker(bind=engine)
+
+        for fmt in args.formats.split(","):
+            for name, make in (
+                ("streamed", lambda db: export_chunks(db, fmt, args.chunk_size)),
+                ("materialized", lambda db: materialized(db, fmt)),
+            ):
+                with Session() as db:
+                    first, total, size = drain(make(db))
+                with Session() as db:
+                    peak = peak_memory(make(db))
+                print(
+                    f"  {fmt:8} {name:13} first chunk {first * 1000:8.1f} ms   "
+                    f"{args.reservations / total:9.0f} rows/s   {size / 2**20:7.1f} MiB out   "
+                    f"peak {peak / 2**20:7.1f} MiB"
+                )
+
+
+if __name__ == "__main__":
+    main()
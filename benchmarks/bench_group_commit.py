@@ -0,0 +1,137 @@
+"""Booking throughput with one commit per booking vs group commit through BookingQueue.
+
+Every booking targets a different car, so all of them succeed and the numbers
+measure only the write path. Each variant runs against a fresh SQLite file with
+the given synchronous setting; FULL fsyncs on every commit, which is where
+batching commits pays off most.
+
+Usage: python -m benchmarks.bench_group_commit [--bookings 4000] [--concurrency 64]
+       [--windows 0,1,2,5,10] [--synchronous NORMAL,FULL]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import List, Optional
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from backend.async_db_services import AsyncDatabaseReservationStore
+from backend.base import Base
+from backend.database import set_sqlite_pragmas
+from backend.models import Car as DBCar
+from backend.reservation import Reservation
+from backend.write_queue import BookingQueue
+
+
+def make_db(path: str, cars: int) -> None:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(DBCar), [
+            {"id": cid, "make": "Make", "model": "Model", "year": 2020,
+             "status": "available", "category": "Economy"}
+            for cid in range(1, cars + 1)
+        ])
+    engine.dispose()
+
+
+def session_factory(path: str, synchronous: str):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}", pool_size=80, max_overflow=0)
+
+    def pragmas(dbapi_connection, connection_record):
+        set_sqlite_pragmas(dbapi_connection, connection_record)
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA synchronous={synchronous}")
+        cursor.close()
+
+    event.listen(engine.sync_engine, "connect", pragmas)
+    return engine, async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+
+def reservations(n: int) -> List[Reservation]:
+    rng = random.Random(0)
+    car_ids = list(range(1, n + 1))
+    rng.shuffle(car_ids)
+    today = date.today()
+    out = []
+    for i, car_id in enumerate(car_ids):
+        start = today + timedelta(days=rng.randint(0, 30))
+        out.append(Reservation(
+            vehicle_type="Economy", car_id=car_id, user_id=i % 500 + 1,
+            start_date=start.isoformat(),
+            end_date=(start + timedelta(days=rng.randint(0, 5))).isoformat(),
+            status="reserved",
+        ))
+    return out
+
+
+async def run(path: str, synchronous: str, window: Optional[float], bookings: int, concurrency: int):
+    engine, Session = session_factory(path, synchronous)
+    queue = None
+    if window is not None:
+        queue = BookingQueue(Session, window=window / 1000)
+        queue.start()
+
+    async def book_direct(r: Reservation) -> None:
+        async with Session() as db:
+            await AsyncDatabaseReservationStore(db).book(r)
+
+    book = queue.book if queue else book_direct
+    pending = reservations(bookings)
+    latencies: List[float] = []
+
+    async def worker() -> None:
+        while pending:
+            r = pending.pop()
+            t = time.perf_counter()
+            await book(r)
+            latencies.append(time.perf_counter() - t)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    stats = queue.stats() if queue else None
+    if queue:
+        await queue.stop()
+    await engine.dispose()
+    return elapsed, latencies, stats
+
+
+async def compare(args: argparse.Namespace) -> None:
+    # One event loop for all variants: the store's write gate is a module-level asyncio.Lock
+    windows = [float(w) for w in args.windows.split(",") if w]
+    for synchronous in args.synchronous.upper().split(","):
+        print(f"synchronous={synchronous}, {args.bookings} bookings, {args.concurrency} concurrent")
+        for window in [None] + windows:
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, "bench.db")
+                make_db(path, args.bookings)
+                elapsed, latencies, stats = await run(
+                    path, synchronous, window, args.bookings, args.concurrency
+                )
+            qs = statistics.quantiles(latencies, n=100)
+            name = "commit per booking" if window is None else f"group commit {window:g} ms"
+            batch = f"   mean batch {stats['mean_batch']:6.1f}" if stats else ""
+            print(
+                f"  {name:22} {len(latencies) / elapsed:7.0f} bookings/s   "
+                f"p50 {qs[49] * 1000:7.1f} ms   p99 {qs[98] * 1000:7.1f} ms{batch}"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bookings", type=int, default=4000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--windows", default="0,1,2,5,10", help="batch windows to try, in ms")
+    parser.add_argument("--synchronous", default="NORMAL,FULL")
+    asyncio.run(compare(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
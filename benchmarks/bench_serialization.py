@@ -0,0 +1,125 @@
+"""Full-fleet /api/cars response: ORM entities + generic encoding vs projected rows + fast JSON.
+
+Measures GET /api/cars end to end (in-process ASGI: catalog cache cold and
+warm, gzip-compressed, and a conditional GET answered with 304) and then each
+stage on its own: the query, row-to-dict conversion and JSON encoding, old
+path against new.
+
+Usage: python -m benchmarks.bench_serialization [--cars 50000] [--repeat 5]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import Callable
+
+
+def timed(fn: Callable, repeat: int) -> float:
+    """Best of ``repeat`` runs, in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best * 1000
+
+
+def peak_kib(fn: Callable) -> float:
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1024
+
+
+async def end_to_end(repeat: int) -> None:
+    import httpx
+
+    from backend.api import app
+    from backend.cache import catalog_cache
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for label, clear, headers in (
+                ("cold cache", True, {"accept-encoding": "identity"}),
+                ("warm cache", False, {"accept-encoding": "identity"}),
+                ("warm, gzip", False, {"accept-encoding": "gzip"}),
+                ("If-None-Match", False, {"if-none-match": None}),
+            ):
+                if "if-none-match" in headers:
+                    # Taken here: the cold runs clear the cache, which changes the tag
+                    headers["if-none-match"] = (await client.get("/api/cars")).headers["etag"]
+                best = float("inf")
+                for _ in range(repeat + 1):
+                    if clear:
+                        catalog_cache.clear()
+                    t = time.perf_counter()
+                    r = await client.get("/api/cars", headers=headers)
+                    best = min(best, time.perf_counter() - t)
+                assert r.status_code in (200, 304)
+                wire = int(r.headers.get("content-length", 0))
+                print(f"GET /api/cars {label:14} {r.status_code} {wire / 1e6:6.2f} MB on the wire "
+                      f"{best * 1000:8.1f} ms")
+
+
+def stages(repeat: int) -> None:
+    import json
+
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from sqlalchemy import select
+
+    from backend.api import car_to_dict
+    from backend.database import SessionLocal
+    from backend.db_services import car_from_row, car_search_statement
+    from backend.models import Car as DBCar
+    from backend.responses import FastJSONResponse
+
+    db = SessionLocal()
+    entities = select(DBCar).order_by(DBCar.make, DBCar.model, DBCar.year, DBCar.id)
+    projected = car_search_statement()
+
+    def old_query():
+        db.expunge_all()  # each request had a fresh identity map
+        return [car_from_row(c) for c in db.scalars(entities)]
+
+    def new_query():
+        return [car_from_row(row) for row in db.execute(projected)]
+
+    cars = new_query()
+    dicts = [car_to_dict(c) for c in cars]
+    print(f"\n{'stage':34} {'old ms':>8} {'new ms':>8} {'old KiB':>9} {'new KiB':>9}")
+    for name, old, new in (
+        ("query + domain objects", old_query, new_query),
+        ("encode response body", lambda: JSONResponse(jsonable_encoder(dicts)).body,
+         lambda: FastJSONResponse(dicts).body),
+    ):
+        print(f"{name:34} {timed(old, repeat):8.1f} {timed(new, repeat):8.1f} "
+              f"{peak_kib(old):9.0f} {peak_kib(new):9.0f}")
+    assert json.loads(FastJSONResponse(dicts).body) == json.loads(JSONResponse(jsonable_encoder(dicts)).body)
+    db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cars", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--end-to-end-only", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        os.environ["DATABASE_URL"] = url  # read by backend.database at import
+        from . import datagen
+
+        datagen.generate(url, args.cars, 1, 0).dispose()
+        asyncio.run(end_to_end(args.repeat))
+        if not args.end_to_end_only:
+            stages(args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Compare two load test reports and flag regressions.
+
+Exits with status 1 if any endpoint's p50/p95/p99 latency grew, or its
+throughput fell, by more than the threshold.
+
+Usage: python -m benchmarks.compare baseline.json candidate.json [--threshold 0.10]
+"""
+import argparse
+import json
+import sys
+from typing import Dict, List
+
+LATENCY_KEYS = ("p50_ms", "p95_ms", "p99_ms")
+
+
+def compare(base: Dict, new: Dict, threshold: float) -> List[str]:
+    """Print a comparison table and return the regressions found."""
+    regressions = []
+    print(f"{'endpoint':16} {'metric':8} {'baseline':>10} {'candidate':>10} {'change':>8}")
+    for op in sorted(set(base["endpoints"]) & set(new["endpoints"])):
+        b, n = base["endpoints"][op], new["endpoints"][op]
+        for key in ("rps",) + LATENCY_KEYS:
+            change = (n[key] - b[key]) / b[key] if b[key] else 0.0
+            worse = change < -threshold if key == "rps" else change > threshold
+            flag = "  REGRESSION" if worse else ""
+            print(f"{op:16} {key:8} {b[key]:10.2f} {n[key]:10.2f} {change:+8.1%}{flag}")
+            if worse:
+                regressions.append(f"{op} {key} {change:+.1%}")
+        if n["errors"] > b["errors"]:
+            regressions.append(f"{op} errors {b['errors']} -> {n['errors']}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative change")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        base = json.load(f)
+    with open(args.candidate) as f:
+        new = json.load(f)
+    regressions = compare(base, new, args.threshold)
+    if regressions:
+        print("\nregressions: " + "; ".join(regressions))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Synthetic fleets, users and reservation histories for benchmarks.
+
+Usage: python -m benchmarks.datagen --url sqlite:///bench.db [--cars 1000] [--users 100] [--reservations 10000]
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.engine import Engine
+
+from backend.base import Base
+from backend.db_services import hash_password
+from backend.models import Car as DBCar, User as DBUser, Reservation as DBReservation
+
+MAKES = {
+    "Toyota": ["Corolla", "Camry", "RAV4", "Highlander", "Prius"],
+    "Honda": ["Civic", "Accord", "CR-V", "Pilot", "Fit"],
+    "Nissan": ["Altima", "Sentra", "Rogue", "Leaf"],
+    "Ford": ["Focus", "Fusion", "Escape", "Explorer", "F-150"],
+    "Chevrolet": ["Malibu", "Impala", "Equinox", "Tahoe"],
+    "Hyundai": ["Elantra", "Sonata", "Tucson", "Kona"],
+}
+CATEGORIES = ["Economy", "Sedan", "SUV"]
+# Search box entries a customer might type, for the load mix
+QUERIES = ["", "", "toy", "toy 202", "civic", "honda cr", "f-150 2019", "2023", "expl", "nis"]
+
+# Every generated user logs in with this password; emails are user<N>@bench.example
+BENCH_PASSWORD = "benchmark"
+CHUNK = 50_000
+
+
+def user_email(user_id: int) -> str:
+    return f"user{user_id}@bench.example"
+
+
+def _chunks(rows: Iterator[Dict], size: int = CHUNK) -> Iterator[List[Dict]]:
+    chunk: List[Dict] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _cars(n_cars: int, rng: random.Random) -> Iterator[Dict]:
+    makes = list(MAKES)
+    for cid in range(1, n_cars + 1):
+        make = rng.choice(makes)
+        yield {"id": cid, "make": make, "model": rng.choice(MAKES[make]),
+               "year": rng.randint(2012, 2025), "status": "available",
+               "category": CATEGORIES[cid % len(CATEGORIES)]}
+
+
+def _users(n_users: int) -> Iterator[Dict]:
+    password_hash = hash_password(BENCH_PASSWORD)
+    for uid in range(1, n_users + 1):
+        yield {"id": uid, "name": f"User {uid}", "email": user_email(uid),
+               "license_number": f"L{uid:08d}", "password_hash": password_hash, "role": "customer"}
+
+
+def _reservations(n_cars: int, n_users: int, n_reservations: int, today: date,
+                  rng: random.Random) -> Iterator[Dict]:
+    """Non-overlapping histories per car, roughly half in the past and half ahead of today."""
+    per_car, extra = divmod(n_reservations, n_cars)
+    for cid in range(1, n_cars + 1):
+        count = per_car + (1 if cid <= extra else 0)
+        # Bookings average ~4 days with ~2.5 idle days between them
+        day = today - timedelta(days=count * 3 + rng.randint(0, 10))
+        for _ in range(count):
+            length = rng.randint(1, 7)
+            end = day + timedelta(days=length - 1)
+            yield {"vehicle_type": CATEGORIES[cid % len(CATEGORIES)], "car_id": cid,
+                   "user_id": rng.randint(1, max(n_users, 1)), "start_date": day, "end_date": end,
+                   "status": "completed" if end < today else "reserved"}
+            day = end + timedelta(days=rng.randint(2, 5))
+
+
+def generate(
+    url: str,
+    cars: int = 1000,
+    users: int = 100,
+    reservations: int = 10_000,
+    seed: int = 0,
+    today: Optional[date] = None,
+) -> Engine:
+    """Create the schema at ``url`` and fill it with a reproducible synthetic dataset."""
+    rng = random.Random(seed)
+    today = today or date.today()
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        for chunk in _chunks(_cars(cars, rng)):
+            conn.execute(insert(DBCar), chunk)
+        for chunk in _chunks(_users(users)):
+            conn.execute(insert(DBUser), chunk)
+        if cars:
+            for chunk in _chunks(_reservations(cars, users, reservations, today, rng)):
+                conn.execute(insert(DBReservation), chunk)
+    return engine
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", required=True, help="SQLAlchemy URL of an empty database")
+    parser.add_argument("--cars", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--reservations", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    t = time.perf_counter()
+    generate(args.url, args.cars, args.users, args.reservations, args.seed).dispose()
+    print(f"{args.cars} cars, {args.users} users, {args.reservations} reservations "
+          f"in {time.perf_counter() - t:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""Load test for backend.api:app with a realistic request mix.
+
+Drives the app in-process (ASGI, no network) or over loopback HTTP against a
+uvicorn server, then writes per-endpoint throughput and p50/p95/p99 latency as
+JSON so runs can be compared with ``python -m benchmarks.compare``.
+
+Usage:
+    python -m benchmarks.loadtest [--mode inprocess|http] [--cars 1000] [--users 200]
+        [--reservations 20000] [--concurrency 32] [--requests 5000]
+        [--mix search=0.55,my_reservations=0.2,login=0.15,book=0.1] [--out report.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from .report import summarize
+
+DEFAULT_MIX = {"search": 0.55, "my_reservations": 0.2, "login": 0.15, "book": 0.1}
+
+Request = Tuple[str, str, str, Dict]  # (operation, method, path, params or json body)
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown operation {name!r}")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+def plan_requests(n: int, mix: Dict[str, float], cars: int, users: int, seed: int,
+                  page_size: Optional[int]) -> List[Request]:
+    from .datagen import BENCH_PASSWORD, CATEGORIES, QUERIES, user_email
+
+    rng = random.Random(seed)
+    ops, weights = zip(*mix.items())
+    today = date.today()
+    plan: List[Request] = []
+    for op in rng.choices(ops, weights, k=n):
+        if op == "search":
+            params = {"q": rng.choice(QUERIES), "category": rng.choice(CATEGORIES + ["All"])}
+            if page_size:
+                params["limit"] = page_size
+            plan.append((op, "GET", "/api/cars", params))
+        elif op == "my_reservations":
+            plan.append((op, "GET", "/api/my-reservations", {"user_id": rng.randint(1, users)}))
+        elif op == "login":
+            uid = rng.randint(1, users)
+            plan.append((op, "POST", "/api/login", {"email": user_email(uid), "password": BENCH_PASSWORD}))
+        else:
+            start = today + timedelta(days=rng.randint(1, 120))
+            plan.append((op, "POST", "/api/book", {
+                "car_id": rng.randint(1, cars),
+                "user_id": rng.randint(1, users),
+                "start_date": start.isoformat(),
+                "end_date": (start + timedelta(days=rng.randint(0, 6))).isoformat(),
+            }))
+    return plan
+
+
+async def drive(client: httpx.AsyncClient, plan: List[Request], concurrency: int, warmup: int) -> Dict:
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    codes: Dict[str, Counter] = defaultdict(Counter)
+    errors: Counter = Counter()
+    queue: asyncio.Queue = asyncio.Queue()
+    for i, item in enumerate(plan):
+        queue.put_nowait((i, item))
+
+    async def send(method: str, path: str, data: Dict) -> httpx.Response:
+        if method == "GET":
+            return await client.get(path, params=data)
+        return await client.post(path, json=data)
+
+    async def worker() -> None:
+        while not queue.empty():
+            i, (op, method, path, data) = queue.get_nowait()
+            t = time.perf_counter()
+            try:
+                r = await send(method, path, data)
+                status = str(r.status_code)
+            except httpx.HTTPError:
+                status = "transport_error"
+            elapsed = time.perf_counter() - t
+            if i < warmup:
+                continue
+            latencies[op].append(elapsed)
+            codes[op][status] += 1
+            if status == "transport_error" or status.startswith("5"):
+                errors[op] += 1
+
+    t = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t
+
+    endpoints = {op: summarize(latencies[op], codes[op], errors[op], elapsed) for op in sorted(latencies)}
+    everything = [v for values in latencies.values() for v in values]
+    all_codes: Counter = sum(codes.values(), Counter())
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "endpoints": endpoints,
+        "total": summarize(everything, all_codes, sum(errors.values()), elapsed),
+    }
+
+
+async def run_inprocess(plan: List[Request], concurrency: int, warmup: int) -> Dict:
+    from backend.api import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60) as client:
+            return await drive(client, plan, concurrency, warmup)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def run_http(plan: List[Request], concurrency: int, warmup: int, workers: int) -> Dict:
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.api:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        env=os.environ.copy(),
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+            for _ in range(100):
+                try:
+                    if (await client.get("/api/cache-stats")).status_code == 200:
+                        break
+                except httpx.HTTPError:
+                    pass
+                await asyncio.sleep(0.1)
+            else:
+                raise RuntimeError("server did not start")
+            return await drive(client, plan, concurrency, warmup)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=["inprocess", "http"], default="inprocess")
+    parser.add_argument("--url", help="use this existing database instead of generating one")
+    parser.add_argument("--cars", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--reservations", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX)
+    parser.add_argument("--page-size", type=int, help="send limit= with searches")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers in http mode")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url or f"sqlite:///{os.path.join(tmp, 'loadtest.db')}"
+        # The backend reads its database settings at import time
+        os.environ["DATABASE_URL"] = url
+        os.environ.pop("ASYNC_DATABASE_URL", None)
+        from . import datagen
+
+        if not args.url:
+            t = time.perf_counter()
+            datagen.generate(url, args.cars, args.users, args.reservations, args.seed).dispose()
+            print(f"generated {args.cars} cars / {args.users} users / {args.reservations} reservations "
+                  f"in {time.perf_counter() - t:.1f}s", file=sys.stderr)
+
+        plan = plan_requests(args.requests + args.warmup, args.mix, args.cars, args.users,
+                             args.seed, args.page_size)
+        if args.mode == "inprocess":
+            result = asyncio.run(run_inprocess(plan, args.concurrency, args.warmup))
+        else:
+            result = asyncio.run(run_http(plan, args.concurrency, args.warmup, args.workers))
+
+    report = {
+        "meta": {
+            "mode": args.mode,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "mix": args.mix,
+            "page_size": args.page_size,
+            "workers": args.workers if args.mode == "http" else None,
+            "dataset": None if args.url else {
+                "cars": args.cars, "users": args.users, "reservations": args.reservations, "seed": args.seed,
+            },
+            "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+        },
+        **result,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    for op, stats in report["endpoints"].items():
+        print(f"{op:16} {stats['rps']:8.1f} req/s  p50 {stats['p50_ms']:8.1f} ms  "
+              f"p95 {stats['p95_ms']:8.1f} ms  p99 {stats['p99_ms']:8.1f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
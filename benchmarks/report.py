@@ -0,0 +1,27 @@
+"""Latency/throughput summaries shared by the load test and the report comparison."""
+import math
+from typing import Dict, List
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies: List[float], status_codes: Dict[str, int], errors: int, elapsed: float) -> Dict:
+    """Per-endpoint stats; latencies are in seconds, reported in milliseconds."""
+    values = sorted(latencies)
+    return {
+        "count": len(values),
+        "errors": errors,
+        "rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3) if values else 0.0,
+        "status_codes": dict(sorted(status_codes.items())),
+    }
@@ -0,0 +1,221 @@
+import json
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Successful POSTs to these paths drop the cached GETs of the listed paths
+INVALIDATES = {
+    "/api/book": ("/api/cars", "/api/availability", "/api/my-reservations"),
+    "/api/book/category": ("/api/cars", "/api/availability", "/api/my-reservations"),
+    "/api/book/batch": ("/api/cars", "/api/availability", "/api/my-reservations"),
+}
+
+# Server-sent events from /api/events and the cached GETs each one makes stale
+EVENT_INVALIDATES = {
+    "car.status": ("/api/cars", "/api/availability"),
+    "reservation.created": ("/api/availability", "/api/my-reservations"),
+    "fleet.imported": ("/api/cars", "/api/availability"),
+}
+# Seconds without even a keep-alive before the event stream counts as dead
+EVENT_READ_TIMEOUT = 60
+# Longest Retry-After a shed POST is retried after; anything longer is raised
+MAX_SHED_WAIT = 5.0
+
+CacheKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class ApiError(Exception):
+    """The API answered with an error status; ``detail`` is its message if it sent one."""
+
+    def __init__(self, status_code: int, detail: Optional[str] = None) -> None:
+        super().__init__(detail or f"HTTP {status_code}")
+        self.status_code = status_code
+        self.detail = detail or f"HTTP {status_code}"
+
+
+class ApiClient:
+    """HTTP client for the Car Rental API, meant to be shared across Streamlit reruns.
+
+    - One pooled requests.Session, so connections are kept alive between calls.
+    - GET results are cached per (path, params) for ``cache_ttl`` seconds. After
+      that the cached copy is revalidated with If-None-Match, and a 304 reuses it.
+    - GETs are retried with exponential backoff on connection errors and on
+      429/502/503/504 (honouring Retry-After). POSTs are only retried when the
+      connection failed before the request was sent, or when admission control
+      shed them (429/503 with Retry-After, sent before the request was
+      processed), after the Retry-After delay plus jitter. POSTs sent with an
+      idempotency key are also retried after timeouts, since the server
+      answers a repeated key with the original result.
+    - A successful booking drops the cached catalog and reservation lists.
+    - After ``watch()``, change events pushed by the server drop the cached
+      GETs they affect as soon as they happen, so ``cache_ttl`` can be long.
+
+    Cached results are shared between callers and must not be modified.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float = 10,
+        cache_ttl: float = 5.0,
+        cache_size: int = 256,
+        retries: int = 3,
+        backoff: float = 0.2,
+        pool_size: int = 10,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self.retries = retries
+        self.session = requests.Session()
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=(429, 502, 503, 504),
+            allowed_methods=frozenset({"GET", "HEAD"}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # key -> (fetched at, etag, body)
+        self._cache: "OrderedDict[CacheKey, Tuple[float, Optional[str], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+    def get(self, path: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        key = (path, tuple(sorted((k, str(v)) for k, v in (params or {}).items())))
+        with self._lock:
+            entry = self._cache.get(key)
+        if entry and time.monotonic() - entry[0] < self.cache_ttl:
+            return entry[2]
+
+        headers = {"If-None-Match": entry[1]} if entry and entry[1] else {}
+        r = self.session.get(f"{self.base_url}{path}", params=params, headers=headers, timeout=self.timeout)
+        if r.status_code == 304 and entry:
+            body, etag = entry[2], entry[1]
+        else:
+            body, etag = self._json(r), r.headers.get("ETag")
+        with self._lock:
+            self._cache[key] = (time.monotonic(), etag, body)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return body
+
+    def post(self, path: str, payload: Dict[str, Any], idempotency_key: Optional[str] = None) -> Any:
+        """POST ``payload``; with an ``idempotency_key`` timeouts and dropped connections are retried too."""
+        headers = {"Idempotency-Key": idempotency_key} if idempotency_key else {}
+        for attempt in range(self.retries + 1):
+            try:
+                r = self.session.post(f"{self.base_url}{path}", json=payload, headers=headers, timeout=self.timeout)
+            except (requests.Timeout, requests.ConnectionError):
+                # Without a key the server may have acted on the lost request
+                if not idempotency_key or attempt == self.retries:
+                    raise
+                continue
+            wait = self._shed_wait(r)
+            if wait is None or attempt == self.retries:
+                break
+            time.sleep(wait * random.uniform(1.0, 1.5))  # spread the retries out
+        body = self._json(r)
+        self.invalidate(INVALIDATES.get(path, ()))
+        return body
+
+    def invalidate(self, paths: Optional[Iterable[str]] = None) -> None:
+        """Drop cached GETs of ``paths`` (all of them if None)."""
+        with self._lock:
+            if paths is None:
+                self._cache.clear()
+                return
+            paths = set(paths)
+            for key in [k for k in self._cache if k[0] in paths]:
+                del self._cache[key]
+
+    def events(self, types: Optional[Iterable[str]] = None) -> Iterator[Dict[str, Any]]:
+        """Yield change events from /api/events until the stream ends.
+
+        A ``{"type": "dropped"}`` event means the server dropped this client for
+        falling behind; anything cached may be stale.
+        """
+        params = {"types": ",".join(types)} if types else None
+        with self.session.get(
+            f"{self.base_url}/api/events", params=params, stream=True,
+            timeout=(self.timeout, EVENT_READ_TIMEOUT),
+        ) as r:
+            if not r.ok:
+                self._json(r)
+            event_type, data = None, []
+            for line in r.iter_lines(decode_unicode=True):
+                if line:
+                    field, _, value = line.partition(":")
+                    if field == "event":
+                        event_type = value.strip()
+                    elif field == "data":
+                        data.append(value.strip())
+                    continue
+                if data:
+                    event = json.loads("\n".join(data))
+                    event.setdefault("type", event_type)
+                    yield event
+                event_type, data = None, []
+
+    def watch(self, retry: float = 2.0) -> None:
+        """Follow /api/events in a daemon thread, dropping cached GETs as things change.
+
+        Whenever the stream breaks the whole cache is dropped (events may have
+        been missed) and the thread reconnects after ``retry`` seconds.
+        """
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+
+        def follow() -> None:
+            while not self._stop.is_set():
+                try:
+                    for event in self.events():
+                        if self._stop.is_set():
+                            return
+                        self.invalidate(EVENT_INVALIDATES.get(event["type"], ()))
+                        if event["type"] == "dropped":
+                            break
+                except (requests.RequestException, ApiError, ValueError):
+                    pass
+                self.invalidate()
+                self._stop.wait(retry)
+
+        self._watcher = threading.Thread(target=follow, name="api-events", daemon=True)
+        self._watcher.start()
+
+    def close(self) -> None:
+        self._stop.set()
+        self.session.close()
+
+    @staticmethod
+    def _shed_wait(r: requests.Response) -> Optional[float]:
+        """Seconds to wait before retrying a POST the server shed, or None if it was not shed."""
+        if r.status_code not in (429, 503):
+            return None
+        try:
+            wait = float(r.headers["Retry-After"])
+        except (KeyError, ValueError):
+            return None
+        return wait if wait <= MAX_SHED_WAIT else None
+
+    @staticmethod
+    def _json(r: requests.Response) -> Any:
+        if not r.ok:
+            try:
+                detail = r.json().get("detail")
+            except Exception:
+                detail = None
+            raise ApiError(r.status_code, detail if isinstance(detail, str) else None)
+        return r.json()
@@ -1,9 +1,16 @@
+import json
+import os
+import uuid
+
 import streamlit as st
 import requests
 from datetime import date, timedelta
 
+from api_client import ApiClient, ApiError
+
 st.set_page_config(page_title="Car Rental", page_icon="🚗", layout="centered")
-BASE_URL = "http://127.0.0.1:8000"  # FastAPI server
+BASE_URL = os.environ.get("API_BASE_URL", "http://127.0.0.1:8000")  # FastAPI server
+CACHE_TTL = 30  # seconds a GET result is reused before being revalidated; change events drop it sooner
 
 if "user" not in st.session_state:
     st.session_state.user = None
@@ -11,28 +18,42 @@ if "selected_car_id" not in st.session_state:
     st.session_state.selected_car_id = None
 
 
-def api_post(path: str, payload: dict):
-    r = requests.post(f"{BASE_URL}{path}", json=payload, timeout=10)
-    if not r.ok:
-        try:
-            detail = r.json().get("detail")
-            st.error(detail or f"HTTP {r.status_code}")
-        except Exception:
-            st.error(f"HTTP {r.status_code}")
-        return None
-    return r.json()
+@st.cache_resource
+def get_client() -> ApiClient:
+    # One client (connection pool and GET cache) shared by every rerun and session,
+    # kept fresh by the server's change events instead of polling
+    client = ApiClient(BASE_URL, cache_ttl=CACHE_TTL)
+    client.watch()
+    return client
+
+
+def api_post(path: str, payload: dict, idempotent: bool = False):
+    # An idempotent POST reuses its key until it gets an answer, so clicking again
+    # after a timeout gets the first attempt's result instead of a second booking
+    keys = st.session_state.setdefault("idempotency_keys", {})
+    form = (path, json.dumps(payload, sort_keys=True))
+    key = keys.setdefault(form, uuid.uuid4().hex) if idempotent else None
+    try:
+        out = get_client().post(path, payload, idempotency_key=key)
+    except ApiError as e:
+        keys.pop(form, None)
+        st.error(e.detail)
+    except requests.RequestException:
+        st.error("Cannot reach the API server")
+    else:
+        keys.pop(form, None)
+        return out
+    return None
 
 
 def api_get(path: str, params: dict):
-    r = requests.get(f"{BASE_URL}{path}", params=params or {}, timeout=10)
-    if not r.ok:
-        try:
-            detail = r.json().get("detail")
-            st.error(detail or f"HTTP {r.status_code}")
-        except Exception:
-            st.error(f"HTTP {r.status_code}")
-        return []
-    return r.json()
+    try:
+        return get_client().get(path, params or {})
+    except ApiError as e:
+        st.error(e.detail)
+    except requests.RequestException:
+        st.error("Cannot reach the API server")
+    return []
 
 
 st.title("Car Rental — Prototype")
@@ -70,6 +91,7 @@ else:
                     "license_number": r_lic.strip(),
                     "password": r_pw,
                 },
+                idempotent=True,
             )
             if out:
                 st.session_state.user = out.get("user")
@@ -100,7 +122,8 @@ if cars:
             for c in cars
         ]
     )
-    available_ids = [c["id"] for c in cars if c["status"] == "available"]
+    # Cars already booked for other dates can still be booked; the server checks the dates
+    available_ids = [c["id"] for c in cars if c["status"] in ("available", "reserved", "rented")]
     chosen = st.selectbox("Select car ID to book", ["None"] + available_ids, index=0)
     st.session_state.selected_car_id = None if chosen == "None" else int(chosen)
 else:
@@ -115,15 +138,31 @@ if not u:
     st.caption("Sign in to book.")
 else:
     cid = st.session_state.selected_car_id
-    if not cid:
-        st.caption("Select a car ID above.")
+    if not cid and category == "All":
+        st.caption("Select a car ID above, or a category to book any car of it.")
     else:
         today = date.today()
         start = st.date_input("Start date", value=today)
         end = st.date_input(
             "End date", value=today + timedelta(days=2), min_value=start
         )
-        if st.button("Confirm booking"):
+        if not cid:
+            # The server picks the car that fits the dates best
+            if st.button(f"Book any {category} car"):
+                out = api_post(
+                    "/api/book/category",
+                    {
+                        "category": category,
+                        "user_id": u["id"],
+                        "start_date": start.isoformat(),
+                        "end_date": end.isoformat(),
+                    },
+                    idempotent=True,
+                )
+                if out:
+                    st.success(f"Booked car #{out['car_id']}.")
+                    st.rerun()
+        elif st.button("Confirm booking"):
             out = api_post(
                 "/api/book",
                 {
@@ -132,6 +171,7 @@ else:
                     "start_date": start.isoformat(),
                     "end_date": end.isoformat(),
                 },
+                idempotent=True,
             )
             if out:
                 st.success("Booked.")
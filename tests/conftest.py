@@ -0,0 +1,33 @@
+import os
+import tempfile
+
+# The backend reads its settings at import time, so point it at a scratch
+# database before any test module imports it
+_tmp = tempfile.mkdtemp(prefix="car-rental-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'test.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ["LIFECYCLE_SCHEDULER"] = "0"
+os.environ.pop("CATALOG_CACHE_SIGNAL_FILE", None)
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    """The API with its startup run (tables created, seed data loaded)."""
+    from backend.api import app
+
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture
+def db(client):
+    from backend.database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
@@ -0,0 +1,32 @@
+from datetime import date, timedelta
+
+from sqlalchemy import func, insert, or_, update
+
+from backend.analytics import utilization
+from backend.models import Car as DBCar
+
+
+def test_cars_without_a_category_count_as_unknown(client, db):
+    # NULL and "Unknown" interleaved by id, so a raw ORDER BY category splits them
+    ids = range(300_001, 300_006)
+    db.execute(insert(DBCar), [
+        {"id": car_id, "make": "Any", "model": "Car", "year": 2020, "status": "available", "category": "Unknown"}
+        for car_id in ids
+    ])
+    # An insert would fill in the column default, so clear the category afterwards
+    db.execute(update(DBCar).where(DBCar.id.in_(ids[::2])).values(category=None))
+    db.commit()
+    unknown = db.query(func.count(DBCar.id)).filter(
+        or_(DBCar.category.is_(None), DBCar.category == "Unknown")
+    ).scalar()
+    start = date.today()
+    end = start + timedelta(days=6)
+
+    report = utilization(db, start, end)
+    assert report["categories"]["Unknown"]["cars"] == unknown
+    assert sum(c["cars"] for c in report["categories"].values()) == report["fleet"]["cars"]
+
+    only_unknown = utilization(db, start, end, "Unknown")
+    assert list(only_unknown["categories"]) == ["Unknown"]
+    assert only_unknown["fleet"]["cars"] == unknown
+    assert set(ids) <= set(only_unknown["cars"]["id"])
@@ -0,0 +1,44 @@
+from datetime import date, timedelta
+
+from backend.car import Car
+from backend.db_services import DatabaseFleetStore, DatabaseUserStore
+
+
+def day(n: int) -> str:
+    return (date.today() + timedelta(days=n)).isoformat()
+
+
+def available_ids(client, first: int, last: int):
+    r = client.get("/api/availability", params={"start_date": day(first), "end_date": day(last)})
+    assert r.status_code == 200
+    return {c["id"] for c in r.json()}
+
+
+def test_car_booked_for_other_dates_is_available(client, db):
+    user = DatabaseUserStore(db).register("Avail", "avail@example.com", "A-1", "secret")
+    DatabaseFleetStore(db).add(Car(600_001, "Skoda", "Octavia", 2023, "available"), "Estate")
+
+    r = client.post("/api/book", json={
+        "car_id": 600_001, "user_id": user.id, "start_date": day(20), "end_date": day(22),
+    })
+    assert r.status_code == 200
+    # Now "reserved", but only for days 20-22
+    assert 600_001 in available_ids(client, 30, 32)
+    assert 600_001 not in available_ids(client, 21, 25)
+
+    # /api/book agrees with the listing
+    r = client.post("/api/book", json={
+        "car_id": 600_001, "user_id": user.id, "start_date": day(30), "end_date": day(32),
+    })
+    assert r.status_code == 200
+    r = client.post("/api/book", json={
+        "car_id": 600_001, "user_id": user.id, "start_date": day(22), "end_date": day(23),
+    })
+    assert r.status_code == 409
+
+
+def test_car_in_maintenance_is_not_available(client, db):
+    store = DatabaseFleetStore(db)
+    store.add(Car(600_101, "Skoda", "Superb", 2023, "available"), "Estate")
+    store.set_status(600_101, "maintenance")
+    assert 600_101 not in available_ids(client, 40, 41)
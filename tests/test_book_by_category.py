@@ -0,0 +1,62 @@
+from datetime import date, timedelta
+
+from backend.allocation import fleet_allocator
+from backend.async_db_services import AsyncDatabaseFleetStore
+from backend.car import Car
+from backend.database import AsyncSessionLocal
+from backend.db_services import DatabaseFleetStore, DatabaseUserStore
+
+
+def book_category(client, category: str, user_id: int, first: int, last: int):
+    today = date.today()
+    return client.post("/api/book/category", json={
+        "category": category,
+        "user_id": user_id,
+        "start_date": (today + timedelta(days=first)).isoformat(),
+        "end_date": (today + timedelta(days=last)).isoformat(),
+    })
+
+
+def test_added_car_can_be_booked_by_category(client, db):
+    user = DatabaseUserStore(db).register("Cat", "category@example.com", "C-1", "secret")
+    assert book_category(client, "Convertible", user.id, 3, 5).status_code == 409
+
+    DatabaseFleetStore(db).add(Car(500_001, "Mazda", "MX-5", 2024, "available"), "Convertible")
+    r = book_category(client, "Convertible", user.id, 3, 5)
+    assert r.status_code == 200
+    assert r.json()["car_id"] == 500_001
+    # The car is now reserved, but later dates still go to it
+    r = book_category(client, "Convertible", user.id, 6, 8)
+    assert r.json()["car_id"] == 500_001
+    assert book_category(client, "Convertible", user.id, 4, 4).status_code == 409
+
+
+def test_car_back_in_service_can_be_booked_by_category(client, db):
+    user = DatabaseUserStore(db).register("Van", "van@example.com", "V-1", "secret")
+
+    async def add_and_set(status: str, add: bool = False) -> None:
+        async with AsyncSessionLocal() as session:
+            store = AsyncDatabaseFleetStore(session)
+            if add:
+                await store.add(Car(500_101, "Ford", "Transit", 2023, "available"), "Van")
+            await store.set_status(500_101, status)
+
+    client.portal.call(add_and_set, "maintenance", True)
+    assert book_category(client, "Van", user.id, 2, 3).status_code == 409
+
+    client.portal.call(add_and_set, "available")
+    r = book_category(client, "Van", user.id, 2, 3)
+    assert r.status_code == 200
+    assert r.json()["car_id"] == 500_101
+
+
+def test_unknown_car_is_never_tracked(client, db):
+    async def set_status(car_id: int, status: str) -> None:
+        async with AsyncSessionLocal() as session:
+            await AsyncDatabaseFleetStore(session).set_status(car_id, status)
+
+    assert fleet_allocator.loaded
+    DatabaseFleetStore(db).set_status(500_901, "available")
+    client.portal.call(set_status, 500_902, "available")
+    assert 500_901 not in fleet_allocator
+    assert 500_902 not in fleet_allocator
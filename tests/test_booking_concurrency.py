@@ -0,0 +1,82 @@
+import random
+import threading
+from datetime import date, timedelta
+
+from sqlalchemy import insert
+
+from backend.database import SessionLocal
+from backend.db_services import DatabaseReservationStore, DatabaseUserStore, ReservationOverlap
+from backend.models import Car as DBCar, Reservation as DBReservation
+from backend.reservation import Reservation
+
+CARS = range(200_001, 200_005)
+SLOTS = 4
+THREADS = 16
+
+
+def slot_range(slot: int, shift: int):
+    """Slot ``slot`` moved ``shift`` days: ranges of one slot overlap, of different slots never do."""
+    start = date.today() + timedelta(days=10 + 6 * slot + shift)
+    return start, start + timedelta(days=2)
+
+
+def test_concurrent_bookings_never_overlap(client, db):
+    db.execute(insert(DBCar), [
+        {"id": car_id, "make": "Stress", "model": "Test", "year": 2024, "status": "available",
+         "category": "StressTest"}
+        for car_id in CARS
+    ])
+    db.commit()
+    user = DatabaseUserStore(db).register("Stress", "stress@example.com", "S-1", "secret")
+
+    barrier = threading.Barrier(THREADS)
+    lock = threading.Lock()
+    booked, overlaps, other_errors = [], [], []
+
+    def worker(seed: int) -> None:
+        rng = random.Random(seed)
+        attempts = [(car_id, slot) for car_id in CARS for slot in range(SLOTS)]
+        rng.shuffle(attempts)
+        session = SessionLocal()
+        store = DatabaseReservationStore(session)
+        barrier.wait()
+        try:
+            for car_id, slot in attempts:
+                start, end = slot_range(slot, rng.randint(0, 1))
+                r = Reservation(
+                    vehicle_type="StressTest", car_id=car_id, user_id=user.id,
+                    start_date=start.isoformat(), end_date=end.isoformat(), status="reserved",
+                )
+                # Reserved cars stay bookable, so every request races on the dates alone
+                try:
+                    error = store.book_many([r])[0]
+                except Exception as ex:
+                    error = ex
+                with lock:
+                    if error is None:
+                        booked.append((car_id, slot))
+                    elif isinstance(error, ReservationOverlap):
+                        overlaps.append((car_id, slot))
+                    else:
+                        other_errors.append(error)
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert other_errors == []
+    # Exactly one winner per car and slot, whichever thread got there first
+    assert sorted(booked) == sorted((car_id, slot) for car_id in CARS for slot in range(SLOTS))
+    assert len(overlaps) == THREADS * len(CARS) * SLOTS - len(booked)
+
+    rows = db.query(DBReservation.car_id, DBReservation.start_date, DBReservation.end_date).filter(
+        DBReservation.car_id.in_(CARS)
+    ).order_by(DBReservation.car_id, DBReservation.start_date).all()
+    assert len(rows) == len(CARS) * SLOTS
+    for (car_a, _, end_a), (car_b, start_b, _) in zip(rows, rows[1:]):
+        if car_a == car_b:
+            assert end_a < start_b
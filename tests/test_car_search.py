@@ -0,0 +1,63 @@
+from contextlib import contextmanager
+from typing import List
+
+from sqlalchemy import event, insert
+
+from backend.cache import catalog_cache
+from backend.database import async_engine, engine
+from backend.models import Car as DBCar
+
+
+@contextmanager
+def count_selects():
+    """Collect the SELECTs run on the sync and async engines inside the block."""
+    selects: List[str] = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            selects.append(statement)
+
+    engines = (engine, async_engine.sync_engine)
+    for e in engines:
+        event.listen(e, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield selects
+    finally:
+        for e in engines:
+            event.remove(e, "before_cursor_execute", before_cursor_execute)
+
+
+def add_cars(db, category: str, first_id: int, n: int) -> None:
+    db.execute(insert(DBCar), [
+        {"id": first_id + i, "make": "Make", "model": f"M{i}", "year": 2020, "status": "available",
+         "category": category}
+        for i in range(n)
+    ])
+    db.commit()
+    catalog_cache.invalidate_cars(range(first_id, first_id + n))
+
+
+def test_car_listing_runs_a_fixed_number_of_selects(client, db):
+    counts = {}
+    for n, category, first_id in ((5, "QueryCountSmall", 100_000), (500, "QueryCountLarge", 110_000)):
+        add_cars(db, category, first_id, n)
+        catalog_cache.clear()
+        with count_selects() as selects:
+            r = client.get("/api/cars", params={"category": category})
+        assert r.status_code == 200
+        cars = r.json()
+        assert len(cars) == n
+        assert {c["category"] for c in cars} == {category}
+        counts[n] = len(selects)
+
+    # One search query, however many cars it returns
+    assert counts[5] == counts[500] == 1
+
+
+def test_cached_car_listing_runs_no_selects(client, db):
+    add_cars(db, "QueryCountCached", 120_000, 20)
+    client.get("/api/cars", params={"category": "QueryCountCached"})
+    with count_selects() as selects:
+        r = client.get("/api/cars", params={"category": "QueryCountCached"})
+    assert len(r.json()) == 20
+    assert selects == []
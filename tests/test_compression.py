@@ -0,0 +1,43 @@
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from backend.compression import CompressionMiddleware
+
+
+def large(request):
+    return JSONResponse({"cars": [{"id": i, "make": "Toyota"} for i in range(200)]})
+
+
+def small(request):
+    return JSONResponse({"ok": True})
+
+
+def binary(request):
+    return PlainTextResponse(b"x" * 4096, media_type="application/octet-stream")
+
+
+@pytest.fixture(scope="module")
+def client():
+    app = Starlette(routes=[Route("/large", large), Route("/small", small), Route("/binary", binary)])
+    return TestClient(CompressionMiddleware(app, minimum_size=1024))
+
+
+@pytest.mark.parametrize("accept_encoding, encoded", [("gzip", True), ("identity", False), ("", False)])
+def test_compressible_responses_vary_on_accept_encoding(client, accept_encoding, encoded):
+    r = client.get("/large", headers={"Accept-Encoding": accept_encoding})
+    assert (r.headers.get("content-encoding") == "gzip") is encoded
+    assert r.headers["vary"] == "Accept-Encoding"
+    assert len(r.json()["cars"]) == 200
+
+    r = client.get("/small", headers={"Accept-Encoding": accept_encoding})
+    assert "content-encoding" not in r.headers
+    assert r.headers["vary"] == "Accept-Encoding"
+
+
+def test_uncompressible_responses_do_not_vary(client):
+    r = client.get("/binary", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in r.headers
+    assert "vary" not in r.headers
@@ -0,0 +1,20 @@
+import asyncio
+
+from backend.events import EventHub, sse_stream
+
+
+def test_sse_stream_always_unsubscribes():
+    async def scenario():
+        hub = EventHub(16)
+        stream = sse_stream(hub, ["car.status"], heartbeat=60)
+        # A body that is never sent holds no subscription
+        assert hub.stats()["subscribers"] == 0
+        del stream
+
+        stream = sse_stream(hub, ["car.status"], heartbeat=60)
+        assert await stream.__anext__() == b"retry: 2000\n\n"
+        assert hub.stats()["subscribers"] == 1
+        await stream.aclose()
+        assert hub.stats()["subscribers"] == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,19 @@
+from backend.async_db_services import AsyncDatabaseFleetStore
+from backend.cache import catalog_cache
+from backend.database import AsyncSessionLocal
+from backend.db_services import DatabaseFleetStore
+
+MISSING_CAR = 999_999
+
+
+async def async_set_status(car_id: int, status: str) -> None:
+    async with AsyncSessionLocal() as session:
+        await AsyncDatabaseFleetStore(session).set_status(car_id, status)
+
+
+def test_set_status_of_unknown_car_changes_nothing(client, db):
+    version = catalog_cache.version
+    DatabaseFleetStore(db).set_status(MISSING_CAR, "available")
+    client.portal.call(async_set_status, MISSING_CAR, "available")
+    # No commit, cache invalidation or car.status event for a car that is not there
+    assert catalog_cache.version == version
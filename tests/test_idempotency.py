@@ -0,0 +1,26 @@
+import pytest
+
+from backend.idempotency import DONE, NEW, PENDING, MemoryIdempotencyStore, SQLiteIdempotencyStore, StoredResponse
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryIdempotencyStore(max_keys=3)
+    store = SQLiteIdempotencyStore(str(tmp_path / "keys.db"), max_keys=3)
+    store.PURGE_EVERY = 1
+    return store
+
+
+def test_in_flight_keys_survive_eviction(store):
+    assert store.begin("in-flight", "f") == (NEW, None)
+    for i in range(10):
+        assert store.begin(f"done-{i}", "f") == (NEW, None)
+        store.finish(f"done-{i}", "f", StoredResponse(200, "application/json", b"{}"))
+    store.begin("last", "f")
+
+    # Still claimed: a retry must wait, not run the request a second time
+    assert store.begin("in-flight", "f") == (PENDING, None)
+    status, response = store.begin("done-9", "f")
+    assert status == DONE and response.body == b"{}"
+    assert store.begin("done-0", "f") == (NEW, None)
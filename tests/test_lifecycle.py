@@ -0,0 +1,57 @@
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from backend.database import AsyncSessionLocal, async_engine
+from backend.lifecycle import advance_reservations
+from backend.models import Car as DBCar, Reservation as DBReservation
+
+
+async def advance(today: date):
+    async with AsyncSessionLocal() as session:
+        return await advance_reservations(session, today)
+
+
+@pytest.mark.parametrize("update_returning", [True, False], ids=["returning", "select-then-update"])
+def test_advance_moves_reservations_and_cars(client, db, monkeypatch, update_returning):
+    # Without UPDATE ... RETURNING (MySQL) the rows are selected, then updated by id
+    monkeypatch.setattr(async_engine.dialect, "update_returning", update_returning)
+    base = 400_000 if update_returning else 410_000
+    done, starting, rebooked = base + 1, base + 2, base + 3
+    today = date.today() + timedelta(days=365 * 5)
+    day = timedelta(days=1)
+    db.execute(insert(DBCar), [
+        {"id": done, "make": "L", "model": "C", "year": 2020, "status": "rented", "category": "Lifecycle"},
+        {"id": starting, "make": "L", "model": "C", "year": 2020, "status": "reserved", "category": "Lifecycle"},
+        {"id": rebooked, "make": "L", "model": "C", "year": 2020, "status": "rented", "category": "Lifecycle"},
+    ])
+    db.execute(insert(DBReservation), [
+        {"vehicle_type": "Lifecycle", "car_id": car_id, "user_id": 1, "start_date": start, "end_date": end,
+         "status": status}
+        for car_id, start, end, status in (
+            (done, today - 3 * day, today - day, "active"),
+            (starting, today, today + 2 * day, "reserved"),
+            (rebooked, today - 3 * day, today - day, "active"),
+            (rebooked, today + 5 * day, today + 6 * day, "reserved"),
+        )
+    ])
+    db.commit()
+
+    counts = client.portal.call(advance, today)
+    assert counts["completed"] >= 2 and counts["activated"] >= 1
+
+    db.expire_all()
+    assert {car_id: db.get(DBCar, car_id).status for car_id in (done, starting, rebooked)} == {
+        done: "available", starting: "rented", rebooked: "reserved",
+    }
+    statuses = dict(
+        db.query(DBReservation.car_id, DBReservation.status)
+        .filter(DBReservation.car_id.in_((done, starting)))
+        .all()
+    )
+    assert statuses == {done: "completed", starting: "active"}
+
+    # A second tick has nothing left to do for these cars
+    again = client.portal.call(advance, today)
+    assert again["cars_released"] == again["cars_rented"] == 0